@@ -46,7 +46,7 @@ from pycardano import (
 
 from suantrazabilidadapi.routers.api_v1.endpoints import pydantic_schemas
 from suantrazabilidadapi.utils.generic import Constants
-from suantrazabilidadapi.utils.plataforma import Plataforma
+from suantrazabilidadapi.utils.plataforma import plataforma_client
 
 
 def get_nft_utxo(context: Any, address: Address, nft: MultiAsset) -> UTxO:
@@ -91,7 +91,7 @@ def main(script: str, option: str = "send"):
 
     wallet_id = "a08a8de96263fa61d84de42c51cfc6ba0a3a945043268b1e33762188"
     graphql_variables = {"walletId": wallet_id}
-    r = Plataforma().getWallet("getWalletById", graphql_variables)
+    r = plataforma_client.getWallet("getWalletById", graphql_variables)
 
     if r["data"].get("data", None) is not None:
         walletInfo = r["data"]["data"]["getWallet"]
@@ -1,8 +1,11 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 from fastapi.middleware.gzip import GZipMiddleware
+from starlette.exceptions import HTTPException as StarletteHTTPException
 # from starlette.middleware.base import BaseHTTPMiddleware
 from celery import Celery
 
@@ -10,6 +13,12 @@ from celery import Celery
 from .core.config import settings
 from .routers.api_v1.api import api_router
 from .utils.security import generate_api_key
+from .utils.health import backend_monitor
+from .utils.plataforma import async_plataforma_client
+from .utils.pools import plataforma_async_clients, plataforma_sessions
+from .utils.exception import BlockfrostRateLimited
+from .utils.response import blockfrost_rate_limited_handler, http_exception_handler
+from .utils.utxo_index import local_utxo_index
 from . import __version__
 # from .celery.main import lifespan
 from .celery.tasks import send_push_notification
@@ -51,6 +60,22 @@ contact = {"name": "Suan"}
 #         await process.wait()
 #         print("watchmedo terminated")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Probe Ogmios and Blockfrost in the background to route chain contexts
+    backend_monitor.start()
+    # Follow the chain to answer utxos() of the core wallet and the contracts locally
+    local_utxo_index.start(async_plataforma_client)
+    try:
+        yield
+    finally:
+        await asyncio.to_thread(local_utxo_index.stop)
+        await backend_monitor.stop()
+        # Release the pooled connections towards Plataforma backend
+        await plataforma_async_clients.aclose()
+        plataforma_sessions.close()
+
+
 redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
 #########################
@@ -85,7 +110,7 @@ suantrazabilidad = FastAPI(
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     version=VERSION,
     debug=True,
-    # lifespan=lifespan,
+    lifespan=lifespan,
 )
 
 root_router = APIRouter()
@@ -101,6 +126,11 @@ suantrazabilidad.add_middleware(
 
 suantrazabilidad.add_middleware(GZipMiddleware, minimum_size=1000)
 
+# Blockfrost calls rejected by the shared rate limiter answer 503 with Retry-After, including
+# those the endpoints wrapped in a 500 HTTPException
+suantrazabilidad.add_exception_handler(BlockfrostRateLimited, blockfrost_rate_limited_handler)
+suantrazabilidad.add_exception_handler(StarletteHTTPException, http_exception_handler)
+
 
 # class SuppressLogsMiddleware(BaseHTTPMiddleware):
 #     async def dispatch(self, request: Request, call_next):
@@ -17,13 +17,8 @@ from pycardano import (
     Address,
     AlonzoMetadata,
     AuxiliaryData,
-    ExtendedSigningKey,
-    HDWallet,
     Metadata,
     MultiAsset,
-    PaymentVerificationKey,
-    ScriptAll,
-    ScriptPubkey,
     TransactionBuilder,
     TransactionOutput,
     Value,
@@ -34,7 +29,10 @@ sys.path.append(project_root)
 
 from suantrazabilidadapi.utils.blockchain import CardanoNetwork  # pylint: disable=wrong-import-position
 from suantrazabilidadapi.utils.generic import Constants  # pylint: disable=wrong-import-position
-from suantrazabilidadapi.utils.plataforma import Plataforma  # pylint: disable=wrong-import-position
+from suantrazabilidadapi.utils.keyring import wallet_keyring  # pylint: disable=wrong-import-position
+from suantrazabilidadapi.utils.plataforma import async_plataforma_client  # pylint: disable=wrong-import-position
+from suantrazabilidadapi.utils.pools import plataforma_async_clients  # pylint: disable=wrong-import-position
+from suantrazabilidadapi.utils.spend_reservations import pending_spends  # pylint: disable=wrong-import-position
 from suantrazabilidadapi.celery.main import redis_config  # pylint: disable=wrong-import-position
 
 # from redis import asyncio as aioredis
@@ -70,12 +68,20 @@ def send_push_notification(device_token: str):
 def get_access_token_sync():
     # Wrapper to run the async function within a Celery task
     try:
-        return asyncio.run(get_access_token())
+        return asyncio.run(_run_closing_clients(get_access_token()))
     except Exception as e:
         logging.error(f"Failed to run get_access_token: {e}")
         raise EncodeError(f"Error running async function: {str(e)}") from e
 
 
+async def _run_closing_clients(coroutine):
+    # Each asyncio.run opens a new loop, so its http clients are closed with it
+    try:
+        return await coroutine
+    finally:
+        await plataforma_async_clients.aclose()
+
+
 async def get_access_token():
     # TODO: Make sure that the same address cannot claim twice by checking from the wallet table in dynamoDB or There must be a way to derive from the stake key when it already has the token, but also when requesting more than one in the same transaction
 
@@ -125,10 +131,11 @@ async def get_access_token():
         wallet_ids = {}
         for wallet_id, tasks in grouped_by_wallet.items():
             logging.info(f"Processing batch for wallet_id: {wallet_id}")
-            chain_context = CardanoNetwork().get_chain_context()
+            # Inputs already spent by in-flight transactions of the wallet are left out
+            chain_context = pending_spends.context(CardanoNetwork().get_chain_context())
             builder = None
             graphql_variables = {"walletId": wallet_id}
-            r = Plataforma().getWallet("getWalletById", graphql_variables)
+            r = await async_plataforma_client.getWallet("getWalletById", graphql_variables)
             if r["data"].get("data", None) is not None:
                 walletInfo = r["data"]["data"]["getWallet"]
                 if walletInfo is None:
@@ -140,14 +147,8 @@ async def get_access_token():
                     """1. Obtain the payment sk and vk from the walletInfo"""
                     ########################
                     seed = walletInfo["seed"]
-                    hdwallet = HDWallet.from_seed(seed)
-                    child_hdwallet = hdwallet.derive_from_path("m/1852'/1815'/0'/0/0")
-
-                    payment_skey = ExtendedSigningKey.from_hdwallet(child_hdwallet)
-
-                    payment_vk = PaymentVerificationKey.from_primitive(
-                        child_hdwallet.public_key
-                    )
+                    wallet_keys = await wallet_keyring.aget(wallet_id, seed)
+                    payment_skey = wallet_keys.signing_key
 
                     master_address = Address.from_primitive(walletInfo["address"])
                     # Add our own address as the input address
@@ -156,10 +157,8 @@ async def get_access_token():
                     ########################
                     """2. Create the native script and policy from the pubkey"""
                     ########################
-                    pub_key_policy = ScriptPubkey(payment_vk.hash())
-                    policy = ScriptAll([pub_key_policy])
-                    # Calculate policy ID, which is the hash of the policy
-                    policy_id = policy.hash()
+                    policy = wallet_keys.policy
+                    policy_id = wallet_keys.policy_id
                     with open(Constants().PROJECT_ROOT / "policy.id", "a+", encoding="utf-8") as f:
                         f.truncate(0)
                         f.write(str(policy_id))
@@ -235,10 +234,9 @@ async def get_access_token():
                         f"Batch processing for wallet_id: {wallet_id} completed."
                     )
 
-                    signed_tx = builder.build_and_sign(
-                        [payment_skey], change_address=master_address
+                    tx_id = pending_spends.build_and_submit(
+                        chain_context, builder, [payment_skey], master_address
                     )
-                    tx_id = signed_tx.transaction_body.hash().hex()
                     logger.info(f"Transaction ID: {tx_id}")
 
                     wallet_ids[wallet_id] = {
@@ -246,8 +244,6 @@ async def get_access_token():
                         "destinAddresses": destinAddress_list,
                     }
 
-                    chain_context.submit_tx(signed_tx)
-
         logging.info("All pending tasks processed and grouped by wallet_id.")
 
         return {
@@ -1,14 +1,11 @@
 import logging
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from opshin.builder import PlutusContract, build
 from opshin.prelude import TxId, TxOutRef
-from pycardano import (
-    Address,
-    HDWallet,
-    PaymentVerificationKey
-)
+from pycardano import Address
 
 from suantrazabilidadapi.routers.api_v1.endpoints import pydantic_schemas
 from suantrazabilidadapi.utils.blockchain import CardanoNetwork, Keys
@@ -17,8 +14,11 @@ from suantrazabilidadapi.utils.generic import (
     is_valid_hex_string,
     recursion_limit,
 )
-from suantrazabilidadapi.utils.plataforma import Helpers, Plataforma
-from suantrazabilidadapi.utils.response import Response
+from suantrazabilidadapi.utils.keyring import wallet_keyring
+from suantrazabilidadapi.utils.plataforma import async_plataforma_client, plataforma_client
+from suantrazabilidadapi.utils.script_registry import script_registry
+from suantrazabilidadapi.utils.utxo_index import local_utxo_index
+from suantrazabilidadapi.utils.response import Response, ndjson_lines
 from suantrazabilidadapi.utils.exception import ResponseProcessingError, ResponseDynamoDBException
 
 router = APIRouter()
@@ -44,7 +44,7 @@ async def getPkh(command_name: pydantic_schemas.walletCommandName, wallet: str)
                 raise ValueError("id provided does not exist in wallet database")
 
             graphql_variables = {"walletId": wallet}
-            r = Plataforma().getWallet("getWalletById", graphql_variables)
+            r = await async_plataforma_client.getWallet("getWalletById", graphql_variables)
 
             if r["data"].get("data", None) is not None:
                 walletInfo = r["data"]["data"]["getWallet"]
@@ -68,10 +68,15 @@ async def getPkh(command_name: pydantic_schemas.walletCommandName, wallet: str)
     summary="Get all the scripts registered in Plataforma",
     response_description="Script details",
 )
-async def getScripts():
-    """Get all the scripts registered in Plataforma"""
+async def getScripts(stream: bool = False, page_size: Optional[int] = Query(None, ge=1, le=1000)):
+    """Get all the scripts registered in Plataforma \n
+    With stream, scripts are sent as newline delimited JSON while the pages are read
+    """
+    if stream:
+        items = async_plataforma_client.iterItems("listScripts", "listScripts", page_size=page_size)
+        return StreamingResponse(ndjson_lines(items), media_type="application/x-ndjson")
     try:
-        r = Plataforma().listScripts()
+        r = await async_plataforma_client.listScripts(page_size)
         if r["data"].get("data", None) is not None:
             script_list = r["data"]["data"]["listScripts"]["items"]
             if script_list == []:
@@ -122,7 +127,7 @@ async def getScript(
 
         graphql_variables = {script_type: query_param}
 
-        r = Plataforma().getScript(command_name, graphql_variables)
+        r = await async_plataforma_client.getScript(command_name, graphql_variables)
         final_response = Response().handle_getScript_response(getWallet_response=r)
 
         if not final_response["connection"] or not final_response.get("success", None):
@@ -153,7 +158,7 @@ async def createContract(
 
         scriptCategory = "PlutusV2"
         graphql_variables = {"walletId": wallet_id}
-        r = Plataforma().getWallet("getWalletById", graphql_variables)
+        r = await async_plataforma_client.getWallet("getWalletById", graphql_variables)
         if r["data"].get("data", None) is not None:
             walletInfo = r["data"]["data"]["getWallet"]
 
@@ -217,7 +222,7 @@ async def createContract(
             graphql_variables = {"walletId": oracle_wallet_id}
 
             # Check first that the core wallet to pay fees exists
-            r = Plataforma().getWallet(command_name, graphql_variables)
+            r = await async_plataforma_client.getWallet(command_name, graphql_variables)
             final_response = Response().handle_getWallet_response(getWallet_response=r)
 
             if not final_response["connection"] or not final_response.get("success", None):
@@ -226,13 +231,7 @@ async def createContract(
             oracleWallet = final_response["data"]
 
             seed = oracleWallet["seed"]
-            hdwallet = HDWallet.from_seed(seed)
-            child_hdwallet = hdwallet.derive_from_path("m/1852'/1815'/0'/0/0")
-
-            oracle_vkey = PaymentVerificationKey.from_primitive(
-                child_hdwallet.public_key
-            )
-            oracle_policy_id = Helpers().build_oraclePolicyId(oracle_vkey)
+            oracle_policy_id = (await wallet_keyring.aget(oracle_wallet_id, seed)).policy_id_hex
             recursion_limit(2000)
             contract = build(script_path, bytes.fromhex(oracle_policy_id))
 
@@ -246,7 +245,7 @@ async def createContract(
             graphql_variables = {"walletId": oracle_wallet_id}
 
             # Check first that the core wallet to pay fees exists
-            r = Plataforma().getWallet(command_name, graphql_variables)
+            r = await async_plataforma_client.getWallet(command_name, graphql_variables)
             final_response = Response().handle_getWallet_response(getWallet_response=r)
 
             if not final_response["connection"] or not final_response.get("success", None):
@@ -255,14 +254,7 @@ async def createContract(
             oracleWallet = final_response["data"]
 
             seed = oracleWallet["seed"]
-            hdwallet = HDWallet.from_seed(seed)
-            child_hdwallet = hdwallet.derive_from_path("m/1852'/1815'/0'/0/0")
-
-            oracle_vkey = PaymentVerificationKey.from_primitive(
-                child_hdwallet.public_key
-            )
-
-            oracle_policy_id = Helpers().build_oraclePolicyId(oracle_vkey)
+            oracle_policy_id = (await wallet_keyring.aget(oracle_wallet_id, seed)).policy_id_hex
 
             print(bytes.fromhex(oracle_policy_id))
             print(oracle_policy_id)
@@ -293,7 +285,7 @@ async def createContract(
 
             graphql_variables = {"id": policy_id}
 
-            r = Plataforma().getScript(command_name, graphql_variables)
+            r = await async_plataforma_client.getScript(command_name, graphql_variables)
             final_response = Response().handle_getScript_response(getWallet_response=r)
 
             if not final_response["connection"] or not final_response.get("success", None):
@@ -321,9 +313,14 @@ async def createContract(
 
                 variables["productID"] = project_id if project_id else None
 
-                responseScript = Plataforma().createContract(variables)
+                responseScript = await async_plataforma_client.createContract(
+                    variables, record_id=variables["id"]
+                )
                 if responseScript["success"] is True:
                     if responseScript["data"]["data"] is not None:
+                        # Scripts are immutable, keep it ready for the transactions that will use it
+                        script_registry.add(variables)
+                        local_utxo_index.register([variables["testnetAddr"]])
                         final_response = {
                             "success": True,
                             "msg": "Script created",
@@ -384,7 +381,7 @@ async def createContract(
 async def saveContracts() -> dict:
     """Save all the contracts to S3 which are available locally in the system"""
     contracts_path = Constants.PROJECT_ROOT.joinpath(Constants.CONTRACTS_DIR)
-    result = Plataforma().upload_folder(contracts_path)
+    result = plataforma_client.upload_folder(contracts_path)
     return result
 
 
@@ -396,7 +393,7 @@ async def saveContracts() -> dict:
 )
 async def listContracts() -> list:
     """List all the contracts available in S3"""
-    result = Plataforma().list_files("public/contracts")
+    result = plataforma_client.list_files("public/contracts")
     return result
 
 
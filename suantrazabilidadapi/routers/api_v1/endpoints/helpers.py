@@ -1,4 +1,4 @@
-import binascii
+import asyncio
 import logging
 from typing import Optional
 import os
@@ -10,28 +10,37 @@ import redis
 from redis.commands.search.query import Query
 from pycardano import (
     Address,
-    AssetName,
     Datum,
-    HDWallet,
     InvalidHereAfter,
     MultiAsset,
-    PaymentVerificationKey,
-    ScriptAll,
-    ScriptHash,
-    ScriptPubkey,
     TransactionBuilder,
     TransactionOutput,
     Value,
-    min_lovelace,
-    ExtendedSigningKey,
 )
 
 from suantrazabilidadapi.routers.api_v1.endpoints import pydantic_schemas
-from suantrazabilidadapi.utils.blockchain import CardanoNetwork
+from suantrazabilidadapi.utils.asset_index import AssetIndex
+from suantrazabilidadapi.utils.blockchain import CardanoNetwork, chain_contexts
+from suantrazabilidadapi.utils.min_utxo import min_utxo_calculator
+from suantrazabilidadapi.utils.dataloader import PlataformaLoader
 from suantrazabilidadapi.utils.generic import Constants
-from suantrazabilidadapi.utils.plataforma import Helpers, Plataforma
+from suantrazabilidadapi.utils.health import backend_monitor
+from suantrazabilidadapi.utils.keyring import wallet_keyring
+from suantrazabilidadapi.utils.oracle_resolver import oracle_references
+from suantrazabilidadapi.utils.plataforma import Helpers, async_plataforma_client
+from suantrazabilidadapi.utils.protocol_params import protocol_params_cache
+from suantrazabilidadapi.utils.cache import wallet_cache
+from suantrazabilidadapi.utils.script_eval import script_evaluator
+from suantrazabilidadapi.utils.tx_cache import confirmed_txs
+from suantrazabilidadapi.utils.rate_limit import blockfrost_limiter
+from suantrazabilidadapi.utils.asset_cache import policy_assets
+from suantrazabilidadapi.utils.script_registry import script_registry
+from suantrazabilidadapi.utils.spend_reservations import pending_spends
+from suantrazabilidadapi.utils.resilience import resilience
+from suantrazabilidadapi.utils.utxo_index import local_utxo_index
+from suantrazabilidadapi.utils.pools import blockfrost_executor, plataforma_async_clients, plataforma_sessions
 from suantrazabilidadapi.utils.response import Response
-from suantrazabilidadapi.utils.exception import ResponseDynamoDBException, ResponseFindingUtxo
+from suantrazabilidadapi.utils.exception import ResponseDynamoDBException, ResponseFindingUtxo, SpendConflictError
 
 
 router = APIRouter()
@@ -58,7 +67,7 @@ async def sendAccessToken(
         scriptCategory = "PlutusV2"
         script_type = "native"
         graphql_variables = {"walletId": wallet_id}
-        r = Plataforma().getWallet("getWalletById", graphql_variables)
+        r = await async_plataforma_client.getWallet("getWalletById", graphql_variables)
         if r["data"].get("data", None) is not None:
             walletInfo = r["data"]["data"]["getWallet"]
             if walletInfo is None:
@@ -70,17 +79,9 @@ async def sendAccessToken(
                 """1. Obtain the payment sk and vk from the walletInfo"""
                 ########################
                 seed = walletInfo["seed"]
-                hdwallet = HDWallet.from_seed(seed)
-                child_hdwallet = hdwallet.derive_from_path("m/1852'/1815'/0'/0/0")
-
-                payment_vk = PaymentVerificationKey.from_primitive(
-                    child_hdwallet.public_key
-                )
-                pub_key_policy = ScriptPubkey(payment_vk.hash())
-                policy = ScriptAll([pub_key_policy])
-                # Calculate policy ID, which is the hash of the policy
-                policy_id = policy.hash()
-                policy_id_str = binascii.hexlify(policy_id.payload).decode("utf-8")
+                wallet_keys = await wallet_keyring.aget(wallet_id, seed)
+                # Policy ID of the native policy signed by the wallet payment key
+                policy_id_str = wallet_keys.policy_id_hex
 
                 ########################
                 """2. Create the request in redis cache to be processed by the scheduler"""
@@ -122,7 +123,9 @@ async def sendAccessToken(
                         "token_name": token_string,
                         "marketplaceID": marketplace_id,
                     }
-                    responseScript = Plataforma().createContract(variables)
+                    responseScript = await async_plataforma_client.createContract(
+                        variables, record_id=variables["id"]
+                    )
                     # TODO: if script exists don't try to write it in dynamoDB
                     if responseScript["success"]:
                         if (
@@ -183,6 +186,37 @@ async def sendAccessToken(
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
+def destination_output(addressDestin: pydantic_schemas.AddressDestin) -> TransactionOutput:
+    address = addressDestin.address
+
+    # Get Multiassets
+    multiAsset = None
+    if addressDestin.multiAsset:
+        for multiasset in addressDestin.multiAsset:
+            policy_id = multiasset.policyid
+            tokens = multiasset.tokens
+            multiAsset = Helpers().build_multiAsset(
+                policy_id=policy_id, tq_dict=tokens
+            )
+    # Create Value type
+    if multiAsset:
+        amount = Value(addressDestin.lovelace, multiAsset)
+    else:
+        amount = Value(addressDestin.lovelace)
+
+    datum = None
+    if addressDestin.datum:
+        datum = Datum(addressDestin.datum)
+    # if not datum_hash:
+    #     datum_hash = None
+    # if not datum:
+    #     datum = None
+    # if not script:
+    #     script = None
+
+    return TransactionOutput(address=address, amount=amount, datum=datum)
+
+
 @router.post(
     "/min-lovelace/",
     status_code=201,
@@ -192,39 +226,28 @@ async def sendAccessToken(
 async def minLovelace(addressDestin: pydantic_schemas.AddressDestin) -> int:
     """Min Ada required for the utxo in lovelace \n"""
     try:
-        address = addressDestin.address
-
-        # Get Multiassets
-        multiAsset = None
-        if addressDestin.multiAsset:
-            for multiasset in addressDestin.multiAsset:
-                policy_id = multiasset.policyid
-                tokens = multiasset.tokens
-                multiAsset = Helpers().build_multiAsset(
-                    policy_id=policy_id, tq_dict=tokens
-                )
-        # Create Value type
-        if multiAsset:
-            amount = Value(addressDestin.lovelace, multiAsset)
-        else:
-            amount = Value(addressDestin.lovelace)
+        output = destination_output(addressDestin)
 
-        datum = None
-        if addressDestin.datum:
-            datum = Datum(addressDestin.datum)
-        # if not datum_hash:
-        #     datum_hash = None
-        # if not datum:
-        #     datum = None
-        # if not script:
-        #     script = None
+        # Computed offline from the cached protocol parameters
+        min_val = min_utxo_calculator.min_lovelace(None, output)
 
-        output = TransactionOutput(address=address, amount=amount, datum=datum)
+        return min_val
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
 
-        chain_context = CardanoNetwork().get_chain_context()
-        min_val = min_lovelace(chain_context, output)
 
-        return min_val
+@router.post(
+    "/min-lovelace-batch/",
+    status_code=201,
+    summary="Given the details of several utxo outputs, obtain the min ADA required by each of them",
+    response_description="Min Ada required for each utxo in lovelace, in the order given",
+)
+async def minLovelaceBatch(addressesDestin: list[pydantic_schemas.AddressDestin]) -> list[int]:
+    """Min Ada required for each utxo in lovelace \n"""
+    try:
+        outputs = [destination_output(addressDestin) for addressDestin in addressesDestin]
+
+        return min_utxo_calculator.min_lovelaces(outputs)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
 
@@ -251,6 +274,70 @@ async def getFeeFromCbor(txcbor: str) -> int:
         raise HTTPException(status_code=400, detail=str(e)) from e
 
 
+@router.get(
+    "/backend-stats/",
+    status_code=200,
+    summary="Usage statistics of the connection pools towards Plataforma backend",
+    response_description="Requests sent, connections opened and idle connections per application",
+)
+async def backendStats() -> dict:
+    """Usage statistics of the connection pools towards Plataforma backend \n"""
+    return {
+        "plataforma_pools": plataforma_sessions.stats(),
+        "plataforma_async_clients": plataforma_async_clients.stats(),
+        "blockfrost_executor": blockfrost_executor.stats(),
+        "blockfrost_limiter": blockfrost_limiter.stats(),
+        "wallet_cache": wallet_cache.stats(),
+        "script_registry": script_registry.stats(),
+        "resilience": resilience.stats(),
+        "keyring": wallet_keyring.stats(),
+        "chain_contexts": chain_contexts.stats(),
+        "protocol_params": protocol_params_cache.stats(),
+        "utxo_index": local_utxo_index.stats(),
+        "pending_spends": pending_spends.stats(),
+        "oracle_references": oracle_references.stats(),
+        "min_utxo": min_utxo_calculator.stats(),
+        "script_evaluation": script_evaluator.stats(),
+        "tx_cache": confirmed_txs.stats(),
+        "policy_assets": policy_assets.stats(),
+    }
+
+
+@router.get(
+    "/backend-health/",
+    status_code=200,
+    summary="Health of the chain backends and the one used to build transactions",
+    response_description="Backend in use, switches and rolling probe statistics per backend",
+)
+async def backendHealth() -> dict:
+    """Health of Ogmios and Blockfrost as probed in the background, and the backend chosen for new chain contexts \n"""
+    return backend_monitor.status()
+
+
+@router.get(
+    "/protocol-params/",
+    status_code=200,
+    summary="Protocol and genesis parameters cached for the current epoch",
+    response_description="Cached parameters with their epoch and age",
+)
+async def protocolParams(refresh: bool = False) -> dict:
+    """Protocol and genesis parameters cached for the current epoch \n
+    With refresh, the epoch is checked against the chain first
+    """
+    try:
+        if refresh:
+            chain_context = CardanoNetwork().get_chain_context()
+            entry = await asyncio.to_thread(protocol_params_cache.get, chain_context)
+        else:
+            entry = protocol_params_cache.peek()
+        if entry is None:
+            return {"success": False, "msg": "No protocol parameters cached yet"}
+        return {"success": True, "data": entry.view()}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
 @router.post(
     "/oracle-datum/{action}",
     status_code=201,
@@ -267,9 +354,12 @@ async def oracleDatum(
 ) -> dict:
     try:
 
-        # Check first that the core wallet to pay fees exists
-        graphql_variables = {"walletId": core_wallet_id}
-        r = Plataforma().getWallet("getWalletById", graphql_variables)
+        # Check first that the core wallet to pay fees exists; both wallets are fetched in one query
+        loader = PlataformaLoader()
+        r, oracle_r = await asyncio.gather(
+            loader.getWallet("getWalletById", {"walletId": core_wallet_id}),
+            loader.getWallet("getWalletById", {"walletId": oracle_wallet_id}),
+        )
         final_response = Response().handle_getWallet_response(getWallet_response=r)
 
         if not final_response.get("data", None):
@@ -281,12 +371,10 @@ async def oracleDatum(
 
         # Get core wallet params
         seed = coreWalletInfo["seed"]
-        hdwallet = HDWallet.from_seed(seed)
-        child_hdwallet = hdwallet.derive_from_path("m/1852'/1815'/0'/0/0")
-        core_skey = ExtendedSigningKey.from_hdwallet(child_hdwallet)
+        core_skey = (await wallet_keyring.aget(core_wallet_id, seed)).signing_key
         core_address = Address.from_primitive(coreWalletInfo["address"])
 
-        oracleWalletResponse = Response().handle_getWallet_response(Plataforma().getWallet("id", oracle_wallet_id))
+        oracleWalletResponse = Response().handle_getWallet_response(getWallet_response=oracle_r)
 
         if not oracleWalletResponse.get("data", None):
             raise ResponseDynamoDBException(
@@ -295,16 +383,11 @@ async def oracleDatum(
         oracleWallet = oracleWalletResponse["data"]
         oracle_address = oracleWallet["address"]
         seed = oracleWallet["seed"]
-        hdwallet = HDWallet.from_seed(seed)
-        child_hdwallet = hdwallet.derive_from_path("m/1852'/1815'/0'/0/0")
+        oracle_keys = await wallet_keyring.aget(oracle_wallet_id, seed)
+        oracle_skey = oracle_keys.signing_key
 
-        oracle_skey = ExtendedSigningKey.from_hdwallet(child_hdwallet)
-
-        oracle_vkey = PaymentVerificationKey.from_primitive(
-            child_hdwallet.public_key
-        )
-
-        chain_context = CardanoNetwork().get_chain_context()
+        # Inputs of the core wallet already spent by in-flight transactions are left out
+        chain_context = pending_spends.context(CardanoNetwork().get_chain_context())
 
         # Create a transaction builder
         builder = TransactionBuilder(chain_context)
@@ -322,12 +405,9 @@ async def oracleDatum(
         ########################
         """3. Create the script and policy"""
         ########################
-        # A policy that requires a signature from the policy key we generated above
-        pub_key_policy = ScriptPubkey(oracle_vkey.hash())
-        # Combine two policies using ScriptAll policy
-        policy = ScriptAll([pub_key_policy])
-        # Calculate policy ID, which is the hash of the policy
-        policy_id = policy.hash()
+        # A policy that requires a signature from the oracle key, as kept by the keyring
+        policy = oracle_keys.policy
+        policy_id = oracle_keys.policy_id
         print(f"Policy ID: {policy_id}")
         with open(Constants().PROJECT_ROOT / "policy.id", "a+", encoding="utf-8") as f:
             f.truncate(0)
@@ -355,15 +435,10 @@ async def oracleDatum(
             msg = f"{oracle_token_name} minted to store oracle data info in datum for Suan"
         else:
             oracle_utxo = None
-            for utxo in chain_context.utxos(oracle_address):
-
-                def f1(pi: ScriptHash, an: AssetName, a: int) -> bool:
-                    return pi == policy_id and an.payload == tokenName and a == 1
+            for utxo in AssetIndex.of(chain_context, oracle_address).holding(policy_id, tokenName):
+                oracle_utxo = utxo
 
-                if utxo.output.amount.multi_asset.count(f1):
-                    oracle_utxo = utxo
-
-                    builder.add_input(oracle_utxo)
+                builder.add_input(oracle_utxo)
 
             msg = "Oracle datum updated"
 
@@ -384,10 +459,10 @@ async def oracleDatum(
 
         datum = pydantic_schemas.DatumOracle(
             value_dict=value_dict,
-            identifier=bytes.fromhex(str(oracle_vkey.hash())),
+            identifier=oracle_keys.vkey_hash.payload,
             validity=oracle_data.validity,
         )
-        min_val = min_lovelace(
+        min_val = min_utxo_calculator.min_lovelace(
             chain_context,
             output=TransactionOutput(oracle_address, Value(0, my_nft), datum=datum),
         )
@@ -395,13 +470,12 @@ async def oracleDatum(
             TransactionOutput(oracle_address, Value(min_val, my_nft), datum=datum)
         )
 
-        signed_tx = builder.build_and_sign(
-            [oracle_skey, core_skey], change_address=core_address
+        # Sign and submit the transaction, built again if a concurrent one took its inputs
+        tx_id = pending_spends.build_and_submit(
+            chain_context, builder, [oracle_skey, core_skey], core_address
         )
-
-        # Submit signed transaction to the network
-        tx_id = signed_tx.transaction_body.hash().hex()
-        chain_context.submit_tx(signed_tx)
+        # The oracle UTxO cached for buy transactions is the one just spent
+        oracle_references.invalidate(oracle_wallet_id)
 
         logging.info(f"transaction id: {tx_id}")
         logging.info(f"https://preview.cardanoscan.io/transaction/{tx_id}")
@@ -420,6 +494,8 @@ async def oracleDatum(
 
     except ResponseFindingUtxo as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
+    except SpendConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
     except ResponseDynamoDBException as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
     except Exception as e:
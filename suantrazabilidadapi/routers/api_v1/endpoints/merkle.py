@@ -6,17 +6,9 @@ import logging
 from fastapi import APIRouter, HTTPException
 from pymerkle import DynamoDBTree, verify_inclusion
 from pycardano import (
-    HDWallet,
-    ExtendedSigningKey,
     Address,
-    PaymentVerificationKey,
     TransactionBuilder,
-    ScriptPubkey,
-    ScriptAll,
     MultiAsset,
-    ScriptHash,
-    AssetName,
-    min_lovelace,
     TransactionOutput,
     Value,
     AuxiliaryData,
@@ -26,11 +18,15 @@ from pycardano import (
 )
 
 from suantrazabilidadapi.routers.api_v1.endpoints import pydantic_schemas
+from suantrazabilidadapi.utils.asset_index import AssetIndex
 from suantrazabilidadapi.utils.blockchain import CardanoNetwork
-from suantrazabilidadapi.utils.exception import ResponseDynamoDBException, ResponseFindingUtxo
+from suantrazabilidadapi.utils.min_utxo import min_utxo_calculator
+from suantrazabilidadapi.utils.exception import ResponseDynamoDBException, ResponseFindingUtxo, SpendConflictError
 from suantrazabilidadapi.utils.generic import Constants
-from suantrazabilidadapi.utils.plataforma import CardanoApi, Plataforma
+from suantrazabilidadapi.utils.keyring import wallet_keyring
+from suantrazabilidadapi.utils.plataforma import CardanoApi, async_plataforma_client
 from suantrazabilidadapi.utils.response import Response
+from suantrazabilidadapi.utils.spend_reservations import pending_spends
 
 router = APIRouter()
 
@@ -39,7 +35,7 @@ async def admin_call():
     command_name = "getWalletAdmin"
     graphql_variables = {"isAdmin": True}
 
-    listWallet_response = Plataforma().getWallet(command_name, graphql_variables)
+    listWallet_response = await async_plataforma_client.getWallet(command_name, graphql_variables)
 
     final_response = Response().handle_listWallets_response(listWallets_response=listWallet_response)
 
@@ -83,17 +79,12 @@ async def merkleTree(action: pydantic_schemas.OracleAction, project_id: str, bod
 
             # Get core wallet params
             seed = coreWalletInfo["seed"]
-            hdwallet = HDWallet.from_seed(seed)
-            child_hdwallet = hdwallet.derive_from_path("m/1852'/1815'/0'/0/0")
-
-            core_skey = ExtendedSigningKey.from_hdwallet(child_hdwallet)
+            core_keys = await wallet_keyring.aget(coreWalletInfo["id"], seed)
+            core_skey = core_keys.signing_key
             core_address = Address.from_primitive(coreWalletInfo["address"])
 
-            core_vkey = PaymentVerificationKey.from_primitive(
-                            child_hdwallet.public_key
-                        )
-
-            chain_context = CardanoNetwork().get_chain_context()
+            # Inputs of the core wallet already spent by in-flight transactions are left out
+            chain_context = pending_spends.context(CardanoNetwork().get_chain_context())
 
             # Create a transaction builder
             builder = TransactionBuilder(chain_context)
@@ -104,10 +95,8 @@ async def merkleTree(action: pydantic_schemas.OracleAction, project_id: str, bod
             ########################
             """Create the native script and policy from the pubkey"""
             ########################
-            pub_key_policy = ScriptPubkey(core_vkey.hash())
-            policy = ScriptAll([pub_key_policy])
-            # Calculate policy ID, which is the hash of the policy
-            policy_id = policy.hash()
+            policy = core_keys.policy
+            policy_id = core_keys.policy_id
             native_scripts = [policy]
 
             # Set native script
@@ -132,15 +121,10 @@ async def merkleTree(action: pydantic_schemas.OracleAction, project_id: str, bod
                 msg = f"{merkle_token_name} minted to store merkle root for project {project_id}"
             else:
                 merkle_utxo = None
-                for utxo in chain_context.utxos(core_address):
-
-                    def f1(pi: ScriptHash, an: AssetName, a: int) -> bool:
-                        return pi == policy_id and an.payload == tokenName and a == 1
+                for utxo in AssetIndex.of(chain_context, core_address).holding(policy_id, tokenName):
+                    merkle_utxo = utxo
 
-                    if utxo.output.amount.multi_asset.count(f1):
-                        merkle_utxo = utxo
-
-                        builder.add_input(merkle_utxo)
+                    builder.add_input(merkle_utxo)
 
                 # Check if merkle_utxo exists and is found
                 if not merkle_utxo:
@@ -148,7 +132,7 @@ async def merkleTree(action: pydantic_schemas.OracleAction, project_id: str, bod
                         f"Utxo for oracle token name {merkle_token_name} could not be found in {core_address}"
                     )
 
-            min_val = min_lovelace(
+            min_val = min_utxo_calculator.min_lovelace(
                 chain_context,
                 output=TransactionOutput(core_address, Value(0, my_nft)),
             )
@@ -187,13 +171,10 @@ async def merkleTree(action: pydantic_schemas.OracleAction, project_id: str, bod
             builder.auxiliary_data = auxiliary_data
 
 
-            signed_tx = builder.build_and_sign(
-                [core_skey], change_address=core_address
+            # Sign and submit the transaction, built again if a concurrent one took its inputs
+            tx_id = pending_spends.build_and_submit(
+                chain_context, builder, [core_skey], core_address
             )
-
-            # Submit signed transaction to the network
-            tx_id = signed_tx.transaction_body.hash().hex()
-            chain_context.submit_tx(signed_tx)
             
 
         final_response = {
@@ -206,6 +187,8 @@ async def merkleTree(action: pydantic_schemas.OracleAction, project_id: str, bod
             "tx_id": tx_id,
         }
         return final_response
+    except SpendConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
     except Exception as e:
@@ -233,15 +216,7 @@ async def verifyInclusion(project_id: str, index: Union[int, None] = None, body:
 
             coreWalletInfo = final_response["data"]["items"][0]
             seed = coreWalletInfo["seed"]
-            hdwallet = HDWallet.from_seed(seed)
-            child_hdwallet = hdwallet.derive_from_path("m/1852'/1815'/0'/0/0")
-            core_vkey = PaymentVerificationKey.from_primitive(
-                    child_hdwallet.public_key
-                )
-            pub_key_policy = ScriptPubkey(core_vkey.hash())
-            policy = ScriptAll([pub_key_policy])
-            # Calculate policy ID, which is the hash of the policy
-            policy_id = policy.hash()
+            policy_id = (await wallet_keyring.aget(coreWalletInfo["id"], seed)).policy_id
             # Concatenate the policy_id with the token name
             asset_name = policy_id.payload.hex() + binascii.hexlify(bytes(tree.table_name, 'utf-8')).decode('utf-8')
             cardanoApi = CardanoApi()
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException
 
 from suantrazabilidadapi.routers.api_v1.endpoints import pydantic_schemas
-from suantrazabilidadapi.utils.plataforma import Plataforma
+from suantrazabilidadapi.utils.plataforma import async_plataforma_client
 
 router = APIRouter()
 
@@ -63,7 +63,7 @@ async def getProject(
         if command_name == "id":
             # Validate the id
 
-            r = Plataforma().getProject(command_name, query_param)
+            r = await async_plataforma_client.getProject(command_name, query_param)
 
             if r["data"].get("data", None) is not None:
                 projectInfo = r["data"]["data"]["getProduct"]
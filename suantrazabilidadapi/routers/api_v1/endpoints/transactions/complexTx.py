@@ -1,4 +1,3 @@
-import functools
 import logging
 
 from fastapi import APIRouter, HTTPException
@@ -14,15 +13,16 @@ from pycardano import (
     TransactionOutput,
     Value,
     VerificationKeyHash,
-    min_lovelace,
-    plutus_script_hash,
-    PlutusV2Script
 )
 
 from suantrazabilidadapi.routers.api_v1.endpoints import pydantic_schemas
+from suantrazabilidadapi.utils.asset_index import AssetIndex
 from suantrazabilidadapi.utils.blockchain import CardanoNetwork
-from suantrazabilidadapi.utils.plataforma import CardanoApi, Helpers, Plataforma, RedisClient
+from suantrazabilidadapi.utils.min_utxo import min_utxo_calculator
+from suantrazabilidadapi.utils.oracle_resolver import oracle_references
+from suantrazabilidadapi.utils.plataforma import Helpers, RedisClient, async_plataforma_client, plataforma_client
 from suantrazabilidadapi.utils.response import Response
+from suantrazabilidadapi.utils.script_registry import script_registry
 from suantrazabilidadapi.utils.exception import ResponseProcessingError, ResponseDynamoDBException
 
 router = APIRouter()
@@ -46,7 +46,7 @@ async def mintTokens(
 
         graphql_variables = {"walletId": send.wallet_id}
 
-        r = Plataforma().getWallet(command_name, graphql_variables)
+        r = await async_plataforma_client.getWallet(command_name, graphql_variables)
         final_response = Response().handle_getWallet_response(getWallet_response=r)
         
         if not final_response["connection"] or not final_response.get("success", None):
@@ -87,23 +87,11 @@ async def mintTokens(
             signatures.append(VerificationKeyHash(pkh))
 
             # Consultar en base de datos
-            command_name = "getScriptById"
+            scriptRecord = await script_registry.get(send.mint.asset.policyid)
 
-            graphql_variables = {"id": send.mint.asset.policyid}
+            plutus_script = scriptRecord.plutus_script
 
-            r = Plataforma().getScript(command_name, graphql_variables)
-            final_response = Response().handle_getScript_response(getWallet_response=r)
-
-            if not final_response["connection"] or not final_response.get("success", None):
-                raise ResponseDynamoDBException(final_response["data"])
-
-            scriptInfo = final_response["data"]
-
-            cbor_hex = scriptInfo.get("cbor", None)
-            cbor = bytes.fromhex(cbor_hex)
-            plutus_script = PlutusV2Script(cbor)
-
-            script_hash = plutus_script_hash(plutus_script)
+            script_hash = scriptRecord.script_hash
             logging.info(f"script_hash: {script_hash}")
 
             # Redeemer action
@@ -126,55 +114,19 @@ async def mintTokens(
 
             # If burn, insert the utxo that contains the asset
             amount = 0
+            assets = None
             for tn_bytes, amount in tokens_bytes.items():
                 if amount < 0:
-                    burn_utxo = None
-                    candidate_burn_utxo = []
-                    for utxo in chain_context.utxos(master_address):
-
-                        f = functools.partial(
-                            lambda pi, an, a, script_hash, tn_bytes, amount: (
-                                pi == script_hash
-                                and an.payload == tn_bytes  # Type: Ignore
-                                and a >= -amount
-                            ),
-                            script_hash=script_hash,
-                            tn_bytes=tn_bytes,
-                            amount=amount
+                    if assets is None:
+                        # Index the tokens of the wallet once for every token to burn
+                        assets = AssetIndex.of(chain_context, master_address)
+                    burn_utxos = assets.cover(script_hash, tn_bytes, -amount)
+                    if not burn_utxos:
+                        raise ValueError(
+                            "UTxO containing token to burn not found!"
                         )
-
-                        if utxo.output.amount.multi_asset.count(f):
-                            burn_utxo = utxo
-
-                            builder.add_input(burn_utxo)
-
-                    if not burn_utxo:
-                        q = 0
-                        for utxo in chain_context.utxos(master_address):
-
-                            f1 = functools.partial(
-                                lambda pi, an, script_hash, tn_bytes: (
-                                    pi == script_hash and an.payload == tn_bytes
-                                ),
-                                script_hash=script_hash,
-                                tn_bytes=tn_bytes
-                            )
-
-                            if utxo.output.amount.multi_asset.count(f1):
-                                candidate_burn_utxo.append(utxo)
-                                union_multiasset = (
-                                    utxo.output.amount.multi_asset.data
-                                )
-                                for asset in union_multiasset.values():
-                                    q += int(list(asset.data.values())[0])
-
-                        if q >= -amount:
-                            for x in candidate_burn_utxo:
-                                builder.add_input(x)
-                        else:
-                            raise ValueError(
-                                "UTxO containing token to burn not found!"
-                            )
+                    for burn_utxo in burn_utxos:
+                        builder.add_input(burn_utxo)
 
         builder.required_signers = signatures
 
@@ -207,7 +159,7 @@ async def mintTokens(
                         pkh=address.datum.beneficiary
                     )
                 # Calculate the minimum amount of lovelace that need to be transfered in the utxo
-                min_val = min_lovelace(
+                min_val = min_utxo_calculator.min_lovelace(
                     chain_context,
                     output=TransactionOutput(
                         Address.decode(address.address),
@@ -234,7 +186,7 @@ async def mintTokens(
         else:
             if amount > 0:
                 # Calculate the minimum amount of lovelace to be transfered in the utxo
-                min_val = min_lovelace(
+                min_val = min_utxo_calculator.min_lovelace(
                     chain_context,
                     output=TransactionOutput(
                         master_address, Value(0, mint_multiassets), datum=datum
@@ -253,17 +205,10 @@ async def mintTokens(
         redeemers = builder.redeemers()
 
         # Processing the tx body
-        format_body = Plataforma().formatTxBody(build_body)
-
-        utxo_list_info = []
-        for utxo in build_body.inputs:
-            utxo_details = CardanoApi().getUtxoInfo(utxo.to_cbor_hex()[6:70])
-            for utxo_output in utxo_details["outputs"]:
-                if utxo_output["output_index"] == utxo.index:
-                    utxo_output["utxo_hash"] = (
-                        f"{utxo.to_cbor_hex()[6:70]}#{utxo.index}"
-                    )
-                    utxo_list_info.append(utxo_output)
+        format_body = plataforma_client.formatTxBody(build_body)
+
+        # Details of the inputs from the UTxOs the builder selected
+        utxo_list_info = Helpers().utxos_info(build_body.inputs, builder.inputs)
 
         final_response = {
             "success": True,
@@ -308,7 +253,7 @@ async def claimTx(
 
         graphql_variables = {"walletId": claim.wallet_id}
 
-        r = Plataforma().getWallet(command_name, graphql_variables)
+        r = await async_plataforma_client.getWallet(command_name, graphql_variables)
         final_response = Response().handle_getWallet_response(getWallet_response=r)
         
         if not final_response["connection"] or not final_response.get("success", None):
@@ -366,20 +311,10 @@ async def claimTx(
         parent_mint_policyID = ""
 
         # Consultar en base de datos
-        command_name = "getScriptById"
-
-        graphql_variables = {"id": claim.spendPolicyId}
-
-        r = Plataforma().getScript(command_name, graphql_variables)
-        final_response = Response().handle_getScript_response(getWallet_response=r)
+        scriptInfo = await script_registry.get(claim.spendPolicyId)
 
-        if not final_response["connection"] or not final_response.get("success", None):
-            raise ResponseDynamoDBException(final_response["data"])
-        
-        scriptInfo = final_response["data"]
-
-        testnet_address = scriptInfo.get("testnetAddr", None)
-        cbor_hex = scriptInfo.get("cbor", None)
+        testnet_address = scriptInfo.testnet_address
+        plutus_script = scriptInfo.plutus_script
         parent_mint_policyID = scriptInfo.get("scriptParentID", None)
         tokenName = scriptInfo.get("token_name", None)
 
@@ -407,7 +342,7 @@ async def claimTx(
             multi_asset_value = Value(0, multi_asset)
 
             # Calculate the minimum amount of lovelace that need to be transfered in the utxo
-            min_val = min_lovelace(
+            min_val = min_utxo_calculator.min_lovelace(
                 chain_context,
                 output=TransactionOutput(
                     Address.decode(address.address),
@@ -441,41 +376,14 @@ async def claimTx(
 
         # Section to handle and calculate the script
         # Get script utxo to spend where tokens are located
-        utxo_from_contract = []
         tn_bytes = bytes(tokenName, encoding="utf-8")
         # amount = quantity_request
-        utxos_found = False
-
-        # Find the utxo to spend
-        for utxo in chain_context.utxos(testnet_address):
-
-            def f(pi: ScriptHash, an: AssetName, a: int) -> bool:
-                return (
-                    pi == script_hash
-                    and an.payload == tn_bytes
-                    and a >= quantity_request
-                )
 
-            if utxo.output.amount.multi_asset.count(f):
-                utxo_from_contract.append(utxo)
-                utxos_found = True
-                break
-
-        if not utxo_from_contract:
-            q = 0
-            for utxo in chain_context.utxos(testnet_address):
-
-                def f1(pi: ScriptHash, an: AssetName) -> bool:
-                    return pi == script_hash and an.payload == tn_bytes
-
-                if utxo.output.amount.multi_asset.count(f1):
-                    utxo_from_contract.append(utxo)
-                    union_multiasset = utxo.output.amount.multi_asset.data
-                    for asset in union_multiasset.values():
-                        q += int(list(asset.data.values())[0])
-                    if q >= quantity_request:
-                        utxos_found = True
-                        break
+        # Find the utxos to spend: the smallest one holding the quantity, or the fewest that add up to it
+        utxo_from_contract = AssetIndex.of(chain_context, testnet_address).cover(
+            script_hash, tn_bytes, quantity_request
+        )
+        utxos_found = bool(utxo_from_contract)
 
         assert utxos_found, "UTxO not found to spend!"
         logging.info(
@@ -494,8 +402,6 @@ async def claimTx(
 
             beneficiary = x.output.datum.cbor.hex()[10:-2]
             datum = Helpers().build_DatumProjectParams(pkh=beneficiary)
-            cbor = bytes.fromhex(cbor_hex)
-            plutus_script = PlutusV2Script(cbor)
 
             builder.add_script_input(
                 x, plutus_script, redeemer=Redeemer(redeemer)
@@ -513,7 +419,7 @@ async def claimTx(
             multi_asset_value_to_contract = Value(0, multi_asset_to_contract)
 
             # Calculate the minimum amount of lovelace that need to be transfered in the utxo
-            min_val = min_lovelace(
+            min_val = min_utxo_calculator.min_lovelace(
                 chain_context,
                 output=TransactionOutput(
                     Address.decode(testnet_address),
@@ -530,7 +436,7 @@ async def claimTx(
             )
         # End of the contract implementation
 
-        oracle_utxo = Helpers().build_reference_input_oracle(
+        oracle_utxo = await oracle_references.reference_input(
             chain_context, oracle_wallet_id
         )
 
@@ -552,22 +458,10 @@ async def claimTx(
         redeemers = builder.redeemers()
 
         # Processing the tx body
-        format_body = Plataforma().formatTxBody(build_body)
-
-        utxo_list_info = []
-        for utxo in build_body.inputs:
-            utxo_details = CardanoApi().getUtxoInfo(utxo.to_cbor_hex()[6:70])
-            for utxo_output in utxo_details["outputs"]:
-                if utxo_output["output_index"] == utxo.index:
-                    utxo_output["utxo_hash"] = (
-                        f"{utxo.to_cbor_hex()[6:70]}#{utxo.index}"
-                    )
-                    utxo_list_info.append(utxo_output)
-            # utxo_list_info.append(utxo_details)
-            # transaction_id = f"{utxo.to_cbor_hex()[6:70]}#{utxo.index}"
-            # transaction_id_list.append(transaction_id)
+        format_body = plataforma_client.formatTxBody(build_body)
 
-        # utxo_list_info = CardanoApi().getUtxoInfo(transaction_id_list, True)
+        # Details of the inputs from the UTxOs the builder selected
+        utxo_list_info = Helpers().utxos_info(build_body.inputs, builder.inputs)
 
         final_response = {
             "success": True,
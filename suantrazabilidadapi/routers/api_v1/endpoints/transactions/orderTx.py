@@ -6,20 +6,19 @@ from pycardano import (
     Address,
     AuxiliaryData,
     InvalidHereAfter,
-    PlutusV2Script,
     Redeemer,
     TransactionBuilder,
     TransactionOutput,
     Value,
     VerificationKeyHash,
-    min_lovelace,
 )
 
 from suantrazabilidadapi.routers.api_v1.endpoints import pydantic_schemas
 from suantrazabilidadapi.utils.blockchain import CardanoNetwork
-from suantrazabilidadapi.utils.plataforma import CardanoApi, Helpers, Plataforma
-from suantrazabilidadapi.utils.exception import ResponseDynamoDBException
-from suantrazabilidadapi.utils.response import Response
+from suantrazabilidadapi.utils.min_utxo import min_utxo_calculator
+from suantrazabilidadapi.utils.oracle_resolver import oracle_references
+from suantrazabilidadapi.utils.plataforma import Helpers, async_plataforma_client, plataforma_client
+from suantrazabilidadapi.utils.script_registry import script_registry
 
 router = APIRouter()
 
@@ -39,7 +38,7 @@ async def createOrder(
         """1. Get wallet info"""
         ########################
         graphql_variables = {"walletId": order.wallet_id}
-        r = Plataforma().getWallet("getWalletById", graphql_variables)
+        r = await async_plataforma_client.getWallet("getWalletById", graphql_variables)
         if r["data"].get("data", None) is not None:
             userWalletInfo = r["data"]["data"]["getWallet"]
             if userWalletInfo is None:
@@ -93,21 +92,10 @@ async def createOrder(
 
                 # Get the contract address and cbor from policyId
                 # Consultar en base de datos
-                command_name = "getScriptById"
+                contractInfo = await script_registry.get(order.orderPolicyId)
+                order_address = contractInfo.testnet_address
 
-                graphql_variables = {"id": order.orderPolicyId}
-
-                r = Plataforma().getScript(command_name, graphql_variables)
-                final_response = Response().handle_getScript_response(getWallet_response=r)
-
-
-                if not final_response["connection"] or not final_response.get("success", None):
-                    raise ResponseDynamoDBException(final_response["data"])
-
-                contractInfo = final_response["data"]
-                order_address = contractInfo.get("testnetAddr", None)
-
-                min_val = min_lovelace(
+                min_val = min_utxo_calculator.min_lovelace(
                     chain_context,
                     output=TransactionOutput(
                         order_address, Value(0, multi_asset), datum=datum
@@ -137,19 +125,12 @@ async def createOrder(
                 tx_cbor = build_body.to_cbor_hex()
 
                 # Processing the tx body
-                format_body = Plataforma().formatTxBody(
+                format_body = plataforma_client.formatTxBody(
                     build_body
                 )  # TODO: sacar de acá el index del utxo
 
-                utxo_list_info = []
-                for utxo in build_body.inputs:
-                    utxo_details = CardanoApi().getUtxoInfo(utxo.to_cbor_hex()[6:70])
-                    for utxo_output in utxo_details["outputs"]:
-                        if utxo_output["output_index"] == utxo.index:
-                            utxo_output["utxo_hash"] = (
-                                f"{utxo.to_cbor_hex()[6:70]}#{utxo.index}"
-                            )
-                            utxo_list_info.append(utxo_output)
+                # Details of the inputs from the UTxOs the builder selected
+                utxo_list_info = Helpers().utxos_info(build_body.inputs, builder.inputs)
 
                 final_response = {
                     "success": True,
@@ -199,7 +180,7 @@ async def unlockOrder(
         ########################
         graphql_variables = {"walletId": order.wallet_id}
 
-        r = Plataforma().getWallet("getWalletById", graphql_variables)
+        r = await async_plataforma_client.getWallet("getWalletById", graphql_variables)
         if r["data"].get("data", None) is not None:
             userWalletInfo = r["data"]["data"]["getWallet"]
             if userWalletInfo is None:
@@ -227,19 +208,8 @@ async def unlockOrder(
 
                 # Get the contract address and cbor from policyId
                 # Consultar en base de datos
-                command_name = "getScriptById"
-
-                graphql_variables = {"id": order.orderPolicyId}
-
-                r = Plataforma().getScript(command_name, graphql_variables)
-                final_response = Response().handle_getScript_response(getWallet_response=r)
-
-                if not final_response["connection"] or not final_response.get("success", None):
-                    raise ResponseDynamoDBException(final_response["data"])
-
-                contractInfo = final_response["data"]
-                order_address = contractInfo.get("testnetAddr", None)
-                cbor_hex = contractInfo.get("cbor", None)
+                contractInfo = await script_registry.get(order.orderPolicyId)
+                order_address = contractInfo.testnet_address
 
                 # Redeemer action
                 if order_side == "Buy":
@@ -259,8 +229,7 @@ async def unlockOrder(
                         chain_context, order_address, transaction_id, index
                     )
                     if utxo_results[0]:
-                        cbor = bytes.fromhex(cbor_hex)
-                        plutus_script = PlutusV2Script(cbor)
+                        plutus_script = contractInfo.plutus_script
                         builder.add_script_input(
                             utxo=utxo_results[1],
                             script=plutus_script,
@@ -271,7 +240,7 @@ async def unlockOrder(
                 else:
                     raise ValueError("No utxo found in body message")
 
-                oracle_utxo = Helpers().build_reference_input_oracle(
+                oracle_utxo = await oracle_references.reference_input(
                     chain_context, oracle_wallet_id
                 )
 
@@ -295,7 +264,7 @@ async def unlockOrder(
                     datum = None
 
                     # Calculate the minimum amount of lovelace that need to be transfered in the utxo
-                    min_val = min_lovelace(
+                    min_val = min_utxo_calculator.min_lovelace(
                         chain_context,
                         output=TransactionOutput(
                             Address.decode(address.address),
@@ -332,17 +301,10 @@ async def unlockOrder(
                 # redeemers = tmp_builder.redeemers
 
                 # Processing the tx body
-                format_body = Plataforma().formatTxBody(build_body)
-
-                utxo_list_info = []
-                for utxo in build_body.inputs:
-                    utxo_details = CardanoApi().getUtxoInfo(utxo.to_cbor_hex()[6:70])
-                    for utxo_output in utxo_details["outputs"]:
-                        if utxo_output["output_index"] == utxo.index:
-                            utxo_output["utxo_hash"] = (
-                                f"{utxo.to_cbor_hex()[6:70]}#{utxo.index}"
-                            )
-                            utxo_list_info.append(utxo_output)
+                format_body = plataforma_client.formatTxBody(build_body)
+
+                # Details of the inputs from the UTxOs the builder selected
+                utxo_list_info = Helpers().utxos_info(build_body.inputs, builder.inputs)
 
                 final_response = {
                     "success": True,
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from typing import Dict, List, Optional
 
@@ -7,11 +8,8 @@ from pycardano import (
     AuxiliaryData,
     Datum,
     DatumHash,
-    ExtendedSigningKey,
-    HDWallet,
     Metadata,
     NativeScript,
-    PaymentVerificationKey,
     PlutusV1Script,
     PlutusV2Script,
     Redeemer,
@@ -25,9 +23,10 @@ from pycardano import (
 
 from suantrazabilidadapi.routers.api_v1.endpoints import pydantic_schemas
 from suantrazabilidadapi.utils.blockchain import CardanoNetwork
-from suantrazabilidadapi.utils.plataforma import Plataforma
-from suantrazabilidadapi.utils.exception import ResponseDynamoDBException
-from suantrazabilidadapi.utils.response import Response
+from suantrazabilidadapi.utils.dataloader import PlataformaLoader
+from suantrazabilidadapi.utils.keyring import wallet_keyring
+from suantrazabilidadapi.utils.plataforma import async_plataforma_client
+from suantrazabilidadapi.utils.script_registry import script_registry
 
 router = APIRouter()
 
@@ -45,7 +44,7 @@ async def sign_submit(signSubmit: pydantic_schemas.SignSubmit) -> dict:
         ########################
         graphql_variables = {"walletId": signSubmit.wallet_id}
 
-        r = Plataforma().getWallet("getWalletById", graphql_variables)
+        r = await async_plataforma_client.getWallet("getWalletById", graphql_variables)
         if r["data"].get("data", None) is not None:
             walletInfo = r["data"]["data"]["getWallet"]
             if walletInfo is None:
@@ -56,14 +55,9 @@ async def sign_submit(signSubmit: pydantic_schemas.SignSubmit) -> dict:
                 }
             else:
                 seed = walletInfo["seed"]
-                hdwallet = HDWallet.from_seed(seed)
-                child_hdwallet = hdwallet.derive_from_path("m/1852'/1815'/0'/0/0")
-
-                payment_skey = ExtendedSigningKey.from_hdwallet(child_hdwallet)
-
-                payment_vk = PaymentVerificationKey.from_primitive(
-                    child_hdwallet.public_key
-                )
+                wallet_keys = await wallet_keyring.aget(signSubmit.wallet_id, seed)
+                payment_skey = wallet_keys.signing_key
+                payment_vk = wallet_keys.verification_key
 
                 ########################
                 """2. Build transaction"""
@@ -90,26 +84,14 @@ async def sign_submit(signSubmit: pydantic_schemas.SignSubmit) -> dict:
                             redeemers = RedeemerMap.from_cbor(redeemer_cbor)
                             # redeemers.append(redeemer)
                 if signSubmit.scriptIds:
-                    for scriptId in signSubmit.scriptIds:
-                        # Get the contract address and cbor from policyId
-                        # Consultar en base de datos
-                        command_name = "getScriptById"
-
-                        graphql_variables = {"id": scriptId}
-
-                        r = Plataforma().getScript(command_name, graphql_variables)
-                        final_response = Response().handle_getScript_response(getWallet_response=r)
-
-                        if not final_response["connection"] or not final_response.get("success", None):
-                            raise ResponseDynamoDBException(final_response["data"])
-                        
-                        contractInfo = final_response["data"]
-
-                        cbor_hex = contractInfo.get("cbor", None)
-
-                        cbor = bytes.fromhex(cbor_hex)
-                        plutus_v2_script = PlutusV2Script(cbor)
-                        plutus_v2_scripts.append(plutus_v2_script)
+                    # Get the contract address and cbor from policyId
+                    # Consultar en base de datos: the unknown scripts are fetched in one query
+                    loader = PlataformaLoader()
+                    contractsInfo = await asyncio.gather(
+                        *(script_registry.get(scriptId, loader) for scriptId in signSubmit.scriptIds)
+                    )
+                    for contractInfo in contractsInfo:
+                        plutus_v2_scripts.append(contractInfo.plutus_script)
                         # plutus_v3_script = PlutusV3Script(cbor)
                         # plutus_v3_scripts.append(plutus_v3_script)
 
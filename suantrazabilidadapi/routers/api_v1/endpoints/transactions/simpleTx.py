@@ -11,12 +11,12 @@ from pycardano import (
     TransactionBuilder,
     TransactionOutput,
     Value,
-    min_lovelace,
 )
 
 from suantrazabilidadapi.routers.api_v1.endpoints import pydantic_schemas
 from suantrazabilidadapi.utils.blockchain import CardanoNetwork
-from suantrazabilidadapi.utils.plataforma import CardanoApi, Helpers, Plataforma
+from suantrazabilidadapi.utils.min_utxo import min_utxo_calculator
+from suantrazabilidadapi.utils.plataforma import Helpers, async_plataforma_client, plataforma_client
 
 router = APIRouter()
 
@@ -34,7 +34,7 @@ async def buildTx(send: pydantic_schemas.BuildTx) -> dict:
         """1. Get wallet info"""
         ########################
         graphql_variables = {"walletId": send.wallet_id}
-        r = Plataforma().getWallet("getWalletById", graphql_variables)
+        r = await async_plataforma_client.getWallet("getWalletById", graphql_variables)
         if r["data"].get("data", None) is not None:
             userWalletInfo = r["data"]["data"]["getWallet"]
             if userWalletInfo is None:
@@ -98,7 +98,7 @@ async def buildTx(send: pydantic_schemas.BuildTx) -> dict:
                         )
 
                     # Calculate the minimum amount of lovelace that need to be transfered in the utxo
-                    min_val = min_lovelace(
+                    min_val = min_utxo_calculator.min_lovelace(
                         chain_context,
                         output=TransactionOutput(
                             Address.decode(address.address),
@@ -128,17 +128,10 @@ async def buildTx(send: pydantic_schemas.BuildTx) -> dict:
                 )
 
                 # Processing the tx body
-                format_body = Plataforma().formatTxBody(build_body)
-
-                utxo_list_info = []
-                for utxo in build_body.inputs:
-                    utxo_details = CardanoApi().getUtxoInfo(utxo.to_cbor_hex()[6:70])
-                    for utxo_output in utxo_details["outputs"]:
-                        if utxo_output["output_index"] == utxo.index:
-                            utxo_output["utxo_hash"] = (
-                                f"{utxo.to_cbor_hex()[6:70]}#{utxo.index}"
-                            )
-                            utxo_list_info.append(utxo_output)
+                format_body = plataforma_client.formatTxBody(build_body)
+
+                # Details of the inputs from the UTxOs the builder selected
+                utxo_list_info = Helpers().utxos_info(build_body.inputs, builder.inputs)
 
                 final_response = {
                     "success": True,
@@ -1,5 +1,7 @@
-from typing import Union
-from fastapi import APIRouter, HTTPException
+import asyncio
+from typing import Literal, Optional, Union
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pycardano import (
     Address,
     HDWallet,
@@ -7,9 +9,15 @@ from pycardano import (
 
 from suantrazabilidadapi.routers.api_v1.endpoints import pydantic_schemas
 from suantrazabilidadapi.utils.generic import Constants, is_valid_hex_string
-from suantrazabilidadapi.utils.plataforma import CardanoApi, Plataforma
-from suantrazabilidadapi.utils.response import Response
-from suantrazabilidadapi.utils.exception import ResponseTypeError, ResponseProcessingError, ResponseDynamoDBException
+from suantrazabilidadapi.utils.plataforma import CardanoApi, async_plataforma_client, plataforma_client
+from suantrazabilidadapi.utils.history import HistoryCursor, history_lines
+from suantrazabilidadapi.utils.rate_limit import blockfrost_limiter
+from suantrazabilidadapi.utils.response import Response, iterate_in_thread, ndjson_lines
+from suantrazabilidadapi.utils.exception import (
+    ResponseDynamoDBException,
+    ResponseProcessingError,
+    ResponseTypeError,
+)
 
 router = APIRouter()
 
@@ -20,10 +28,15 @@ router = APIRouter()
     summary="Get all the wallets registered in Plataforma",
     response_description="Wallet details",
 )
-async def getWallets():
-    """Get all the wallets registered in Plataforma"""
+async def getWallets(stream: bool = False, page_size: Optional[int] = Query(None, ge=1, le=1000)):
+    """Get all the wallets registered in Plataforma \n
+    With stream, wallets are sent as newline delimited JSON while the pages are read
+    """
+    if stream:
+        items = async_plataforma_client.iterItems("listWallets", "listWallets", page_size=page_size)
+        return StreamingResponse(ndjson_lines(items), media_type="application/x-ndjson")
     try:
-        r = Plataforma().listWallets()
+        r = await async_plataforma_client.listWallets(page_size)
         final_response = Response().handle_listWallets_response(r)
 
         if not final_response["connection"] or not final_response.get("success", None):
@@ -54,7 +67,7 @@ async def getWallet(command_name: pydantic_schemas.walletCommandName, query_para
 
             graphql_variables = {"walletId": query_param}
 
-            getWallet_response = Plataforma().getWallet(command_name, graphql_variables)
+            getWallet_response = await async_plataforma_client.getWallet(command_name, graphql_variables)
 
             final_response = Response().handle_getWallet_response(getWallet_response=getWallet_response)
 
@@ -66,7 +79,7 @@ async def getWallet(command_name: pydantic_schemas.walletCommandName, query_para
 
             graphql_variables = {"address": query_param}
 
-            listWallet_response = Plataforma().getWallet(command_name, graphql_variables)
+            listWallet_response = await async_plataforma_client.getWallet(command_name, graphql_variables)
 
             final_response = Response().handle_listWallets_response(listWallets_response=listWallet_response)
 
@@ -94,7 +107,7 @@ async def getWalletAdmin():
         command_name = "getWalletAdmin"
         graphql_variables = {"isAdmin": True}
 
-        listWallet_response = Plataforma().getWallet(command_name, graphql_variables)
+        listWallet_response = await async_plataforma_client.getWallet(command_name, graphql_variables)
 
         final_response = Response().handle_listWallets_response(listWallets_response=listWallet_response)
 
@@ -140,7 +153,7 @@ async def createWallet(mnemonic_words: str, wallet_type: pydantic_schemas.wallet
         """Generate new wallet"""
         ########################
 
-        wallet_info = Plataforma().generateWallet(mnemonic_words)
+        wallet_info = plataforma_client.generateWallet(mnemonic_words)
         wallet_id = wallet_info[0]
         seed = wallet_info[1]
         # skey = wallet_info[2]
@@ -157,7 +170,7 @@ async def createWallet(mnemonic_words: str, wallet_type: pydantic_schemas.wallet
 
         graphql_variables = {"walletId": wallet_id}
 
-        r = Plataforma().getWallet(command_name, graphql_variables)
+        r = await async_plataforma_client.getWallet(command_name, graphql_variables)
         final_response = Response().handle_getWallet_response(getWallet_response=r)
         
         if not final_response["connection"] or final_response.get("success", None):
@@ -180,7 +193,8 @@ async def createWallet(mnemonic_words: str, wallet_type: pydantic_schemas.wallet
                 variables["name"] = wallet_type
                 variables["status"] = "active"
 
-            r = Plataforma().createWallet(variables, wallet_type)
+            # The wallet id derives from the mnemonic, so a retried creation cannot duplicate it
+            r = await async_plataforma_client.createWallet(variables, wallet_type, record_id=wallet_id)
             responseCreateWallet = Response().handle_createWallet_response(r)
             
             if not responseCreateWallet["connection"] or not responseCreateWallet.get("success", None):
@@ -221,7 +235,7 @@ async def createWallet(mnemonic_words: str, wallet_type: pydantic_schemas.wallet
 async def queryAddress(address: str):
     """Get address info - balance, associated stake address (if any) and UTxO set for given addresses \n"""
     try:
-        return CardanoApi().getAddressInfo(address)
+        return await asyncio.to_thread(CardanoApi().getAddressInfo, address)
 
     except Exception as e:
         msg = "Error with the endpoint"
@@ -243,9 +257,12 @@ async def addressTxs(
 ) -> list[dict]:
 
     try:
-        return CardanoApi().getAddressTxs(
-            address, from_block, to_block, page_number, limit
-        )
+        # Blocking Blockfrost calls, kept off the event loop; history browsing yields to
+        # transaction building and submission
+        with blockfrost_limiter.priority("browse"):
+            return await asyncio.to_thread(
+                CardanoApi().getAddressTxs, address, from_block, to_block, page_number, limit
+            )
 
     except Exception as e:
         msg = "Error with the endpoint"
@@ -276,7 +293,7 @@ async def addressUtxos(
         _type_: list of utxos
     """
     try:
-        utxos = CardanoApi().getAddressUtxos(address, page_number, limit)
+        utxos = await asyncio.to_thread(CardanoApi().getAddressUtxos, address, page_number, limit)
         return utxos
 
     except Exception as e:
@@ -284,6 +301,50 @@ async def addressUtxos(
         raise HTTPException(status_code=500, detail=msg) from e
 
 
+@router.get(
+    "/address-history/",
+    status_code=200,
+    summary="Export every transaction or UTxO of the address as newline delimited JSON",
+    response_description="One line per transaction or UTxO with the cursor resuming after it",
+)
+async def addressHistory(
+    address: str,
+    kind: Literal["transactions", "utxos"] = "transactions",
+    from_block: Optional[str] = None,
+    to_block: Optional[str] = None,
+    cursor: Optional[str] = None,
+    details: bool = False,
+):
+    """Export every transaction or UTxO of the address, walking the Blockfrost pages server side \n
+
+    Args:
+        address (str): Bech32 address
+        kind (str, optional): "transactions" or "utxos". Defaults to "transactions".
+        from_block (str, optional): Block height, or height:index, of the first transaction.
+        to_block (str, optional): Block height, or height:index, of the last transaction.
+        cursor (str, optional): Cursor of the last line received, to resume an interrupted export.
+        details (bool, optional): Add utxos, fees, size and metadata to the transactions. Defaults to False.
+
+    Returns:
+        Lines {"cursor", "item"} in chain order, then {"done": true, "cursor"} once complete
+    """
+    try:
+        position = HistoryCursor.decode(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    if position is not None and position.kind != kind:
+        raise HTTPException(status_code=400, detail=f"The cursor belongs to a {position.kind} export")
+    if kind == "utxos" and (from_block or to_block):
+        raise HTTPException(status_code=400, detail="from_block and to_block only apply to transactions")
+
+    if kind == "transactions":
+        rows = CardanoApi().iterAddressTransactions(address, from_block, to_block, position, details)
+    else:
+        rows = CardanoApi().iterAddressUtxos(address, position)
+    lines = iterate_in_thread(history_lines(rows, position))
+    return StreamingResponse(ndjson_lines(lines), media_type="application/x-ndjson")
+
+
 @router.get(
     "/address-details/",
     status_code=200,
@@ -293,7 +354,7 @@ async def addressUtxos(
 async def addressDetails(address: str) -> dict:
 
     try:
-        details = CardanoApi().getAddressDetails(address)
+        details = await asyncio.to_thread(CardanoApi().getAddressDetails, address)
         return details
 
     except Exception as e:
@@ -307,10 +368,15 @@ async def addressDetails(address: str) -> dict:
     summary="Get the information for all assets under the same policy",
     response_description="Array of detailed information of assets under the same policy",
 )
-async def accountUtxos(policy_id: str):
-    """Array of detailed information of assets under the same policy \n"""
+async def accountUtxos(policy_id: str, stream: bool = False):
+    """Array of detailed information of assets under the same policy \n
+    With stream, assets are sent as newline delimited JSON while their details are fetched
+    """
+    if stream:
+        items = iterate_in_thread(CardanoApi().iterAssetInfo(policy_id))
+        return StreamingResponse(ndjson_lines(items), media_type="application/x-ndjson")
     try:
-        asset_info = CardanoApi().assetInfo(policy_id)
+        asset_info = await asyncio.to_thread(CardanoApi().assetInfo, policy_id)
 
         return asset_info
 
@@ -0,0 +1,94 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from suantrazabilidadapi.utils.cache import TTLCache
+from suantrazabilidadapi.utils.generic import Constants
+from suantrazabilidadapi.utils.utxo_index import BlockChanges, local_utxo_index
+
+
+@dataclass()
+class PolicyAssetCache(Constants):
+    """Blockfrost asset listings per policy and asset details per unit.
+
+    Both only change when the policy mints or burns, which the local UTxO index reports through
+    its block subscription: the policy entries are then dropped. While the index follows the chain
+    the entries last ASSET_CACHE_FOLLOWED_TTL; otherwise a mint can go unnoticed, so they expire
+    after ASSET_CACHE_TTL. When the index stops following the chain or syncs again, the blocks in
+    between were never seen and the whole cache is flushed.
+    """
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._listings = TTLCache(maxsize=self.ASSET_CACHE_MAXSIZE, ttl=self.ASSET_CACHE_TTL)
+        self._details = TTLCache(maxsize=self.ASSET_CACHE_MAXSIZE, ttl=self.ASSET_CACHE_TTL)
+        self._units: dict[str, set[str]] = {}
+        # Sync of the index the entries were cached under, None while it does not follow the chain
+        self._followed: Optional[int] = None
+        self.invalidations = 0
+        self.flushes = 0
+        local_utxo_index.subscribe(self.on_block)
+
+    def _ttl(self) -> float:
+        """TTL of new entries, after flushing those cached under a sync of the index that ended"""
+        followed = local_utxo_index.syncs if local_utxo_index.ready else None
+        with self._lock:
+            if followed != self._followed:
+                if self._followed is not None:
+                    self._flush()
+                self._followed = followed
+        return self.ASSET_CACHE_FOLLOWED_TTL if followed is not None else self.ASSET_CACHE_TTL
+
+    def _flush(self):
+        self._units.clear()
+        self._listings.clear()
+        self._details.clear()
+        self.flushes += 1
+        logging.info("Policy asset cache flushed, the UTxO index stopped following the chain")
+
+    def listing(self, policy_id: str) -> Optional[list[dict]]:
+        self._ttl()
+        return self._listings.get(policy_id)
+
+    def set_listing(self, policy_id: str, assets: list[dict]):
+        ttl = self._ttl()
+        with self._lock:
+            self._units.setdefault(policy_id, set())
+        self._listings.set(policy_id, assets, ttl=ttl)
+
+    def details(self, unit: str) -> Optional[dict]:
+        self._ttl()
+        return self._details.get(unit)
+
+    def set_details(self, unit: str, details: dict):
+        ttl = self._ttl()
+        with self._lock:
+            self._units.setdefault(unit[:56], set()).add(unit)
+        self._details.set(unit, details, ttl=ttl)
+
+    def invalidate(self, policy_id: str):
+        with self._lock:
+            units = self._units.pop(policy_id, set())
+        self._listings.delete(policy_id)
+        for unit in units:
+            self._details.delete(unit)
+
+    def on_block(self, changes: BlockChanges, tx_ids: list[str]):
+        """Drop the policies minted or burned in the block applied by the local UTxO index"""
+        for policy_id in changes.minted:
+            if policy_id in self._units:
+                self.invalidations += 1
+                logging.info(f"Assets of policy {policy_id} changed in slot {changes.slot}")
+            self.invalidate(policy_id)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "listings": self._listings.stats(),
+            "details": self._details.stats(),
+            "invalidations": self.invalidations,
+            "flushes": self.flushes,
+        }
+
+
+policy_assets = PolicyAssetCache()
@@ -0,0 +1,113 @@
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from pycardano import Address, AssetName, ChainContext, MultiAsset, ScriptHash, UTxO
+
+# (policy id, asset name) as raw bytes
+AssetKey = tuple[bytes, bytes]
+
+
+def asset_key(policy_id: Union[ScriptHash, bytes, str], asset_name: Union[AssetName, bytes, str]) -> AssetKey:
+    if isinstance(policy_id, ScriptHash):
+        policy_id = policy_id.payload
+    elif isinstance(policy_id, str):
+        policy_id = bytes.fromhex(policy_id)
+    if isinstance(asset_name, AssetName):
+        asset_name = asset_name.payload
+    elif isinstance(asset_name, str):
+        asset_name = asset_name.encode("utf-8")
+    return policy_id, asset_name
+
+
+def _ref(utxo: UTxO) -> tuple[bytes, int]:
+    return utxo.input.transaction_id.payload, utxo.input.index
+
+
+@dataclass()
+class AssetIndex:
+    """UTxOs of an address indexed by the tokens they hold, built once per utxos() snapshot.
+
+    Holdings of each (policy id, asset name) are sorted by amount, so finding the smallest UTxO
+    holding a quantity is a binary search instead of a scan of every UTxO per token.
+    """
+
+    utxos: list[UTxO]
+
+    def __post_init__(self):
+        holdings: dict[AssetKey, list[tuple[int, UTxO]]] = defaultdict(list)
+        for utxo in self.utxos:
+            for policy_id, asset in utxo.output.amount.multi_asset.items():
+                for asset_name, amount in asset.items():
+                    if amount > 0:
+                        holdings[(policy_id.payload, asset_name.payload)].append((amount, utxo))
+        self._holdings: dict[AssetKey, list[tuple[int, UTxO]]] = {}
+        self._amounts: dict[AssetKey, list[int]] = {}
+        for key, entries in holdings.items():
+            entries.sort(key=lambda entry: (entry[0], _ref(entry[1])))
+            self._holdings[key] = entries
+            self._amounts[key] = [amount for amount, _ in entries]
+
+    @classmethod
+    def of(cls, context: ChainContext, address: Union[Address, str]) -> "AssetIndex":
+        """Index the UTxOs of the address with a single utxos() call"""
+        return cls(context.utxos(address))
+
+    def __len__(self) -> int:
+        return len(self._holdings)
+
+    def total(self, policy_id, asset_name) -> int:
+        return sum(self._amounts.get(asset_key(policy_id, asset_name), ()))
+
+    def holding(self, policy_id, asset_name) -> list[UTxO]:
+        """UTxOs holding any amount of the token, smallest amount first"""
+        return [utxo for _, utxo in self._holdings.get(asset_key(policy_id, asset_name), ())]
+
+    def amount(self, utxo: UTxO, policy_id, asset_name) -> int:
+        policy_id, asset_name = asset_key(policy_id, asset_name)
+        for amount, candidate in self._holdings.get((policy_id, asset_name), ()):
+            if _ref(candidate) == _ref(utxo):
+                return amount
+        return 0
+
+    def first(self, policy_id, asset_name, quantity: int = 1) -> Optional[UTxO]:
+        """Smallest UTxO holding at least the quantity of the token"""
+        key = asset_key(policy_id, asset_name)
+        amounts = self._amounts.get(key)
+        if not amounts:
+            return None
+        position = bisect_left(amounts, quantity)
+        if position == len(amounts):
+            return None
+        return self._holdings[key][position][1]
+
+    def cover(self, policy_id, asset_name, quantity: int) -> list[UTxO]:
+        """Fewest UTxOs holding the quantity of the token, or [] when the address does not have it.
+
+        A single UTxO is used when one is enough; otherwise the largest holdings are taken first.
+        """
+        single = self.first(policy_id, asset_name, quantity)
+        if single is not None:
+            return [single]
+        key = asset_key(policy_id, asset_name)
+        if sum(self._amounts.get(key, ())) < quantity:
+            return []
+        selected, covered = [], 0
+        for amount, utxo in reversed(self._holdings[key]):
+            selected.append(utxo)
+            covered += amount
+            if covered >= quantity:
+                break
+        return selected
+
+    def cover_all(self, multi_asset: MultiAsset) -> list[UTxO]:
+        """UTxOs holding every token of the multi asset, or [] when any of them is missing"""
+        selected: dict[tuple[bytes, int], UTxO] = {}
+        for policy_id, asset in multi_asset.items():
+            for asset_name, quantity in asset.items():
+                utxos = self.cover(policy_id, asset_name, quantity)
+                if not utxos:
+                    return []
+                selected.update((_ref(utxo), utxo) for utxo in utxos)
+        return list(selected.values())
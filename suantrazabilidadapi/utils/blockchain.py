@@ -1,11 +1,15 @@
 import logging
 import os
+import threading
+import time
 from dataclasses import dataclass, field
 import json
 import requests
-from typing import Any, Union
+from typing import Any, Dict, List, Optional, Union
 
 from blockfrost import ApiUrls
+from ogmios import Client as OgmiosClient
+from ogmios.datatypes import Address as OgmiosAddress
 
 from pycardano.backend import OgmiosV6ChainContext as OgChainContext
 
@@ -18,12 +22,22 @@ from pycardano import (
     PaymentKeyPair,
     ChainContext,
     BlockFrostChainContext,
+    ExecutionUnits,
     PlutusV2Script,
+    ProtocolParameters,
+    Transaction,
+    TransactionInput,
+    UTxO,
 )
 from pycardano.cip.cip8 import sign, verify
 
 from suantrazabilidadapi.core.config import config
 from suantrazabilidadapi.utils.generic import Constants
+from suantrazabilidadapi.utils.health import backend_monitor
+from suantrazabilidadapi.utils.protocol_params import era_epoch_end, protocol_params_cache
+from suantrazabilidadapi.utils.rate_limit import RateLimitedBlockFrostApi
+from suantrazabilidadapi.utils.script_eval import script_evaluator
+from suantrazabilidadapi.utils.utxo_index import UtxoIndex, local_utxo_index
 
 cardano = config(section="cardano")
 
@@ -156,39 +170,39 @@ class CardanoNetwork(Constants):
         )
 
     def check_ogmios_service_health(self):
+        """Probe Ogmios once and let the backend monitor decide the backend to use"""
+        url = self.OGMIOS_URL
+        start = time.monotonic()
         try:
-            url = self.OGMIOS_URL
             response = requests.get(url, timeout=5)
             response.raise_for_status()
             ogmios_health_data = response.json()
-            self.connection_status = ogmios_health_data.get("connectionStatus")
-            self.network_synchronization = ogmios_health_data.get(
-                "networkSynchronization"
-            )
-
-            if (
-                self.connection_status == "connected"
-                and self.network_synchronization == 1
-            ):
-                logging.info("Ogmios service is healthy. Using Ogmios")
-                os.environ["CHAIN_BACKEND"] = "ogmios"
-
-            else:
-                logging.info(
-                    f"Ogmios service is NOT healthy. Connection: {self.connection_status}, Network_sync: {self.network_synchronization}. Using Blockfrost"
-                )
-                os.environ["CHAIN_BACKEND"] = "blockfrost"
-
-        except (requests.exceptions.RequestException, json.JSONDecodeError):
-            url = "https://httpbin.org/status/200"
-            response = requests.get(url, timeout=5)
-            os.environ["CHAIN_BACKEND"] = "blockfrost"
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+            backend_monitor.record("ogmios", False, time.monotonic() - start, error=str(e))
+            return backend_monitor.route()
+
+        self.connection_status = ogmios_health_data.get("connectionStatus")
+        self.network_synchronization = ogmios_health_data.get("networkSynchronization")
+        healthy = (
+            self.connection_status == "connected"
+            and (self.network_synchronization or 0) >= self.OGMIOS_MIN_SYNC
+        )
+        logging.info(
+            f"Ogmios connection: {self.connection_status}, Network_sync: {self.network_synchronization}"
+        )
+        backend_monitor.record(
+            "ogmios",
+            healthy,
+            time.monotonic() - start,
+            {"connectionStatus": self.connection_status, "networkSynchronization": self.network_synchronization},
+            None if healthy else "Ogmios not synchronized",
+        )
+        return backend_monitor.route()
 
     def get_chain_context(self) -> ChainContext:
         """Obtain the chain context from: Ogmios or blockfrost.
-        First, it looks if ogmios is choosen in env variable and then it checks the health status
-        if the health status is not ok, it switches to blockfrost. Blockfrost is also choosen
-        directly without further validation if it was set in env variable as the main provider.
+        The backend is the one chosen by the background health monitor; without it running,
+        the one set in the CHAIN_BACKEND env variable (blockfrost by default).
 
         Raises:
             ValueError: Raise error if not env variable is set (Ogmios | Blockfrost)
@@ -197,25 +211,248 @@ class CardanoNetwork(Constants):
             ChainContext: ChainContext
         """
 
-        chain_backend = cardano["chain_backend"]
-        chain_backend = os.getenv("CHAIN_BACKEND") or "blockfrost"
+        chain_backend = backend_monitor.backend()
         logging.info(f"Chain backend used: {chain_backend}")
 
-        # Validates which backend service is prefered to use first by looking
-        if chain_backend == "ogmios":
-            return OgChainContext(
+        # The context of each backend is created once per process and shared by all requests
+        context = chain_contexts.get(chain_backend)
+        if local_utxo_index.ready:
+            return IndexedChainContext(context)
+        return context
+
+
+class SharedLedgerState:
+    """Chain context shared by concurrent requests.
+
+    Protocol and genesis parameters come from the epoch-aware protocol_params_cache, so a
+    context only queries them when the cache has none for the current epoch.
+    """
+
+    def _init_shared_state(self):
+        self._state_lock = threading.RLock()
+
+    @property
+    def protocol_param(self):
+        return protocol_params_cache.get(self).protocol_param
+
+    @property
+    def genesis_param(self):
+        return protocol_params_cache.get(self).genesis_param
+
+    def fetch_epoch(self) -> tuple[int, Optional[float]]:
+        with self._state_lock:
+            return super().epoch, None
+
+    def fetch_ledger_parameters(self) -> tuple[ProtocolParameters, Any, int, Optional[float]]:
+        """Query the backend, bypassing both pycardano's and the shared cache"""
+        with self._state_lock:
+            self._protocol_param = None
+            self._genesis_param = None
+            protocol_param = super().protocol_param
+            genesis_param = super().genesis_param
+        epoch, epoch_end = self.fetch_epoch()
+        return protocol_param, genesis_param, epoch, epoch_end
+
+    def evaluate_tx(self, tx: Transaction) -> Dict[str, ExecutionUnits]:
+        """Evaluated in-process when local_utxo_index holds the inputs, by the backend otherwise"""
+        return script_evaluator.evaluate_tx(
+            tx,
+            lambda tx_input: local_utxo_index.utxo(tx_input.transaction_id.payload.hex(), tx_input.index),
+            super().evaluate_tx,
+            self.protocol_param,
+            self.genesis_param,
+        )
+
+
+class SharedOgmiosChainContext(SharedLedgerState, OgChainContext):
+    """Ogmios context shared by concurrent requests; the UTxO cache (keyed by tip slot) is locked"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_shared_state()
+
+    def fetch_epoch(self) -> tuple[int, Optional[float]]:
+        """Current epoch and when it ends, from the era summaries: Ogmios does not report the end"""
+        with OgmiosClient(self.host, self.port, self.secure) as client:
+            epoch, _ = client.query_epoch.execute()
+            system_start, _ = client.query_start_time.execute()
+            era_summaries, _ = client.query_era_summaries.execute()
+        return epoch, era_epoch_end(epoch, system_start, era_summaries[-1])
+
+    def _utxos(self, address: str) -> List[UTxO]:
+        key = (self.last_block_slot, address)
+        with self._state_lock:
+            if key in self._utxo_cache:
+                return self._utxo_cache[key]
+
+        utxos = self._utxos_ogmios(OgmiosAddress(address=address))
+
+        with self._state_lock:
+            self._utxo_cache[key] = utxos
+        return utxos
+
+
+class SharedBlockFrostChainContext(SharedLedgerState, BlockFrostChainContext):
+    """Blockfrost context shared by concurrent requests; Blockfrost also tells when the epoch ends"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Every Blockfrost call of the workers goes through the shared rate limiter, one token per
+        # page for the gather_pages listings such as _utxos
+        self.api = RateLimitedBlockFrostApi(project_id=self._project_id, base_url=self._base_url)
+        self._init_shared_state()
+
+    def fetch_epoch(self) -> tuple[int, Optional[float]]:
+        with self._state_lock:
+            self._epoch_info = self.api.epoch_latest()
+            self._epoch = self._epoch_info.epoch
+            return self._epoch, float(self._epoch_info.end_time)
+
+
+class IndexedChainContext(ChainContext):
+    """Chain context answering utxos() from local_utxo_index when it follows the address.
+
+    Scripts are evaluated in-process, resolving the inputs from the UTxOs this context returned
+    and from the index. Every other call, and the addresses the index does not follow, go to the
+    wrapped context.
+    """
+
+    def __init__(self, context: ChainContext, index: Optional[UtxoIndex] = None):
+        self.context = context
+        self.index = index or local_utxo_index
+        # UTxOs handed to the builders, to resolve the inputs of the transactions they evaluate
+        self._seen: dict[TransactionInput, UTxO] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.context, name)
+
+    @property
+    def protocol_param(self) -> ProtocolParameters:
+        return self.context.protocol_param
+
+    @property
+    def genesis_param(self):
+        return self.context.genesis_param
+
+    @property
+    def network(self) -> Network:
+        return self.context.network
+
+    @property
+    def epoch(self) -> int:
+        return self.context.epoch
+
+    @property
+    def last_block_slot(self) -> int:
+        return self.context.last_block_slot
+
+    def utxos(self, address: Union[str, Address]) -> List[UTxO]:
+        utxos = super().utxos(address)
+        self._seen.update((utxo.input, utxo) for utxo in utxos)
+        return utxos
+
+    def _utxos(self, address: str) -> List[UTxO]:
+        utxos = self.index.utxos(address)
+        if utxos is None:
+            return self.context.utxos(address)
+        return utxos
+
+    def utxo_by_tx_id(self, tx_id: str, index: int) -> Optional[UTxO]:
+        return self.context.utxo_by_tx_id(tx_id, index)
+
+    def resolve_input(self, tx_input: TransactionInput) -> Optional[UTxO]:
+        """Output spent or referenced by a transaction input, looked up without network calls"""
+        utxo = self._seen.get(tx_input)
+        if utxo is None:
+            utxo = self.index.utxo(tx_input.transaction_id.payload.hex(), tx_input.index)
+        return utxo
+
+    def evaluate_tx(self, tx: Transaction) -> Dict[str, ExecutionUnits]:
+        return script_evaluator.evaluate_tx(
+            tx,
+            self.resolve_input,
+            lambda tx: self.context.evaluate_tx_cbor(tx.to_cbor()),
+            self.protocol_param,
+            self.genesis_param,
+        )
+
+    def submit_tx_cbor(self, cbor: Union[bytes, str]):
+        return self.context.submit_tx_cbor(cbor)
+
+    def evaluate_tx_cbor(self, cbor: Union[bytes, str]):
+        return self.context.evaluate_tx_cbor(cbor)
+
+
+@dataclass()
+class ChainContextManager(Constants):
+    """Process-wide chain contexts, one per backend, reused by every request and celery batch.
+
+    Contexts keep their cached ledger state between calls: protocol and genesis parameters
+    are only fetched again on epoch change, and UTxOs on tip change. Contexts are recreated
+    after a fork (celery prefork workers).
+    """
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._contexts: dict[str, ChainContext] = {}
+        self._created: dict[str, int] = {}
+        self._reused: dict[str, int] = {}
+        self._pid = os.getpid()
+
+    def _create(self, backend: str) -> ChainContext:
+        if backend == "ogmios":
+            return SharedOgmiosChainContext(
                 host=Constants.OGMIOS_URL, port=Constants.OGMIOS_PORT, secure=False
             )
 
-        if chain_backend == "blockfrost":
+        if backend == "blockfrost":
+            base_url = self.BASE_URL
+            project_id = self.BLOCK_FROST_PROJECT_ID
             if self.NETWORK_NAME == "preview":
-                self.BASE_URL = ApiUrls.preview.value
-                self.BLOCK_FROST_PROJECT_ID = os.getenv("block_frost_project_id")
-            return BlockFrostChainContext(
-                self.BLOCK_FROST_PROJECT_ID, base_url=self.BASE_URL
-            )
-        else:
-            raise ValueError(f"Chain backend not found: {chain_backend}")
+                base_url = ApiUrls.preview.value
+                project_id = os.getenv("block_frost_project_id")
+            return SharedBlockFrostChainContext(project_id, base_url=base_url)
+
+        raise ValueError(f"Chain backend not found: {backend}")
+
+    def get(self, backend: str) -> ChainContext:
+        """Return the shared context of the backend, creating it on first use"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked child: do not share the parent's contexts
+                self._contexts = {}
+                self._pid = os.getpid()
+
+            context = self._contexts.get(backend)
+            if context is None:
+                context = self._create(backend)
+                self._contexts[backend] = context
+                self._created[backend] = self._created.get(backend, 0) + 1
+            else:
+                self._reused[backend] = self._reused.get(backend, 0) + 1
+            return context
+
+    def reset(self, backend: Union[str, None] = None):
+        """Drop the shared context of the backend (all when None); the next get creates it again"""
+        with self._lock:
+            if backend is None:
+                self._contexts = {}
+            else:
+                self._contexts.pop(backend, None)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                backend: {
+                    "active": backend in self._contexts,
+                    "created": self._created.get(backend, 0),
+                    "reused": self._reused.get(backend, 0),
+                }
+                for backend in set(self._created) | set(self._contexts)
+            }
+
+
+chain_contexts = ChainContextManager()
 
 
 @dataclass()
@@ -0,0 +1,235 @@
+import asyncio
+import copy
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional, Union
+
+import redis
+from redis import asyncio as aioredis
+
+from suantrazabilidadapi.utils.generic import Constants
+
+
+@dataclass()
+class TTLCache:
+    """Bounded in-memory cache with a TTL per key, evicting the least recently used entry"""
+
+    maxsize: int = 1024
+    ttl: float = 300
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+@dataclass()
+class WalletCache(Constants):
+    """Wallet records served from memory, with an optional Redis tier shared by uvicorn and celery workers.
+
+    Only wallets that were found are cached, so a wallet created afterwards is never hidden.
+    Records holding a seed stay in the memory of the process and are never written to Redis.
+    """
+
+    CACHED_OPERATIONS = ("getWalletById", "getWalletByAddress", "getWalletAdmin")
+    KEY_PREFIX = "WalletCache"
+
+    def __post_init__(self):
+        self.local = TTLCache(maxsize=self.WALLET_CACHE_MAXSIZE, ttl=self.WALLET_CACHE_TTL)
+        self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self._sync_redis: Optional[redis.Redis] = None
+        self._async_redis: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.redis_hits = 0
+        self.redis_errors = 0
+
+    def key(self, operation_name: str, graphql_variables: Union[dict, None]) -> Optional[str]:
+        if not self.WALLET_CACHE_ENABLED or operation_name not in self.CACHED_OPERATIONS:
+            return None
+        variables = json.dumps(graphql_variables or {}, sort_keys=True, separators=(",", ":"))
+        return f"{self.KEY_PREFIX}:{operation_name}:{variables}"
+
+    @staticmethod
+    def is_cacheable(response: dict) -> bool:
+        """Only successful responses holding a wallet record are worth caching"""
+        if not response.get("success") or not isinstance(response.get("data"), dict):
+            return False
+        data = response["data"].get("data")
+        if not data or response["data"].get("errors"):
+            return False
+        if "getWallet" in data:
+            return data["getWallet"] is not None
+        return bool((data.get("listWallets") or {}).get("items"))
+
+    @staticmethod
+    def holds_seed(response: dict) -> bool:
+        data = response["data"]["data"]
+        records = [data["getWallet"]] if "getWallet" in data else data["listWallets"]["items"]
+        return any(record.get("seed") for record in records)
+
+    def _invalidation_keys(self, values: dict) -> list[str]:
+        keys = [self.key("getWalletAdmin", {"isAdmin": flag}) for flag in (True, False)]
+        if values.get("id"):
+            keys.append(self.key("getWalletById", {"walletId": values["id"]}))
+        if values.get("address"):
+            keys.append(self.key("getWalletByAddress", {"address": values["address"]}))
+        return [key for key in keys if key is not None]
+
+    def _redis(self) -> redis.Redis:
+        if self._sync_redis is None:
+            self._sync_redis = redis.Redis.from_url(self.redis_url, decode_responses=True)
+        return self._sync_redis
+
+    def _aredis(self) -> aioredis.Redis:
+        # Asyncio connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        client = self._async_redis.get(loop)
+        if client is None:
+            client = aioredis.from_url(self.redis_url, decode_responses=True)
+            self._async_redis[loop] = client
+        return client
+
+    def get(self, key: str) -> Optional[dict]:
+        response = self.local.get(key)
+        if response is not None or not self.WALLET_CACHE_REDIS:
+            # Callers may modify the record they receive
+            return copy.deepcopy(response)
+        try:
+            cached = self._redis().get(key)
+        except redis.RedisError as e:
+            self.redis_errors += 1
+            logging.warning(f"Wallet cache redis tier unavailable: {e}")
+            return None
+        if cached is None:
+            return None
+        self.redis_hits += 1
+        response = json.loads(cached)
+        self.local.set(key, copy.deepcopy(response))
+        return response
+
+    def set(self, key: str, response: dict):
+        if not self.is_cacheable(response):
+            return
+        self.local.set(key, copy.deepcopy(response))
+        if self.WALLET_CACHE_REDIS and not self.holds_seed(response):
+            try:
+                self._redis().set(key, json.dumps(response), ex=int(self.WALLET_CACHE_REDIS_TTL))
+            except redis.RedisError as e:
+                self.redis_errors += 1
+                logging.warning(f"Wallet cache redis tier unavailable: {e}")
+
+    def invalidate(self, values: dict):
+        keys = self._invalidation_keys(values)
+        for key in keys:
+            self.local.delete(key)
+        if self.WALLET_CACHE_REDIS and keys:
+            try:
+                self._redis().delete(*keys)
+            except redis.RedisError as e:
+                self.redis_errors += 1
+                logging.warning(f"Wallet cache redis tier unavailable: {e}")
+
+    async def aget(self, key: str) -> Optional[dict]:
+        response = self.local.get(key)
+        if response is not None or not self.WALLET_CACHE_REDIS:
+            # Callers may modify the record they receive
+            return copy.deepcopy(response)
+        try:
+            cached = await self._aredis().get(key)
+        except redis.RedisError as e:
+            self.redis_errors += 1
+            logging.warning(f"Wallet cache redis tier unavailable: {e}")
+            return None
+        if cached is None:
+            return None
+        self.redis_hits += 1
+        response = json.loads(cached)
+        self.local.set(key, copy.deepcopy(response))
+        return response
+
+    async def aset(self, key: str, response: dict):
+        if not self.is_cacheable(response):
+            return
+        self.local.set(key, copy.deepcopy(response))
+        if self.WALLET_CACHE_REDIS and not self.holds_seed(response):
+            try:
+                await self._aredis().set(key, json.dumps(response), ex=int(self.WALLET_CACHE_REDIS_TTL))
+            except redis.RedisError as e:
+                self.redis_errors += 1
+                logging.warning(f"Wallet cache redis tier unavailable: {e}")
+
+    async def ainvalidate(self, values: dict):
+        keys = self._invalidation_keys(values)
+        for key in keys:
+            self.local.delete(key)
+        if self.WALLET_CACHE_REDIS and keys:
+            try:
+                await self._aredis().delete(*keys)
+            except redis.RedisError as e:
+                self.redis_errors += 1
+                logging.warning(f"Wallet cache redis tier unavailable: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        stats = self.local.stats()
+        stats["enabled"] = self.WALLET_CACHE_ENABLED
+        stats["redis_enabled"] = self.WALLET_CACHE_REDIS
+        stats["redis_hits"] = self.redis_hits
+        stats["redis_errors"] = self.redis_errors
+        return stats
+
+
+wallet_cache = WalletCache()
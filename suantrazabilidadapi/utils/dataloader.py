@@ -0,0 +1,128 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from typing import Union
+
+from suantrazabilidadapi.utils.cache import wallet_cache
+from suantrazabilidadapi.utils.generic import Constants
+from suantrazabilidadapi.utils.graphql_documents import MAIN_DOCUMENTS, ORACLE_DOCUMENTS, compose_batch
+from suantrazabilidadapi.utils.plataforma import async_plataforma_client
+
+
+@dataclass()
+class PlataformaLoader(Constants):
+    """Request-scoped DataLoader over AsyncPlataforma.
+
+    Queries requested in the same event loop tick are sent as one aliased GraphQL document,
+    and a query repeated with the same variables during the request is only sent once.
+    Create one loader per request: results are kept for its whole life.
+    """
+
+    application: str = ""
+
+    def __post_init__(self):
+        self.documents = ORACLE_DOCUMENTS if self.application == "oracle" else MAIN_DOCUMENTS
+        self._results: dict[str, asyncio.Future] = {}
+        self._pending: list[tuple[str, str, Union[dict, None]]] = []
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+        self.requests = 0
+
+    @staticmethod
+    def _key(operation_name: str, graphql_variables: Union[dict, None]) -> str:
+        return f"{operation_name}:{json.dumps(graphql_variables or {}, sort_keys=True, separators=(',', ':'))}"
+
+    async def load(self, operation_name: str, graphql_variables: Union[dict, None] = None) -> dict:
+        """Same response as AsyncPlataforma for the operation, batched with the other loads of the tick"""
+        if operation_name not in self.documents or self.documents.get(operation_name).kind != "query":
+            # Mutations are neither batched nor deduplicated
+            return await async_plataforma_client._post(operation_name, graphql_variables, self.application)
+
+        key = self._key(operation_name, graphql_variables)
+        future = self._results.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._results[key] = future
+            cache_key = wallet_cache.key(operation_name, graphql_variables)
+            cached = await wallet_cache.aget(cache_key) if cache_key is not None else None
+            if cached is not None:
+                future.set_result(cached)
+            else:
+                if not self._pending:
+                    loop.call_soon(self._dispatch)
+                self._pending.append((key, operation_name, graphql_variables))
+
+        # Each caller gets its own copy, as Plataforma responses are plain mutable dicts
+        return json.loads(json.dumps(await asyncio.shield(future)))
+
+    async def getWallet(self, command_name: str, graphql_variables: dict) -> dict:
+        return await self.load(command_name, graphql_variables)
+
+    async def getScript(self, command_name: str, graphql_variables: dict) -> dict:
+        return await self.load(command_name, graphql_variables)
+
+    def _dispatch(self):
+        pending, self._pending = self._pending, []
+        for start in range(0, len(pending), self.GRAPHQL_BATCH_MAXSIZE):
+            task = asyncio.ensure_future(self._run(pending[start:start + self.GRAPHQL_BATCH_MAXSIZE]))
+            # Keep a reference until done, the loop only holds weak ones
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[str, str, Union[dict, None]]]):
+        self.requests += len(batch)
+        try:
+            if len(batch) == 1:
+                responses = [await async_plataforma_client._post(batch[0][1], batch[0][2], self.application)]
+            else:
+                responses = await self._run_batch(batch)
+        except Exception as e:
+            logging.error(f"Batched GraphQL request failed: {e}")
+            responses = [{"success": False, "error": str(e)}] * len(batch)
+
+        for (key, operation_name, graphql_variables), response in zip(batch, responses):
+            cache_key = wallet_cache.key(operation_name, graphql_variables)
+            if cache_key is not None:
+                await wallet_cache.aset(cache_key, response)
+            future = self._results[key]
+            if not future.done():
+                future.set_result(response)
+
+    async def _run_batch(self, batch: list[tuple[str, str, Union[dict, None]]]) -> list[dict]:
+        requests = [(self.documents.get(operation_name), variables) for _, operation_name, variables in batch]
+        try:
+            document, variables, aliases = compose_batch(requests)
+        except ValueError as e:
+            logging.info(f"Sending queries one by one: {e}")
+            return await asyncio.gather(
+                *(async_plataforma_client._post(name, variables, self.application) for _, name, variables in batch)
+            )
+
+        self.batches += 1
+        response = await async_plataforma_client.postDocument(document, "batch", variables, self.application)
+        if not response["success"]:
+            return [response] * len(batch)
+        return [self._split(response["data"], request_aliases) for request_aliases in aliases]
+
+    @staticmethod
+    def _split(data: dict, request_aliases: dict[str, str]) -> dict:
+        """Rebuild the response one query would have received from the batched response"""
+        batch_data = data.get("data") or {}
+        errors = [
+            error
+            for error in data.get("errors") or []
+            if not error.get("path") or error["path"][0] in request_aliases
+        ]
+        result: dict = {"data": None}
+        if data.get("data") is not None:
+            result["data"] = {field: batch_data.get(alias) for alias, field in request_aliases.items()}
+        if errors:
+            result["errors"] = [
+                dict(error, path=[request_aliases.get(error["path"][0], error["path"][0])] + error["path"][1:])
+                if error.get("path")
+                else error
+                for error in errors
+            ]
+        return {"success": True, "data": result}
@@ -9,3 +9,14 @@ class ResponseDynamoDBException(PlataformaException):
     """Response DynamoDB exception"""
 class ResponseFindingUtxo(PlataformaException):
     """Response finding utxo exception"""
+class SpendConflictError(PlataformaException):
+    """Inputs already reserved by another in-flight transaction"""
+class ScriptEvaluationError(PlataformaException):
+    """Plutus script failed when evaluated locally"""
+class UnsupportedScriptError(PlataformaException):
+    """Transaction the local script evaluator cannot handle, left to the backend evaluator"""
+class BlockfrostRateLimited(PlataformaException):
+    """No Blockfrost request available within the limiter wait"""
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
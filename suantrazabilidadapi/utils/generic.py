@@ -21,6 +21,7 @@ class Constants:
     """Class to define constants for the project"""
     KEY_DIR: str = ".priv/wallets"
     CONTRACTS_DIR: str = ".priv/contracts"
+    SCRIPTS_DIR: str = ".priv/scripts"
     PROJECT_ROOT = pathlib.Path("suantrazabilidadapi")
     ENCODING_LENGHT_MAPPING: dict[str, int] = {
         "12": 128,
@@ -36,6 +37,91 @@ class Constants:
         NETWORK = Network.TESTNET
 
     HEADERS = {"Content-Type": "application/json"}
+    # Connection pool and timeouts (connect, read) per Plataforma GraphQL application
+    PLATAFORMA_POOL_CONNECTIONS = int(os.getenv("plataforma_pool_connections", "1"))
+    PLATAFORMA_POOL_MAXSIZE = int(os.getenv("plataforma_pool_maxsize", "20"))
+    PLATAFORMA_CONNECT_TIMEOUT = float(os.getenv("plataforma_connect_timeout", "3.05"))
+    PLATAFORMA_READ_TIMEOUT = float(os.getenv("plataforma_read_timeout", "10"))
+    ORACLE_POOL_CONNECTIONS = int(os.getenv("oracle_pool_connections", "1"))
+    ORACLE_POOL_MAXSIZE = int(os.getenv("oracle_pool_maxsize", "5"))
+    ORACLE_CONNECT_TIMEOUT = float(os.getenv("oracle_connect_timeout", "3.05"))
+    ORACLE_READ_TIMEOUT = float(os.getenv("oracle_read_timeout", "10"))
+    # Resilience of the calls to Plataforma: retries (seconds), circuit breakers and hedged reads
+    PLATAFORMA_RETRIES = int(os.getenv("plataforma_retries", "2"))
+    PLATAFORMA_RETRY_BASE_DELAY = float(os.getenv("plataforma_retry_base_delay", "0.2"))
+    PLATAFORMA_RETRY_MAX_DELAY = float(os.getenv("plataforma_retry_max_delay", "2"))
+    PLATAFORMA_BREAKER_FAILURES = int(os.getenv("plataforma_breaker_failures", "5"))
+    PLATAFORMA_BREAKER_RESET = float(os.getenv("plataforma_breaker_reset", "30"))
+    PLATAFORMA_HEDGE_READS = os.getenv("plataforma_hedge_reads", "false").lower() == "true"
+    PLATAFORMA_HEDGE_MIN_SAMPLES = int(os.getenv("plataforma_hedge_min_samples", "20"))
+    # Send sha256 hashes instead of documents once the GraphQL server has registered them
+    GRAPHQL_PERSISTED_QUERIES = os.getenv("graphql_persisted_queries", "false").lower() == "true"
+    # Items requested per page when following nextToken pagination of list queries
+    PLATAFORMA_PAGE_SIZE = int(os.getenv("plataforma_page_size", "100"))
+    # Maximum number of aliased queries sent in one batched GraphQL document
+    GRAPHQL_BATCH_MAXSIZE = int(os.getenv("graphql_batch_maxsize", "25"))
+    # Wallet records cache (seconds); the redis tier is shared by uvicorn and celery workers
+    WALLET_CACHE_ENABLED = os.getenv("wallet_cache_enabled", "true").lower() == "true"
+    WALLET_CACHE_MAXSIZE = int(os.getenv("wallet_cache_maxsize", "1024"))
+    WALLET_CACHE_TTL = float(os.getenv("wallet_cache_ttl", "60"))
+    WALLET_CACHE_REDIS = os.getenv("wallet_cache_redis", "false").lower() == "true"
+    WALLET_CACHE_REDIS_TTL = float(os.getenv("wallet_cache_redis_ttl", "300"))
+    # Derived key pairs and native policies kept in memory by the keyring, per wallet id
+    KEYRING_MAXSIZE = int(os.getenv("keyring_maxsize", "64"))
+    # Protocol/genesis parameters (seconds): epoch check interval when the epoch end is unknown
+    PROTOCOL_PARAMS_REDIS = os.getenv("protocol_params_redis", "true").lower() == "true"
+    PROTOCOL_PARAMS_REDIS_TTL = float(os.getenv("protocol_params_redis_ttl", "604800"))
+    PROTOCOL_PARAMS_CHECK_INTERVAL = float(os.getenv("protocol_params_check_interval", "300"))
+    # Background probes of the chain backends (seconds) and routing hysteresis
+    HEALTH_MONITOR_ENABLED = os.getenv("health_monitor_enabled", "true").lower() == "true"
+    HEALTH_PROBE_INTERVAL = float(os.getenv("health_probe_interval", "15"))
+    HEALTH_PROBE_TIMEOUT = float(os.getenv("health_probe_timeout", "5"))
+    HEALTH_WINDOW = int(os.getenv("health_window", "20"))
+    HEALTH_FAILURES_TO_SWITCH = int(os.getenv("health_failures_to_switch", "3"))
+    HEALTH_SUCCESSES_TO_SWITCH = int(os.getenv("health_successes_to_switch", "3"))
+    HEALTH_MIN_DWELL = float(os.getenv("health_min_dwell", "120"))
+    HEALTH_LATENCY_RATIO = float(os.getenv("health_latency_ratio", "2"))
+    OGMIOS_MIN_SYNC = float(os.getenv("ogmios_min_sync", "1"))
+    # Local UTxO index fed by Ogmios chain-sync: blocks kept for rollbacks, reconnect delay (seconds)
+    # and addresses followed besides the core wallet and the contracts (e.g. oracle wallets)
+    UTXO_INDEX_ENABLED = os.getenv("utxo_index_enabled", "true").lower() == "true"
+    UTXO_INDEX_ROLLBACK_DEPTH = int(os.getenv("utxo_index_rollback_depth", "2160"))
+    UTXO_INDEX_RECONNECT = float(os.getenv("utxo_index_reconnect", "5"))
+    UTXO_INDEX_ADDRESSES = tuple(a.strip() for a in os.getenv("utxo_index_addresses", "").split(",") if a.strip())
+    # Inputs of in-flight transactions hidden from other builders until confirmed (seconds)
+    PENDING_SPENDS_REDIS = os.getenv("pending_spends_redis", "true").lower() == "true"
+    PENDING_SPENDS_TTL = float(os.getenv("pending_spends_ttl", "900"))
+    PENDING_SPENDS_REBUILDS = int(os.getenv("pending_spends_rebuilds", "2"))
+    PENDING_SPENDS_REDIS_RETRY = float(os.getenv("pending_spends_redis_retry", "30"))
+    # Oracle reference inputs kept until spent; expiry (seconds) when the oracle address is not indexed
+    ORACLE_RESOLVER_ENABLED = os.getenv("oracle_resolver_enabled", "true").lower() == "true"
+    ORACLE_RESOLVER_TTL = float(os.getenv("oracle_resolver_ttl", "30"))
+    # Output shapes whose serialized size is memoized by the min-lovelace calculator
+    MIN_UTXO_SHAPES_MAXSIZE = int(os.getenv("min_utxo_shapes_maxsize", "4096"))
+    # Execution units evaluated in-process; the backend evaluator can still check every result
+    SCRIPT_EVAL_LOCAL = os.getenv("script_eval_local", "true").lower() == "true"
+    SCRIPT_EVAL_CROSS_CHECK = os.getenv("script_eval_cross_check", "false").lower() == "true"
+    # Blockfrost calls in flight per process when fanning out (Blockfrost allows 10 req/s, bursts of 500)
+    BLOCKFROST_CONCURRENCY = int(os.getenv("blockfrost_concurrency", "8"))
+    # Blockfrost project limits shared through redis by every worker: requests per second and burst,
+    # longest wait for a request and delay before trying redis again after an error (seconds)
+    BLOCKFROST_LIMITER_ENABLED = os.getenv("blockfrost_limiter_enabled", "true").lower() == "true"
+    BLOCKFROST_LIMITER_REDIS = os.getenv("blockfrost_limiter_redis", "true").lower() == "true"
+    BLOCKFROST_RATE_LIMIT = float(os.getenv("blockfrost_rate_limit", "10"))
+    BLOCKFROST_BURST_LIMIT = float(os.getenv("blockfrost_burst_limit", "500"))
+    BLOCKFROST_LIMITER_MAX_WAIT = float(os.getenv("blockfrost_limiter_max_wait", "10"))
+    BLOCKFROST_LIMITER_REDIS_RETRY = float(os.getenv("blockfrost_limiter_redis_retry", "30"))
+    # Confirmed transaction payloads kept on disk: blocks deep before caching, size cap (bytes), tip refresh (seconds)
+    TX_CACHE_ENABLED = os.getenv("tx_cache_enabled", "true").lower() == "true"
+    TX_CACHE_PATH = os.getenv("tx_cache_path", ".priv/cache/transactions.sqlite3")
+    TX_CACHE_CONFIRMATIONS = int(os.getenv("tx_cache_confirmations", "15"))
+    TX_CACHE_MAX_BYTES = int(os.getenv("tx_cache_max_bytes", str(256 * 1024 * 1024)))
+    TX_CACHE_TIP_TTL = float(os.getenv("tx_cache_tip_ttl", "20"))
+    # Policy asset listings and details; entries last ASSET_CACHE_FOLLOWED_TTL (seconds) while the
+    # UTxO index follows the chain and reports mints and burns, ASSET_CACHE_TTL otherwise
+    ASSET_CACHE_MAXSIZE = int(os.getenv("asset_cache_maxsize", "4096"))
+    ASSET_CACHE_TTL = float(os.getenv("asset_cache_ttl", "60"))
+    ASSET_CACHE_FOLLOWED_TTL = float(os.getenv("asset_cache_followed_ttl", "86400"))
     ORACLE_WALLET_NAME = "SuanOracle"
     # ORACLE_POLICY_ID = "b11a367d61a2b8f6a77049a809d7b93c6d44c140678d69276ab77c12"
     ORACLE_TOKEN_NAME = "SuanOracle"
@@ -0,0 +1,296 @@
+import hashlib
+import pathlib
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterator, Union
+
+from suantrazabilidadapi.core.config import ROOT
+
+GRAPHQL_DIR = ROOT.joinpath("graphql")
+
+OPERATION_KINDS = ("query", "mutation", "subscription")
+
+_NAME = re.compile(r"[_A-Za-z][_0-9A-Za-z]*")
+_SPREAD = re.compile(r"\.\.\.\s*([_A-Za-z][_0-9A-Za-z]*)")
+
+
+@dataclass(frozen=True)
+class GraphqlOperation:
+    """Single executable GraphQL operation with the fragments it uses"""
+
+    name: str
+    kind: str
+    document: str
+    sha256: str
+
+    @property
+    def is_mutation(self) -> bool:
+        return self.kind == "mutation"
+
+
+@dataclass()
+class GraphqlDocuments:
+    """Operations of a .graphql file, split into minimal per-operation documents"""
+
+    path: pathlib.Path
+    operations: dict[str, GraphqlOperation] = field(default_factory=dict)
+
+    def __post_init__(self):
+        # Hashes already accepted by the server when persisted queries are enabled
+        self.persisted: set[str] = set()
+        if not self.operations:
+            with open(self.path, "r", encoding="utf-8") as file:
+                self.operations = parse_operations(file.read())
+
+    def get(self, operation_name: str) -> GraphqlOperation:
+        operation = self.operations.get(operation_name)
+        if operation is None:
+            raise KeyError(f"Operation {operation_name} not found in {self.path.name}")
+        return operation
+
+    def __contains__(self, operation_name: str) -> bool:
+        return operation_name in self.operations
+
+    def payload(
+        self,
+        operation_name: str,
+        variables: Union[dict, None] = None,
+        persisted: bool = False,
+        force_document: bool = False,
+    ) -> dict:
+        """Build the request body for an operation.
+
+        With persisted queries the document is only sent until the server has accepted its hash.
+        """
+        operation = self.get(operation_name)
+        payload = {"operationName": operation.name, "variables": variables}
+        if not persisted:
+            payload["query"] = operation.document
+            return payload
+
+        payload["extensions"] = {
+            "persistedQuery": {"version": 1, "sha256Hash": operation.sha256}
+        }
+        if force_document or operation.sha256 not in self.persisted:
+            payload["query"] = operation.document
+        return payload
+
+    def mark_persisted(self, operation_name: str, persisted: bool = True):
+        sha256 = self.get(operation_name).sha256
+        if persisted:
+            self.persisted.add(sha256)
+        else:
+            self.persisted.discard(sha256)
+
+    @staticmethod
+    def persisted_query_not_found(data: dict) -> bool:
+        for error in data.get("errors") or []:
+            code = (error.get("extensions") or {}).get("code", "")
+            if code == "PERSISTED_QUERY_NOT_FOUND" or "PersistedQueryNotFound" in str(error.get("message", "")):
+                return True
+        return False
+
+
+def _strip_comments(source: str) -> str:
+    """Remove # comments, leaving string literals untouched"""
+    output = []
+    in_string = False
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if in_string:
+            output.append(char)
+            if char == "\\":
+                output.append(source[i + 1:i + 2])
+                i += 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+            output.append(char)
+        elif char == "#":
+            while i < len(source) and source[i] != "\n":
+                i += 1
+            continue
+        else:
+            output.append(char)
+        i += 1
+    return "".join(output)
+
+
+def _minify(definition: str) -> str:
+    """Collapse insignificant whitespace and commas outside string literals"""
+    parts = re.split(r'("(?:\\.|[^"\\])*")', definition)
+    for index in range(0, len(parts), 2):
+        compact = re.sub(r"[\s,]+", " ", parts[index])
+        parts[index] = re.sub(r" ?([{}():=\[\]!]) ?", r"\1", compact)
+    return "".join(parts).strip()
+
+
+def _unquoted(text: str) -> Iterator[tuple[int, str]]:
+    """Position and character of everything outside string literals"""
+    in_string = False
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if in_string:
+            if char == "\\":
+                i += 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        else:
+            yield i, char
+        i += 1
+
+
+def _split_definitions(source: str) -> list[str]:
+    """Split a document in its top-level definitions by matching braces"""
+    definitions = []
+    depth = 0
+    paren_depth = 0
+    start = None
+    for i, char in _unquoted(source):
+        if start is None and not char.isspace():
+            start = i
+        if char in "()":
+            paren_depth += 1 if char == "(" else -1
+        elif char == "{" and paren_depth == 0:
+            depth += 1
+        elif char == "}" and paren_depth == 0:
+            depth -= 1
+            if depth == 0:
+                definitions.append(source[start:i + 1])
+                start = None
+
+    if depth != 0 or (start is not None and source[start:].strip()):
+        raise ValueError("Unbalanced GraphQL document")
+    return definitions
+
+
+def parse_operations(source: str) -> dict[str, GraphqlOperation]:
+    """Parse every named operation of a GraphQL document into its own minimal document.
+
+    Each document carries only the fragments (transitively) spread in that operation.
+    """
+    fragments: dict[str, str] = {}
+    raw_operations: list[tuple[str, str, str]] = []
+
+    for definition in _split_definitions(_strip_comments(source)):
+        definition = _minify(definition)
+        keyword = _NAME.match(definition)
+        if keyword is None:
+            raise ValueError(f"Anonymous definitions are not supported: {definition[:40]}")
+        kind = keyword.group(0)
+        name = _NAME.match(definition, keyword.end() + 1)
+        if kind == "fragment" and name:
+            fragments[name.group(0)] = definition
+        elif kind in OPERATION_KINDS and name:
+            raw_operations.append((name.group(0), kind, definition))
+        else:
+            raise ValueError(f"Only named operations and fragments are supported: {definition[:40]}")
+
+    operations = {}
+    for name, kind, definition in raw_operations:
+        used: list[str] = []
+        pending = _SPREAD.findall(definition)
+        while pending:
+            fragment_name = pending.pop()
+            if fragment_name in used or fragment_name not in fragments:
+                continue
+            used.append(fragment_name)
+            pending.extend(_SPREAD.findall(fragments[fragment_name]))
+        document = " ".join([definition] + [fragments[f] for f in sorted(used)])
+        operations[name] = GraphqlOperation(
+            name=name,
+            kind=kind,
+            document=document,
+            sha256=hashlib.sha256(document.encode("utf-8")).hexdigest(),
+        )
+    return operations
+
+
+def _rename_variables(text: str, prefix: str) -> str:
+    """Prefix every $variable outside string literals"""
+    parts = re.split(r'("(?:\\.|[^"\\])*")', text)
+    for index in range(0, len(parts), 2):
+        parts[index] = re.sub(r"\$([_A-Za-z][_0-9A-Za-z]*)", rf"${prefix}\1", parts[index])
+    return "".join(parts)
+
+
+def _root_fields(selection: str) -> list[str]:
+    """Split a minified selection set body in its top-level fields"""
+    fields = []
+    depth = 0
+    start = 0
+    for i, char in _unquoted(selection):
+        if char in "({":
+            depth += 1
+        elif char in ")}":
+            depth -= 1
+        elif depth != 0:
+            continue
+        elif char == ":":
+            raise ValueError("Aliased root fields cannot be batched")
+        elif char == " " and selection[i + 1:i + 2] not in ("(", "{", "@", ""):
+            fields.append(selection[start:i])
+            start = i + 1
+    fields.append(selection[start:])
+    return [f.strip() for f in fields if f.strip()]
+
+
+def compose_batch(
+    requests: list[tuple[GraphqlOperation, Union[dict, None]]]
+) -> tuple[str, dict, list[dict[str, str]]]:
+    """Merge several queries in one document, aliasing root fields and variables per request.
+
+    Returns the document, its variables and, for each request, the alias of each of its root fields.
+    """
+    variable_definitions = []
+    selections = []
+    fragments: dict[str, str] = {}
+    variables: dict = {}
+    aliases: list[dict[str, str]] = []
+
+    for index, (operation, graphql_variables) in enumerate(requests):
+        if operation.kind != "query":
+            raise ValueError(f"Only queries can be batched, not {operation.name}")
+        definitions = _split_definitions(operation.document)
+        for fragment in definitions[1:]:
+            if "$" in fragment:
+                raise ValueError("Fragments using variables cannot be batched")
+            fragments[_NAME.match(fragment, len("fragment ")).group(0)] = fragment
+
+        definition = definitions[0]
+        body_start = definition.index("{")
+        header = definition[:body_start]
+        prefix = f"b{index}_"
+        if "(" in header:
+            variable_definitions.append(_rename_variables(header[header.index("(") + 1:header.rindex(")")], prefix))
+
+        request_aliases = {}
+        for field_text in _root_fields(_rename_variables(definition[body_start + 1:-1], prefix)):
+            field_name = _NAME.match(field_text).group(0)
+            alias = f"{prefix}{field_name}"
+            request_aliases[alias] = field_name
+            selections.append(f"{alias}:{field_text}")
+        aliases.append(request_aliases)
+
+        for name, value in (graphql_variables or {}).items():
+            variables[f"{prefix}{name}"] = value
+
+    header = f"query batch({' '.join(variable_definitions)})" if variable_definitions else "query batch"
+    document = " ".join([f"{header}{{{' '.join(selections)}}}"] + list(fragments.values()))
+    return document, variables, aliases
+
+
+@lru_cache(maxsize=None)
+def load_documents(path: pathlib.Path) -> GraphqlDocuments:
+    """Parse a .graphql file once per process"""
+    return GraphqlDocuments(path=pathlib.Path(path))
+
+
+MAIN_DOCUMENTS = load_documents(GRAPHQL_DIR.joinpath("queries.graphql"))
+ORACLE_DOCUMENTS = load_documents(GRAPHQL_DIR.joinpath("oracle_queries.graphql"))
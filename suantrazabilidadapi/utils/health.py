@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import httpx
+
+from suantrazabilidadapi.utils.generic import Constants
+from suantrazabilidadapi.utils.resilience import LatencyWindow
+
+BACKENDS = ("ogmios", "blockfrost")
+
+
+@dataclass()
+class BackendHealth:
+    """Rolling outcome and latency of the probes of one chain backend"""
+
+    name: str
+    window: int = 20
+
+    def __post_init__(self):
+        self.outcomes: deque = deque(maxlen=self.window)
+        self.latencies = LatencyWindow(size=self.window)
+        self.consecutive_failures = 0
+        self.consecutive_successes = 0
+        self.last_checked: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.detail: dict[str, Any] = {}
+
+    def record(self, ok: bool, latency: float, detail: Optional[dict] = None, error: Optional[str] = None):
+        self.outcomes.append(ok)
+        self.last_checked = time.time()
+        self.detail = detail or {}
+        if ok:
+            self.latencies.add(latency)
+            self.consecutive_successes += 1
+            self.consecutive_failures = 0
+            self.last_error = None
+        else:
+            self.consecutive_failures += 1
+            self.consecutive_successes = 0
+            self.last_error = error
+
+    @property
+    def probed(self) -> bool:
+        return self.last_checked is not None
+
+    @property
+    def healthy(self) -> bool:
+        return bool(self.outcomes) and self.outcomes[-1]
+
+    @property
+    def error_rate(self) -> Optional[float]:
+        if not self.outcomes:
+            return None
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "error_rate": self.error_rate,
+            "p50_seconds": self.latencies.percentile(0.5),
+            "p95_seconds": self.latencies.percentile(0.95),
+            "consecutive_failures": self.consecutive_failures,
+            "consecutive_successes": self.consecutive_successes,
+            "last_checked": self.last_checked,
+            "last_error": self.last_error,
+            "detail": self.detail,
+        }
+
+
+@dataclass()
+class BackendMonitor(Constants):
+    """Probes Ogmios and Blockfrost in the background and routes chain contexts to the healthiest.
+
+    Routing has hysteresis: the current backend is only left after several failed probes in a
+    row, or when the other one has been consistently faster, and never before a minimum dwell
+    time since the previous switch. Without the monitor running (celery workers), the configured
+    backend is used.
+    """
+
+    preferred: str = field(default_factory=lambda: os.getenv("CHAIN_BACKEND") or "blockfrost")
+
+    def __post_init__(self):
+        self.health = {name: BackendHealth(name, self.HEALTH_WINDOW) for name in BACKENDS}
+        self.current = self.preferred
+        self.switched_at: Optional[float] = None
+        self.switches = 0
+        # Whether the current backend was chosen because the other one failed
+        self.failed_over = False
+        self._task: Optional[asyncio.Task] = None
+
+    def backend(self) -> str:
+        return self.current
+
+    def other(self, name: str) -> str:
+        return "blockfrost" if name == "ogmios" else "ogmios"
+
+    def record(self, name: str, ok: bool, latency: float, detail: Optional[dict] = None, error: Optional[str] = None):
+        self.health[name].record(ok, latency, detail, error)
+
+    def _switch(self, name: str, reason: str, failed_over: bool = False):
+        logging.warning(f"Chain backend switched from {self.current} to {name}: {reason}")
+        self.current = name
+        self.switched_at = time.monotonic()
+        self.switches += 1
+        self.failed_over = failed_over
+
+    def route(self) -> str:
+        """Re-evaluate the backend used for new chain contexts after a round of probes"""
+        current = self.health[self.current]
+        candidate = self.health[self.other(self.current)]
+        if not candidate.healthy or candidate.consecutive_successes < self.HEALTH_SUCCESSES_TO_SWITCH:
+            return self.current
+        if current.consecutive_failures >= self.HEALTH_FAILURES_TO_SWITCH:
+            self._switch(candidate.name, f"{current.consecutive_failures} failed probes", failed_over=True)
+            return self.current
+
+        if self.switched_at is not None and time.monotonic() - self.switched_at < self.HEALTH_MIN_DWELL:
+            return self.current
+        current_p50 = current.latencies.percentile(0.5)
+        candidate_p50 = candidate.latencies.percentile(0.5)
+        if candidate.name == self.preferred and (
+            self.failed_over
+            # Left for being slower: only back once it no longer is
+            or (
+                current_p50 is not None
+                and candidate_p50 is not None
+                and candidate_p50 <= current_p50 * self.HEALTH_LATENCY_RATIO
+            )
+        ):
+            self._switch(candidate.name, "preferred backend recovered")
+            return self.current
+        if (
+            current.healthy
+            and current_p50 is not None
+            and candidate_p50 is not None
+            and len(candidate.latencies) >= self.HEALTH_SUCCESSES_TO_SWITCH
+            and current_p50 > candidate_p50 * self.HEALTH_LATENCY_RATIO
+        ):
+            self._switch(candidate.name, f"p50 {current_p50:.3f}s against {candidate_p50:.3f}s")
+        return self.current
+
+    async def probe_ogmios(self, client: httpx.AsyncClient):
+        start = time.monotonic()
+        try:
+            response = await client.get(f"http://{self.OGMIOS_URL}:{self.OGMIOS_PORT}/health")
+            response.raise_for_status()
+            data = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            self.record("ogmios", False, time.monotonic() - start, error=str(e))
+            return
+        detail = {
+            "connectionStatus": data.get("connectionStatus"),
+            "networkSynchronization": data.get("networkSynchronization"),
+        }
+        synced = (data.get("networkSynchronization") or 0) >= self.OGMIOS_MIN_SYNC
+        ok = data.get("connectionStatus") == "connected" and synced
+        self.record("ogmios", ok, time.monotonic() - start, detail, None if ok else "Ogmios not synchronized")
+
+    async def probe_blockfrost(self, client: httpx.AsyncClient):
+        project_id = os.getenv("block_frost_project_id") or self.BLOCK_FROST_PROJECT_ID
+        start = time.monotonic()
+        try:
+            response = await client.get(f"{self.BASE_URL}/v0/health", headers={"project_id": project_id})
+            response.raise_for_status()
+            ok = bool(response.json().get("is_healthy"))
+        except (httpx.HTTPError, ValueError) as e:
+            self.record("blockfrost", False, time.monotonic() - start, error=str(e))
+            return
+        self.record("blockfrost", ok, time.monotonic() - start, error=None if ok else "Blockfrost not healthy")
+
+    async def probe(self, client: httpx.AsyncClient) -> str:
+        await asyncio.gather(self.probe_ogmios(client), self.probe_blockfrost(client))
+        return self.route()
+
+    async def run(self):
+        async with httpx.AsyncClient(timeout=self.HEALTH_PROBE_TIMEOUT) as client:
+            while True:
+                try:
+                    await self.probe(client)
+                except Exception as e:  # pylint: disable=broad-except
+                    logging.error(f"Backend health probe failed: {e}")
+                await asyncio.sleep(self.HEALTH_PROBE_INTERVAL)
+
+    def start(self):
+        if self.HEALTH_MONITOR_ENABLED and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "backend": self.current,
+            "preferred": self.preferred,
+            "monitoring": self._task is not None and not self._task.done(),
+            "switches": self.switches,
+            "seconds_since_switch": (
+                round(time.monotonic() - self.switched_at, 3) if self.switched_at is not None else None
+            ),
+            "backends": {name: health.stats() for name, health in self.health.items()},
+        }
+
+
+backend_monitor = BackendMonitor()
@@ -0,0 +1,53 @@
+import base64
+import json
+from dataclasses import asdict, dataclass
+from typing import Iterator, Optional
+
+HISTORY_KINDS = ("transactions", "utxos")
+
+
+@dataclass(frozen=True)
+class HistoryCursor:
+    """Position in an address history export, handed to clients as an opaque token.
+
+    Transactions are walked in chain order, so their position is the block height and the index
+    of the transaction in the block. UTxOs carry no height in Blockfrost: their position is the
+    page and the reference of the last UTxO sent.
+    """
+
+    kind: str
+    height: Optional[int] = None
+    index: Optional[int] = None
+    page: Optional[int] = None
+    ref: Optional[str] = None
+
+    def encode(self) -> str:
+        values = {key: value for key, value in asdict(self).items() if value is not None}
+        token = base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode())
+        return token.decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "HistoryCursor":
+        try:
+            cursor = cls(**json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid cursor: {token}") from e
+        if cursor.kind == "transactions":
+            valid = isinstance(cursor.height, int) and isinstance(cursor.index, int)
+        else:
+            valid = cursor.kind == "utxos" and isinstance(cursor.page, int) and cursor.page >= 1
+            valid = valid and isinstance(cursor.ref, str)
+        if not valid:
+            raise ValueError(f"Invalid cursor: {token}")
+        return cursor
+
+
+def history_lines(
+    rows: Iterator[tuple[dict, HistoryCursor]], cursor: Optional[HistoryCursor] = None
+) -> Iterator[dict]:
+    """Export lines: every item with the cursor resuming after it, then a last line telling the
+    export is complete"""
+    last = cursor
+    for item, last in rows:
+        yield {"cursor": last.encode(), "item": item}
+    yield {"done": True, "cursor": last.encode() if last else None}
@@ -0,0 +1,176 @@
+import asyncio
+import binascii
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from pycardano import (
+    ExtendedSigningKey,
+    HDWallet,
+    PaymentVerificationKey,
+    ScriptAll,
+    ScriptHash,
+    ScriptPubkey,
+    VerificationKeyHash,
+)
+
+from suantrazabilidadapi.utils.exception import PlataformaException
+from suantrazabilidadapi.utils.generic import Constants
+
+DERIVATION_PATH = "m/1852'/1815'/0'/0/0"
+
+
+class KeyringError(PlataformaException):
+    """Keys of a wallet are no longer usable"""
+
+
+@dataclass()
+class WalletKeys:
+    """Payment keys of the first address of a wallet and the native policy they sign.
+
+    The extended signing key is kept in a bytearray that is overwritten with zeros when
+    the keys leave the keyring; take ``signing_key`` right after getting the keys.
+    """
+
+    wallet_id: str
+    verification_key: PaymentVerificationKey
+    vkey_hash: VerificationKeyHash
+    policy: ScriptAll
+    policy_id: ScriptHash
+    seed_digest: bytes = field(repr=False)
+    _secret: bytearray = field(repr=False)
+
+    @classmethod
+    def derive(cls, wallet_id: str, seed: str) -> "WalletKeys":
+        """BIP32-Ed25519 derivation of the wallet payment keys; CPU bound"""
+        child_hdwallet = HDWallet.from_seed(seed).derive_from_path(DERIVATION_PATH)
+        signing_key = ExtendedSigningKey.from_hdwallet(child_hdwallet)
+        verification_key = PaymentVerificationKey.from_primitive(child_hdwallet.public_key)
+        vkey_hash = verification_key.hash()
+        policy = ScriptAll([ScriptPubkey(vkey_hash)])
+        return cls(
+            wallet_id=wallet_id,
+            verification_key=verification_key,
+            vkey_hash=vkey_hash,
+            policy=policy,
+            policy_id=policy.hash(),
+            seed_digest=Keyring.seed_digest(seed),
+            _secret=bytearray(signing_key.payload),
+        )
+
+    @property
+    def signing_key(self) -> ExtendedSigningKey:
+        if not any(self._secret):
+            raise KeyringError(f"Keys of wallet {self.wallet_id} were evicted from the keyring")
+        return ExtendedSigningKey(
+            payload=bytes(self._secret),
+            key_type=ExtendedSigningKey.KEY_TYPE,
+            description=ExtendedSigningKey.DESCRIPTION,
+        )
+
+    @property
+    def policy_id_hex(self) -> str:
+        return binascii.hexlify(self.policy_id.payload).decode("utf-8")
+
+    def wipe(self):
+        # Only the bytearray can be overwritten; copies made by pycardano are left to the GC
+        self._secret[:] = bytes(len(self._secret))
+
+
+@dataclass()
+class Keyring(Constants):
+    """Bounded LRU of the keys derived from the wallet seeds, keyed by wallet id.
+
+    Derivations requested from the event loop run in a worker thread. Entries are wiped
+    when they are evicted, either by the LRU bound or explicitly with ``evict``.
+    """
+
+    maxsize: Optional[int] = None
+
+    def __post_init__(self):
+        if self.maxsize is None:
+            self.maxsize = self.KEYRING_MAXSIZE
+        self._lock = threading.Lock()
+        self._keys: OrderedDict[str, WalletKeys] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def seed_digest(seed: str) -> bytes:
+        return hashlib.sha256(seed.encode("utf-8")).digest()
+
+    def _lookup(self, wallet_id: str, seed: str) -> Optional[WalletKeys]:
+        with self._lock:
+            keys = self._keys.get(wallet_id)
+            if keys is None or keys.seed_digest != self.seed_digest(seed):
+                self.misses += 1
+                return None
+            self._keys.move_to_end(wallet_id)
+            self.hits += 1
+            return keys
+
+    def _store(self, keys: WalletKeys) -> WalletKeys:
+        evicted = []
+        with self._lock:
+            current = self._keys.get(keys.wallet_id)
+            if current is not None and current.seed_digest == keys.seed_digest:
+                # Derived concurrently by another request: keep a single copy of the secret
+                evicted.append(keys)
+                keys = current
+            else:
+                if current is not None:
+                    evicted.append(current)
+                self._keys[keys.wallet_id] = keys
+            self._keys.move_to_end(keys.wallet_id)
+            while len(self._keys) > self.maxsize:
+                evicted.append(self._keys.popitem(last=False)[1])
+                self.evictions += 1
+        for stale in evicted:
+            stale.wipe()
+        return keys
+
+    def get(self, wallet_id: str, seed: str) -> WalletKeys:
+        """Keys of the wallet, derived in the calling thread on a miss"""
+        keys = self._lookup(wallet_id, seed)
+        if keys is None:
+            keys = self._store(WalletKeys.derive(wallet_id, seed))
+        return keys
+
+    async def aget(self, wallet_id: str, seed: str) -> WalletKeys:
+        """Keys of the wallet, derived in a worker thread on a miss"""
+        keys = self._lookup(wallet_id, seed)
+        if keys is None:
+            keys = self._store(await asyncio.to_thread(WalletKeys.derive, wallet_id, seed))
+        return keys
+
+    def evict(self, wallet_id: str) -> bool:
+        with self._lock:
+            keys = self._keys.pop(wallet_id, None)
+        if keys is None:
+            return False
+        keys.wipe()
+        logging.info(f"Keys of wallet {wallet_id} evicted from the keyring")
+        return True
+
+    def clear(self):
+        with self._lock:
+            evicted = list(self._keys.values())
+            self._keys.clear()
+        for keys in evicted:
+            keys.wipe()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self._keys),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+wallet_keyring = Keyring()
@@ -0,0 +1,130 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Iterable, Optional
+
+from pycardano import ChainContext, PlutusData, RawCBOR, RawPlutusData, TransactionOutput, Value
+
+from suantrazabilidadapi.utils.blockchain import CardanoNetwork
+from suantrazabilidadapi.utils.generic import Constants
+from suantrazabilidadapi.utils.protocol_params import protocol_params_cache
+
+# Bytes added by the ledger to the serialized size of every output (Babbage)
+CONSTANT_OVERHEAD = 160
+# pycardano sizes outputs holding 0 lovelace as if they held 1 ADA
+DEFAULT_COIN = 1_000_000
+
+
+def uint_class(value: int) -> int:
+    """CBOR encodes integers in 1, 2, 3, 5 or 9 bytes depending on their magnitude"""
+    magnitude = -value - 1 if value < 0 else value
+    for size, limit in enumerate((24, 1 << 8, 1 << 16, 1 << 32)):
+        if magnitude < limit:
+            return size if value >= 0 else -size - 1
+    return 4 if value >= 0 else -5
+
+
+def _datum_size(datum: Any) -> Optional[int]:
+    if isinstance(datum, RawCBOR):
+        return len(datum.cbor)
+    if isinstance(datum, (PlutusData, RawPlutusData)):
+        return len(datum.to_cbor())
+    return None
+
+
+def output_shape(output: TransactionOutput, coin: int) -> Optional[Hashable]:
+    """Everything the CBOR size of the output depends on, or None when it cannot be told apart.
+
+    Policy ids and datum hashes have a fixed length, so two outputs with the same address length,
+    integer classes, asset name lengths and datum size serialize to the same number of bytes.
+    """
+    if output.script is not None:
+        return None
+    datum_size = None
+    if output.datum is not None:
+        datum_size = _datum_size(output.datum)
+        if datum_size is None:
+            return None
+    assets = tuple(
+        sorted(
+            tuple(sorted((len(name.payload), uint_class(quantity)) for name, quantity in asset.items()))
+            for asset in output.amount.multi_asset.values()
+        )
+    )
+    return (
+        len(output.address.to_primitive()),
+        uint_class(coin),
+        assets,
+        output.datum_hash is not None,
+        datum_size,
+    )
+
+
+@dataclass()
+class MinUtxoCalculator(Constants):
+    """Minimum lovelace of transaction outputs, computed without a chain context.
+
+    Gives the same result as pycardano's min_lovelace: (160 + serialized size) * coins_per_utxo_byte.
+    coins_per_utxo_byte comes from protocol_params_cache, and the serialized size is memoized per
+    output shape, so outputs that only differ in their address, policy or amounts are not
+    serialized again.
+    """
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._sizes: OrderedDict[Hashable, int] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def coins_per_utxo_byte(self, chain_context: Optional[ChainContext] = None) -> int:
+        entry = protocol_params_cache.peek()
+        if entry is not None:
+            return entry.protocol_param.coins_per_utxo_byte
+        if chain_context is None:
+            chain_context = CardanoNetwork().get_chain_context()
+        return chain_context.protocol_param.coins_per_utxo_byte
+
+    def size(self, output: TransactionOutput) -> int:
+        """Serialized size of the output in its post-alonzo format"""
+        coin = output.amount.coin or DEFAULT_COIN
+        shape = output_shape(output, coin)
+        if shape is not None:
+            with self._lock:
+                size = self._sizes.get(shape)
+                if size is not None:
+                    self._sizes.move_to_end(shape)
+                    self.hits += 1
+                    return size
+        self.misses += 1
+        size = len(
+            TransactionOutput(
+                output.address,
+                Value(coin, output.amount.multi_asset),
+                output.datum_hash,
+                output.datum,
+                output.script,
+                True,
+            ).to_cbor()
+        )
+        if shape is not None:
+            with self._lock:
+                self._sizes[shape] = size
+                while len(self._sizes) > self.MIN_UTXO_SHAPES_MAXSIZE:
+                    self._sizes.popitem(last=False)
+        return size
+
+    def min_lovelace(self, chain_context: Optional[ChainContext], output: TransactionOutput) -> int:
+        """Drop-in replacement of pycardano's min_lovelace(chain_context, output=...)"""
+        return (CONSTANT_OVERHEAD + self.size(output)) * self.coins_per_utxo_byte(chain_context)
+
+    def min_lovelaces(
+        self, outputs: Iterable[TransactionOutput], chain_context: Optional[ChainContext] = None
+    ) -> list[int]:
+        coins_per_utxo_byte = self.coins_per_utxo_byte(chain_context)
+        return [(CONSTANT_OVERHEAD + self.size(output)) * coins_per_utxo_byte for output in outputs]
+
+    def stats(self) -> dict[str, Any]:
+        return {"shapes": len(self._sizes), "hits": self.hits, "misses": self.misses}
+
+
+min_utxo_calculator = MinUtxoCalculator()
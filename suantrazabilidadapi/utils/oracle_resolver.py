@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from fastapi import HTTPException
+from pycardano import ChainContext, UTxO
+
+from suantrazabilidadapi.utils.exception import ResponseDynamoDBException
+from suantrazabilidadapi.utils.generic import Constants
+from suantrazabilidadapi.utils.plataforma import Helpers, OracleReference
+from suantrazabilidadapi.utils.utxo_index import BlockChanges, local_utxo_index
+
+
+@dataclass()
+class OracleResolver(Constants):
+    """Oracle reference inputs per oracle wallet id, resolved once and reused by buy/unlock transactions.
+
+    Resolving an oracle costs a wallet lookup, a marketplace lookup and a scan of the oracle address.
+    The result is kept until the oracle UTxO is spent: the local UTxO index reports the spend through
+    its block subscription, and the oracle-datum endpoint invalidates the entry when it updates the
+    datum. When the index does not follow the oracle address, entries expire after ORACLE_RESOLVER_TTL.
+    """
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[str, OracleReference] = {}
+        self._by_ref: dict[tuple[str, int], str] = {}
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        local_utxo_index.subscribe(self.on_block)
+
+    def _valid(self, oracle: OracleReference) -> bool:
+        # The index holds the oracle UTxO until it is spent, even when a block notification was missed
+        if local_utxo_index.utxo(*oracle.ref) is not None:
+            return True
+        if local_utxo_index.ready and local_utxo_index.tracked(oracle.address):
+            return False
+        return time.time() - oracle.resolved_at < self.ORACLE_RESOLVER_TTL
+
+    def cached(self, oracle_wallet_id: str) -> Optional[OracleReference]:
+        with self._lock:
+            oracle = self._entries.get(oracle_wallet_id)
+            if oracle is not None and not self._valid(oracle):
+                self._drop(oracle_wallet_id)
+                return None
+            return oracle
+
+    async def resolve(self, chain_context: ChainContext, oracle_wallet_id: str) -> OracleReference:
+        """Cached oracle reference of the wallet, looked up once when missing or spent"""
+        if self.ORACLE_RESOLVER_ENABLED:
+            oracle = self.cached(oracle_wallet_id)
+            if oracle is not None:
+                self.hits += 1
+                return oracle
+
+        # Concurrent requests for the same oracle share a single lookup
+        pending = self._inflight.get(oracle_wallet_id)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                # The request doing the lookup was cancelled, not this one: look the oracle up again
+                return await self.resolve(chain_context, oracle_wallet_id)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[oracle_wallet_id] = future
+        try:
+            oracle = await Helpers().oracle_reference(chain_context, oracle_wallet_id)
+            if self.ORACLE_RESOLVER_ENABLED:
+                self._store(oracle)
+            future.set_result(oracle)
+            return oracle
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieve the exception so it is not reported as never awaited
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(oracle_wallet_id, None)
+            if not future.done():
+                # Cancelled lookup: release the requests waiting on it
+                future.cancel()
+
+    async def reference_input(self, chain_context: ChainContext, oracle_wallet_id: str) -> UTxO:
+        """Oracle UTxO to add as reference input, with the errors of Helpers.build_reference_input_oracle"""
+        try:
+            return (await self.resolve(chain_context, oracle_wallet_id)).utxo
+        except ResponseDynamoDBException as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+        except Exception as e:
+            # Handling other types of exceptions
+            raise HTTPException(status_code=500, detail=str(e)) from e
+
+    def _store(self, oracle: OracleReference):
+        with self._lock:
+            self._drop(oracle.oracle_wallet_id)
+            self._entries[oracle.oracle_wallet_id] = oracle
+            self._by_ref[oracle.ref] = oracle.oracle_wallet_id
+
+    def _drop(self, oracle_wallet_id: str) -> bool:
+        oracle = self._entries.pop(oracle_wallet_id, None)
+        if oracle is None:
+            return False
+        self._by_ref.pop(oracle.ref, None)
+        return True
+
+    def invalidate(self, oracle_wallet_id: Optional[str] = None):
+        """Forget the oracle of the wallet, or every oracle when no wallet id is given"""
+        with self._lock:
+            if oracle_wallet_id is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._by_ref.clear()
+            elif self._drop(oracle_wallet_id):
+                self.invalidations += 1
+
+    def on_block(self, changes: BlockChanges, tx_ids: list[str]):
+        """Drop the oracles whose UTxO was spent in the block applied by the local UTxO index"""
+        with self._lock:
+            for _, utxo in changes.spent:
+                ref = (utxo.input.transaction_id.payload.hex(), utxo.input.index)
+                oracle_wallet_id = self._by_ref.get(ref)
+                if oracle_wallet_id is not None and self._drop(oracle_wallet_id):
+                    self.invalidations += 1
+                    logging.info(f"Oracle {oracle_wallet_id} UTxO spent in slot {changes.slot}")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.ORACLE_RESOLVER_ENABLED,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+oracle_references = OracleResolver()
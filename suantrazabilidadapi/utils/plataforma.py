@@ -1,12 +1,14 @@
 import binascii
+import functools
 import json
 import logging
 import os
 import pathlib
+import time
 import uuid
-from dataclasses import dataclass
-from typing import Optional, Union, Any, Dict
-from types import SimpleNamespace as Namespace
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterator, Mapping, Optional, Union, Any, Dict
+from types import MappingProxyType, SimpleNamespace as Namespace
 from blockfrost.utils import ApiError
 from fastapi import HTTPException
 from redis.asyncio import ConnectionPool, Redis
@@ -16,6 +18,8 @@ from redis.exceptions import ResponseError
 from redis.commands.search.field import TextField
 
 import boto3
+import cbor2
+import httpx
 import requests
 from botocore.exceptions import ClientError
 from pycardano import (
@@ -36,18 +40,34 @@ from pycardano import (
     PaymentVerificationKey,
     StakeVerificationKey,
     Network,
-    ExtendedSigningKey
+    ExtendedSigningKey,
+    RawCBOR,
+    TransactionInput,
+    datum_hash,
+    script_hash,
 )
 
 # from blockfrost import ApiUrls, BlockFrostApi
 
 from pycardano.key import Key
+from pycardano.serialization import default_encoder
 from suantrazabilidadapi.core.config import config
 from suantrazabilidadapi.routers.api_v1.endpoints import pydantic_schemas
 # from suantrazabilidadapi.utils.blockchain import Keys
+from suantrazabilidadapi.utils.asset_cache import policy_assets
+from suantrazabilidadapi.utils.asset_index import AssetIndex
+from suantrazabilidadapi.utils.cache import wallet_cache
 from suantrazabilidadapi.utils.generic import Constants
+from suantrazabilidadapi.utils.keyring import wallet_keyring
+from suantrazabilidadapi.utils.graphql_documents import MAIN_DOCUMENTS, ORACLE_DOCUMENTS, GraphqlDocuments
+from suantrazabilidadapi.utils.history import HistoryCursor
+from suantrazabilidadapi.utils.rate_limit import blockfrost_api, blockfrost_limiter
+from suantrazabilidadapi.utils.pools import blockfrost_executor, plataforma_async_clients, plataforma_sessions
+from suantrazabilidadapi.utils.resilience import resilience
 from suantrazabilidadapi.utils.response import Response
-from suantrazabilidadapi.utils.exception import ResponseDynamoDBException
+from suantrazabilidadapi.utils.tx_cache import TX_KINDS, confirmed_txs
+from suantrazabilidadapi.utils.utxo_index import local_utxo_index
+from suantrazabilidadapi.utils.exception import PlataformaException, ResponseDynamoDBException
 
 plataformaSecrets = config(section="plataforma")
 security = config(section="security")
@@ -55,58 +75,113 @@ optional = config(section="optional")
 environment = security["env"]
 
 
+@dataclass(frozen=True)
+class GraphqlApplication:
+    """Endpoint, key, documents and headers of one Plataforma GraphQL application.
+
+    Instances are immutable, so one of them can be shared by every request and thread.
+    """
+
+    name: str
+    endpoint: Optional[str]
+    api_key: Optional[str]
+    documents: GraphqlDocuments
+    headers: Mapping[str, str]
+
+    @classmethod
+    def create(cls, name: str, endpoint: Optional[str], api_key: Optional[str], documents: GraphqlDocuments):
+        headers = MappingProxyType({**Constants.HEADERS, "x-api-key": api_key})
+        return cls(name, endpoint, api_key, documents, headers)
+
+
+GRAPHQL_APPLICATIONS: Mapping[str, GraphqlApplication] = MappingProxyType(
+    {
+        "main": GraphqlApplication.create(
+            "main",
+            os.getenv(f"endpoint_{environment}"),
+            os.getenv(f"graphql_key_{environment}"),
+            MAIN_DOCUMENTS,
+        ),
+        "oracle": GraphqlApplication.create(
+            "oracle",
+            os.getenv("oracle_endpoint"),
+            os.getenv("oracle_graphql_key"),
+            ORACLE_DOCUMENTS,
+        ),
+    }
+)
+
+
 @dataclass()
 class Plataforma(Constants):
-    """Class representing all the methods to interact with Plataforma"""
+    """Class representing all the methods to interact with Plataforma.
+
+    The instance holds no per-call state: the application of each call selects one of the
+    immutable GRAPHQL_APPLICATIONS, so the module-level ``plataforma_client`` is shared by all callers.
+    """
 
     def __post_init__(self):
-        if environment == "internal":
-            self.graphqlEndpoint = os.getenv("endpoint_internal")
-            self.awsAppSyncApiKey = os.getenv("graphql_key_internal")
-        elif environment == "dev":
-            self.graphqlEndpoint = os.getenv("endpoint_dev")
-            self.awsAppSyncApiKey = os.getenv("graphql_key_dev")
-        elif environment == "prod":
-            self.graphqlEndpoint = os.getenv("endpoint_prod")
-            self.awsAppSyncApiKey = os.getenv("graphql_key_prod")
-
-        self.HEADERS["x-api-key"] = self.awsAppSyncApiKey
-
-        self.GRAPHQL = self.PROJECT_ROOT.joinpath("graphql/queries.graphql")
-        # Section for Oracle queries
-        # self.oracleGraphqlEndpoint = os.getenv("oracle_endpoint")
-        # self.oracleAwsAppSyncApiKey = os.getenv("oracle_graphql_key")
-        # self.ORACLE_GRAPHQL = self.PROJECT_ROOT.joinpath("graphql/oracle_queries.graphql")
+        self.applications = GRAPHQL_APPLICATIONS
+        # Operations are parsed once per process and sent as minimal per-operation documents
+        self.GRAPHQL = MAIN_DOCUMENTS
+
+    def _application(self, application: str = "") -> GraphqlApplication:
+        return self.applications[application or "main"]
 
     def _post(
-        self, operation_name: str, graphql_variables: Union[dict, None] = None, application: str = ""
+        self,
+        operation_name: str,
+        graphql_variables: Union[dict, None] = None,
+        application: str = "",
+        record_id: Optional[str] = None,
     ) -> dict:
-        
-        if application == "oracle":
-            self.graphqlEndpoint = os.getenv("oracle_endpoint")
-            self.awsAppSyncApiKey = os.getenv("oracle_graphql_key")
-            self.GRAPHQL = self.PROJECT_ROOT.joinpath("graphql/oracle_queries.graphql")
-
 
-        self.HEADERS["x-api-key"] = self.awsAppSyncApiKey
-        with open(self.GRAPHQL, "r", encoding="utf-8") as file:
-            graphqlQueries = file.read()
-        try:
-            rawResult = requests.post(
-                self.graphqlEndpoint,
-                json={
-                    "query": graphqlQueries,
-                    "operationName": operation_name,
-                    "variables": graphql_variables,
-                },
-                headers=self.HEADERS,
-                timeout=10
+        app = self._application(application)
+        documents = app.documents
+        if operation_name not in documents:
+            return {
+                "success": False,
+                "error": f"Operation {operation_name} not found in {documents.path.name}",
+            }
+        persisted = self.GRAPHQL_PERSISTED_QUERIES
+        headers = app.headers
+
+        def send() -> dict:
+            # Reuse the keep-alive connections of the process-wide pool for this application
+            session = plataforma_sessions.session(app.name)
+            rawResult = session.post(
+                app.endpoint,
+                json=documents.payload(operation_name, graphql_variables, persisted),
+                headers=headers,
+                timeout=plataforma_sessions.timeout(app.name)
             )
             rawResult.raise_for_status()
             data = json.loads(rawResult.content.decode("utf-8"))
+            if persisted and documents.persisted_query_not_found(data):
+                # The server does not know the hash (anymore), send the full document once
+                documents.mark_persisted(operation_name, False)
+                rawResult = session.post(
+                    app.endpoint,
+                    json=documents.payload(operation_name, graphql_variables, persisted, force_document=True),
+                    headers=headers,
+                    timeout=plataforma_sessions.timeout(app.name)
+                )
+                rawResult.raise_for_status()
+                data = json.loads(rawResult.content.decode("utf-8"))
+            if persisted and not documents.persisted_query_not_found(data):
+                documents.mark_persisted(operation_name)
+            return data
+
+        try:
+            data = resilience.call(
+                f"{app.name}:{operation_name}",
+                send,
+                is_mutation=documents.get(operation_name).is_mutation,
+                record_id=record_id,
+            )
             response = {"success": True, "data": data}
 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, PlataformaException) as e:
             # Handle any exceptions that occur during the request
             response = {"success": False, "error": str(e)}
 
@@ -140,7 +215,15 @@ class Plataforma(Constants):
     #TODO: Function to be decomissioned in the future. Move to genericGet
     def getWallet(self, command_name: str, graphql_variables: dict) -> dict:
 
+        cache_key = wallet_cache.key(command_name, graphql_variables)
+        if cache_key is not None:
+            data = wallet_cache.get(cache_key)
+            if data is not None:
+                return data
+
         data = self._post(command_name, graphql_variables)
+        if cache_key is not None:
+            wallet_cache.set(cache_key, data)
 
         return data
 
@@ -178,15 +261,16 @@ class Plataforma(Constants):
 
         return wallet_id, seed, skey, payment_verification_key, address, stake_address
 
-    def createWallet(self, values, mutation_type: str) -> list[dict]:
+    def createWallet(self, values, mutation_type: str, record_id: Optional[str] = None) -> list[dict]:
 
         operation_name = "WalletMutation" if mutation_type == "user" else "WalletMutationWithouttUserID"
 
-        response = self._post(operation_name, values)
+        response = self._post(operation_name, values, record_id=record_id)
+        wallet_cache.invalidate(values)
         return response
 
-    def createContract(self, values: dict) -> list[dict]:
-        response = self._post("ScriptMutation", values)
+    def createContract(self, values: dict, record_id: Optional[str] = None) -> list[dict]:
+        response = self._post("ScriptMutation", values, record_id=record_id)
         return response
 
     #TODO: Function to be decomissioned in the future. Move to genericGet
@@ -440,10 +524,196 @@ class Plataforma(Constants):
         response = self._post("createMerkleTree", values, application="oracle")
         return response
 
+@dataclass()
+class AsyncPlataforma(Plataforma):
+    """Plataforma GraphQL operations awaited on the event loop instead of blocking it"""
+
+    async def _post(
+        self,
+        operation_name: str,
+        graphql_variables: Union[dict, None] = None,
+        application: str = "",
+        record_id: Optional[str] = None,
+    ) -> dict:
+
+        app = self._application(application)
+        documents = app.documents
+        if operation_name not in documents:
+            return {
+                "success": False,
+                "error": f"Operation {operation_name} not found in {documents.path.name}",
+            }
+        persisted = self.GRAPHQL_PERSISTED_QUERIES
+        headers = app.headers
+
+        async def send() -> dict:
+            client = plataforma_async_clients.client(app.name)
+            rawResult = await client.post(
+                app.endpoint,
+                json=documents.payload(operation_name, graphql_variables, persisted),
+                headers=headers,
+            )
+            rawResult.raise_for_status()
+            data = rawResult.json()
+            if persisted and documents.persisted_query_not_found(data):
+                # The server does not know the hash (anymore), send the full document once
+                documents.mark_persisted(operation_name, False)
+                rawResult = await client.post(
+                    app.endpoint,
+                    json=documents.payload(operation_name, graphql_variables, persisted, force_document=True),
+                    headers=headers,
+                )
+                rawResult.raise_for_status()
+                data = rawResult.json()
+            if persisted and not documents.persisted_query_not_found(data):
+                documents.mark_persisted(operation_name)
+            return data
+
+        try:
+            data = await resilience.acall(
+                f"{app.name}:{operation_name}",
+                send,
+                is_mutation=documents.get(operation_name).is_mutation,
+                record_id=record_id,
+            )
+            response = {"success": True, "data": data}
+
+        except (httpx.HTTPError, ValueError, PlataformaException) as e:
+            response = {"success": False, "error": str(e)}
+
+        return response
+
+    async def postDocument(
+        self, document: str, operation_name: str, graphql_variables: Union[dict, None] = None, application: str = ""
+    ) -> dict:
+        """Send a document built at runtime, such as a batch of aliased queries"""
+        app = self._application(application)
+
+        async def send() -> dict:
+            client = plataforma_async_clients.client(app.name)
+            rawResult = await client.post(
+                app.endpoint,
+                json={"query": document, "operationName": operation_name, "variables": graphql_variables},
+                headers=app.headers,
+            )
+            rawResult.raise_for_status()
+            return rawResult.json()
+
+        try:
+            data = await resilience.acall(f"{app.name}:{operation_name}", send)
+            response = {"success": True, "data": data}
+
+        except (httpx.HTTPError, ValueError, PlataformaException) as e:
+            response = {"success": False, "error": str(e)}
+
+        return response
+
+    async def genericGet(self, operation_name: str, query_param: str, application: str = "") -> dict:
+        return await self._post(operation_name, query_param, application)
+
+    async def getProject(self, command_name: str, query_param: str) -> dict:
+        data = {}
+        if command_name == "id":
+            data = await self._post("getProjectById", {"projectId": query_param})
+        return data
+
+    async def listProjects(self) -> dict:
+        return await self._post("listProjects")
+
+    async def getWallet(self, command_name: str, graphql_variables: dict) -> dict:
+        cache_key = wallet_cache.key(command_name, graphql_variables)
+        if cache_key is not None:
+            data = await wallet_cache.aget(cache_key)
+            if data is not None:
+                return data
+
+        data = await self._post(command_name, graphql_variables)
+        if cache_key is not None:
+            await wallet_cache.aset(cache_key, data)
+        return data
+
+    async def pages(
+        self,
+        operation_name: str,
+        field: str,
+        graphql_variables: Union[dict, None] = None,
+        page_size: Optional[int] = None,
+    ) -> AsyncIterator[dict]:
+        """Responses of a list query, one per page, following AppSync nextToken pagination"""
+        variables = dict(graphql_variables or {}, limit=page_size or self.PLATAFORMA_PAGE_SIZE)
+        while True:
+            response = await self._post(operation_name, variables)
+            yield response
+            if not response["success"] or not (response["data"].get("data") or {}).get(field):
+                return
+            next_token = response["data"]["data"][field].get("nextToken")
+            if not next_token:
+                return
+            variables["nextToken"] = next_token
+
+    async def iterItems(
+        self,
+        operation_name: str,
+        field: str,
+        graphql_variables: Union[dict, None] = None,
+        page_size: Optional[int] = None,
+    ) -> AsyncIterator[dict]:
+        """Items of a list query across all its pages, holding a single page in memory"""
+        async for response in self.pages(operation_name, field, graphql_variables, page_size):
+            if not response["success"]:
+                raise ResponseDynamoDBException(response["error"])
+            if response["data"].get("data") is None:
+                raise ResponseDynamoDBException(response["data"].get("errors"))
+            for item in response["data"]["data"][field]["items"]:
+                yield item
+
+    async def _listAll(self, operation_name: str, field: str, page_size: Optional[int] = None) -> dict:
+        response = None
+        async for page in self.pages(operation_name, field, page_size=page_size):
+            if response is None:
+                response = page
+            elif not page["success"] or page["data"].get("data") is None:
+                return page
+            else:
+                response["data"]["data"][field]["items"].extend(page["data"]["data"][field]["items"])
+        if response["success"] and (response["data"].get("data") or {}).get(field):
+            response["data"]["data"][field]["nextToken"] = None
+        return response
+
+    async def listWallets(self, page_size: Optional[int] = None) -> dict:
+        return await self._listAll("listWallets", "listWallets", page_size)
+
+    async def createWallet(self, values, mutation_type: str, record_id: Optional[str] = None) -> dict:
+        operation_name = "WalletMutation" if mutation_type == "user" else "WalletMutationWithouttUserID"
+        response = await self._post(operation_name, values, record_id=record_id)
+        await wallet_cache.ainvalidate(values)
+        return response
+
+    async def createContract(self, values: dict, record_id: Optional[str] = None) -> dict:
+        return await self._post("ScriptMutation", values, record_id=record_id)
+
+    async def getScript(self, command_name: str, graphql_variables: str) -> dict:
+        return await self._post(command_name, graphql_variables)
+
+    async def listScripts(self, page_size: Optional[int] = None) -> dict:
+        return await self._listAll("listScripts", "listScripts", page_size)
+
+    async def listMarketplaces(self, command_name: str, query_param: str) -> dict:
+        if command_name == "oracleWalletID":
+            return await self._post("getMarketplaceByOracle", {"oracleWalletID": query_param})
+
+
+# Shared clients: they keep no per-call state, so there is no need to build one per call
+plataforma_client = Plataforma()
+async_plataforma_client = AsyncPlataforma()
+
+
 @dataclass()
 class CardanoApi(Constants):
     """Class with endpoints to interact with the blockchain"""
 
+    BLOCKFROST_API = blockfrost_api
+
     def __post_init__(self):
         pass
 
@@ -506,8 +776,28 @@ class CardanoApi(Constants):
 
         return final_response
 
+    def tipHeight(self) -> Optional[int]:
+        return confirmed_txs.tip_height(
+            lambda: self.BLOCKFROST_API.block_latest(return_type="json")["height"]
+        )
+
     def getUtxoInfo(self, txhash: str) -> list[dict]:
-        utxo_info = self.BLOCKFROST_API.transaction_utxos(txhash, return_type="json")
+        cached = confirmed_txs.get(txhash, ["utxos"])
+        if "utxos" in cached:
+            return cached["utxos"]
+        # The details come along to know how deep the transaction is
+        utxo_info, trx_details = blockfrost_executor.run(
+            [
+                functools.partial(self.BLOCKFROST_API.transaction_utxos, txhash, return_type="json"),
+                functools.partial(self.BLOCKFROST_API.transaction, txhash, return_type="json"),
+            ]
+        )
+        confirmed_txs.put(
+            txhash,
+            {"utxos": utxo_info, "transaction": trx_details},
+            trx_details.get("block_height"),
+            self.tipHeight(),
+        )
         return utxo_info
 
     def getAddressTxs(
@@ -527,22 +817,44 @@ class CardanoApi(Constants):
             page=page_number,
             order="desc",
         )
+        return self.transactionsDetails(transactions)
+
+    def transactionsDetails(self, transactions: list[dict]) -> list[dict]:
+        """utxos, fees, size and metadata of address_transactions rows, in the order of the rows"""
+        calls = {
+            "utxos": self.BLOCKFROST_API.transaction_utxos,
+            "transaction": self.BLOCKFROST_API.transaction,
+            "metadata": self.BLOCKFROST_API.transaction_metadata,
+        }
+        # Confirmed transactions come from the disk cache; the missing payloads go out together
+        # through the shared Blockfrost pool and the response keeps the order of address_transactions
+        payloads = [confirmed_txs.get(transaction["tx_hash"]) for transaction in transactions]
+        missing = [
+            (i, kind)
+            for i, cached in enumerate(payloads)
+            for kind in TX_KINDS
+            if kind not in cached
+        ]
+        results = blockfrost_executor.run(
+            functools.partial(calls[kind], transactions[i]["tx_hash"], return_type="json")
+            for i, kind in missing
+        )
+        fetched: dict[int, dict] = {}
+        for (i, kind), result in zip(missing, results):
+            payloads[i][kind] = result
+            fetched.setdefault(i, {})[kind] = result
+
+        tip_height = self.tipHeight() if fetched else None
         final_response = []
-        for transaction in transactions:
-            tx_hash = transaction["tx_hash"]
-            trx = self.BLOCKFROST_API.transaction_utxos(tx_hash, return_type="json")
+        for i, transaction in enumerate(transactions):
+            trx = payloads[i]["utxos"]
             if trx:
-                trx_details = self.BLOCKFROST_API.transaction(
-                    tx_hash, return_type="json"
-                )
-                metadata = self.BLOCKFROST_API.transaction_metadata(
-                    tx_hash, return_type="json"
-                )
-                fees = trx_details["fees"]
-                size = trx_details["size"]
-                trx["fees"] = fees
-                trx["size"] = size
-                trx["metadata"] = metadata
+                if i in fetched:
+                    confirmed_txs.put(transaction["tx_hash"], fetched[i], transaction["block_height"], tip_height)
+                trx_details = payloads[i]["transaction"]
+                trx["fees"] = trx_details["fees"]
+                trx["size"] = trx_details["size"]
+                trx["metadata"] = payloads[i]["metadata"]
                 trx["block_height"] = transaction["block_height"]
                 trx["block_time"] = transaction["block_time"]
 
@@ -550,6 +862,91 @@ class CardanoApi(Constants):
 
         return final_response
 
+    def iterAddressTransactions(
+        self,
+        address: str,
+        from_block: Optional[str] = None,
+        to_block: Optional[str] = None,
+        cursor: Optional[HistoryCursor] = None,
+        details: bool = False,
+        count: int = 100,
+    ) -> Iterator[tuple[dict, HistoryCursor]]:
+        """Every transaction of the address in chain order, page by page, with its cursor.
+
+        Resuming from a cursor starts right after its transaction through the block:index form
+        of from_block, so the pages already sent are not walked again.
+        """
+        if cursor is not None:
+            from_block = f"{cursor.height}:{cursor.index + 1}"
+        page_number = 1
+        while True:
+            with blockfrost_limiter.priority("browse"):
+                try:
+                    transactions = self.BLOCKFROST_API.address_transactions(
+                        address=address,
+                        from_block=from_block,
+                        to_block=to_block,
+                        return_type="json",
+                        count=count,
+                        page=page_number,
+                        order="asc",
+                    )
+                except ApiError as e:
+                    if e.status_code == 404:
+                        return
+                    raise
+                items = self.transactionsDetails(transactions) if details else transactions
+            for transaction, item in zip(transactions, items):
+                yield item, HistoryCursor(
+                    "transactions", height=transaction["block_height"], index=transaction["tx_index"]
+                )
+            if len(transactions) < count:
+                return
+            page_number += 1
+
+    def iterAddressUtxos(
+        self, address: str, cursor: Optional[HistoryCursor] = None, count: int = 100
+    ) -> Iterator[tuple[dict, HistoryCursor]]:
+        """Every UTxO of the address in chain order, page by page, with its cursor.
+
+        Spent UTxOs leave the listing and shift the next ones to earlier pages, so resuming
+        starts one page before the cursor and skips up to its UTxO. When that UTxO was spent
+        meanwhile, both pages are sent again. Items may repeat; they are only missed when more
+        than a page of UTxOs before the cursor was spent between the two requests.
+        """
+        last_ref = cursor.ref if cursor is not None else None
+        last_page = cursor.page if cursor is not None else 1
+        page_number = max(1, last_page - 1)
+        held: list[tuple[dict, HistoryCursor]] = []
+        while True:
+            with blockfrost_limiter.priority("browse"):
+                try:
+                    utxos = self.BLOCKFROST_API.address_utxos(
+                        address, return_type="json", count=count, page=page_number, order="asc"
+                    )
+                except ApiError as e:
+                    if e.status_code != 404:
+                        raise
+                    utxos = []
+            rows = [
+                (utxo, HistoryCursor("utxos", page=page_number, ref=f"{utxo['tx_hash']}#{utxo['output_index']}"))
+                for utxo in utxos
+            ]
+            if last_ref is not None:
+                refs = [row[1].ref for row in rows]
+                if last_ref in refs:
+                    # Sent up to the cursor before, whatever the page it moved to
+                    rows = rows[refs.index(last_ref) + 1:]
+                    held, last_ref = [], None
+                elif page_number < last_page and len(rows) == count:
+                    held, rows = rows, []
+                else:
+                    rows, held, last_ref = held + rows, [], None
+            yield from rows
+            if len(utxos) < count:
+                return
+            page_number += 1
+
     def getAddressUtxos(self, address: str, page_number: int, limit: int) -> list[dict]:
         """Get a list of all UTxOs currently present in the provided address \n
 
@@ -582,18 +979,42 @@ class CardanoApi(Constants):
                 }
 
     def specificAssetInfo(self, asset_name: str) -> dict:
-        return self.BLOCKFROST_API.asset(asset_name, return_type="json")
-
-    def assetInfo(self, policy_id: str) -> list:
-        asset_list = self.BLOCKFROST_API.assets_policy(policy_id, return_type="json")
+        asset_details = policy_assets.details(asset_name)
+        if asset_details is None:
+            asset_details = self.BLOCKFROST_API.asset(asset_name, return_type="json")
+            policy_assets.set_details(asset_name, asset_details)
+        return asset_details
+
+    def policyAssetPages(self, policy_id: str, count: int = 100) -> Iterator[list[dict]]:
+        """Pages of the assets under the policy, until the last one; the complete listing is cached"""
+        asset_list = policy_assets.listing(policy_id)
+        if asset_list is not None:
+            yield asset_list
+            return
 
-        asset_details_list = []
-        for asset in asset_list:
-            asset_name = asset.get("asset", "")
-            asset_details = self.specificAssetInfo(asset_name)
-            asset_details_list.append(asset_details)
+        asset_list = []
+        page_number = 1
+        while True:
+            page = self.BLOCKFROST_API.assets_policy(
+                policy_id, return_type="json", count=count, page=page_number
+            )
+            asset_list.extend(page)
+            yield page
+            if len(page) < count:
+                break
+            page_number += 1
+        policy_assets.set_listing(policy_id, asset_list)
+
+    def iterAssetInfo(self, policy_id: str) -> Iterator[dict]:
+        """Details of the assets under the policy in listing order, fetched page by page through
+        the shared Blockfrost pool"""
+        for page in self.policyAssetPages(policy_id):
+            yield from blockfrost_executor.imap(
+                functools.partial(self.specificAssetInfo, asset.get("asset", "")) for asset in page
+            )
 
-        return asset_details_list
+    def assetInfo(self, policy_id: str) -> list:
+        return list(self.iterAssetInfo(policy_id))
 
     def getMetadata(self, label: str) -> list[dict]:
         """Get a list of all UTxOs currently present in the provided address \n
@@ -657,21 +1078,12 @@ class Helpers:
         if isinstance(address, Address):
             address = address.encode()
 
+        # The address is fetched once and its tokens indexed, instead of once per token
+        assets = AssetIndex.of(context, address)
         # TODO: acummulate utxos with tokens when there's more than one utxo and the request cannot be fulfill with just one
         for policy_id, asset in multi_asset.data.items():
             for tn_bytes, amount in asset.data.items():
-                for utxo in context.utxos(address):
-
-                    def f(pi: ScriptHash, an: AssetName, a: int) -> bool:
-                        return (
-                            pi == policy_id
-                            and an.payload == tn_bytes.payload
-                            and a >= amount
-                        )
-
-                    if utxo.output.amount.multi_asset.count(f):
-                        candidate_utxo = utxo
-                        break
+                candidate_utxo = assets.first(policy_id, tn_bytes, amount)
 
                 assert isinstance(
                     candidate_utxo, UTxO
@@ -690,7 +1102,7 @@ class Helpers:
         utxo_is = None
         utxos = context.utxos(address)
         logging.info(f"utxos: {utxos}")
-        for utxo_in_context in context.utxos(address):
+        for utxo_in_context in utxos:
             if (
                 utxo_in_context.input.transaction_id.payload.hex() == transaction_id
                 and utxo_in_context.input.index == index
@@ -701,6 +1113,60 @@ class Helpers:
 
         return utxo_existence, utxo_is
 
+    def utxo_info(self, utxo: UTxO) -> dict:
+        """Output of the utxo in the format of Blockfrost's transaction_utxos, as getUtxoInfo returns it"""
+        output = utxo.output
+        amount = [{"unit": "lovelace", "quantity": str(output.amount.coin)}]
+        for policy_id, assets in output.amount.multi_asset.items():
+            for asset_name, quantity in assets.items():
+                amount.append(
+                    {"unit": policy_id.payload.hex() + asset_name.payload.hex(), "quantity": str(quantity)}
+                )
+
+        data_hash = None
+        inline_datum = None
+        if output.datum is not None:
+            inline_datum = cbor2.dumps(output.datum, default=default_encoder).hex()
+            data_hash = datum_hash(output.datum).payload.hex()
+        elif output.datum_hash is not None:
+            data_hash = output.datum_hash.payload.hex()
+
+        tx_hash = utxo.input.transaction_id.payload.hex()
+        return {
+            "address": output.address.encode(),
+            "amount": amount,
+            "output_index": utxo.input.index,
+            "data_hash": data_hash,
+            "inline_datum": inline_datum,
+            "collateral": False,
+            "reference_script_hash": script_hash(output.script).payload.hex() if output.script else None,
+            "consumed_by_tx": None,
+            "utxo_hash": f"{tx_hash}#{utxo.input.index}",
+        }
+
+    def utxos_info(self, inputs: list[TransactionInput], utxos: list[UTxO]) -> list[dict]:
+        """Details of the inputs of a built transaction, from the UTxOs the builder selected.
+
+        Inputs the builder does not hold are looked up in the local UTxO index, and only then
+        in Blockfrost, with one call per transaction.
+        """
+        resolved = {utxo.input: utxo for utxo in utxos}
+        fetched: dict[str, list[dict]] = {}
+        utxo_list_info = []
+        for tx_input in inputs:
+            tx_hash = tx_input.transaction_id.payload.hex()
+            utxo = resolved.get(tx_input) or local_utxo_index.utxo(tx_hash, tx_input.index)
+            if utxo is not None:
+                utxo_list_info.append(self.utxo_info(utxo))
+                continue
+            if tx_hash not in fetched:
+                fetched[tx_hash] = CardanoApi().getUtxoInfo(tx_hash)["outputs"]
+            for utxo_output in fetched[tx_hash]:
+                if utxo_output["output_index"] == tx_input.index:
+                    utxo_output["utxo_hash"] = f"{tx_hash}#{tx_input.index}"
+                    utxo_list_info.append(utxo_output)
+        return utxo_list_info
+
     def build_oraclePolicyId(
         self, oracle_vkey: PaymentVerificationKey
     ) -> str:
@@ -729,63 +1195,96 @@ class Helpers:
 
         return auxiliary_data, metadata_f
 
-    def build_reference_input_oracle(
-        self,
-        chain_context: ChainContext,
-        oracle_wallet_id: str
-    ) -> Union[UTxO, None]:
-        try:
-            oracle_utxo = None
-            
-            command_name = "getWalletById"
+    async def oracle_reference(self, chain_context: ChainContext, oracle_wallet_id: str) -> "OracleReference":
+        """Look up the oracle wallet, its token and the UTxO holding it, without any caching"""
+        command_name = "getWalletById"
 
-            graphql_variables = {"walletId": oracle_wallet_id}
+        graphql_variables = {"walletId": oracle_wallet_id}
 
-            r = Plataforma().getWallet(command_name, graphql_variables)
-            final_response = Response().handle_getWallet_response(getWallet_response=r)
-            
-            if not final_response["connection"] or not final_response.get("success", None):
-                raise ResponseDynamoDBException(final_response["data"])
-            
+        r = await async_plataforma_client.getWallet(command_name, graphql_variables)
+        final_response = Response().handle_getWallet_response(getWallet_response=r)
 
-            oracleWallet = final_response["data"]
-            oracle_address = oracleWallet["address"]
+        if not final_response["connection"] or not final_response.get("success", None):
+            raise ResponseDynamoDBException(final_response["data"])
 
-            seed = oracleWallet["seed"]
-            hdwallet = HDWallet.from_seed(seed)
-            child_hdwallet = hdwallet.derive_from_path("m/1852'/1815'/0'/0/0")
+        oracleWallet = final_response["data"]
+        oracle_address = oracleWallet["address"]
+        # Oracle wallets are not listed at startup: follow them once they are used
+        local_utxo_index.register([oracle_address])
 
-            oracle_vkey = PaymentVerificationKey.from_primitive(
-                child_hdwallet.public_key
-            )
+        seed = oracleWallet["seed"]
+        oracle_keys = await wallet_keyring.aget(oracle_wallet_id, seed)
 
-            # Get the oracle token name
+        # Get the oracle token name
 
-            response = Plataforma().listMarketplaces("oracleWalletID", oracle_wallet_id)
-            marketplaceResponse = Response().handle_listMarketplaces_response(response)
+        response = await async_plataforma_client.listMarketplaces("oracleWalletID", oracle_wallet_id)
+        marketplaceResponse = Response().handle_listMarketplaces_response(response)
 
-            if not final_response["connection"] or not final_response.get("success", None):
-                raise ResponseDynamoDBException(final_response["data"])
-            
-            marketplaceInfo = marketplaceResponse["data"]
+        if not marketplaceResponse["connection"] or not marketplaceResponse.get("success", None):
+            raise ResponseDynamoDBException(marketplaceResponse["data"])
 
-            oracle_token_name = marketplaceInfo["oracleTokenName"]
+        marketplaceInfo = marketplaceResponse["data"]["items"][0]
 
-            oracle_asset = self.build_multiAsset(
-                policy_id=self.build_oraclePolicyId(oracle_vkey),
-                tq_dict={oracle_token_name: 1},
-            )
-            oracle_utxo = self.find_utxos_with_tokens(
-                chain_context, oracle_address, multi_asset=oracle_asset
-            )
-                
-            return oracle_utxo
+        oracle_token_name = marketplaceInfo["oracleTokenName"]
+
+        oracle_asset = self.build_multiAsset(
+            policy_id=oracle_keys.policy_id_hex,
+            tq_dict={oracle_token_name: 1},
+        )
+        oracle_utxo = self.find_utxos_with_tokens(
+            chain_context, oracle_address, multi_asset=oracle_asset
+        )
+
+        return OracleReference(
+            oracle_wallet_id=oracle_wallet_id,
+            address=oracle_address,
+            policy_id=oracle_keys.policy_id_hex,
+            token_name=oracle_token_name,
+            utxo=oracle_utxo,
+        )
+
+    async def build_reference_input_oracle(
+        self,
+        chain_context: ChainContext,
+        oracle_wallet_id: str
+    ) -> Union[UTxO, None]:
+        try:
+            oracle = await self.oracle_reference(chain_context, oracle_wallet_id)
+            return oracle.utxo
         except ResponseDynamoDBException as e:
             raise HTTPException(status_code=400, detail=str(e)) from e
         except Exception as e:
             # Handling other types of exceptions
             raise HTTPException(status_code=500, detail=str(e)) from e
 
+
+@dataclass(frozen=True)
+class OracleReference:
+    """Oracle UTxO used as reference input, with the token it holds and its decoded datum"""
+
+    oracle_wallet_id: str
+    address: str
+    policy_id: str
+    token_name: str
+    utxo: UTxO
+    resolved_at: float = field(default_factory=time.time)
+
+    @property
+    def ref(self) -> tuple[str, int]:
+        return self.utxo.input.transaction_id.payload.hex(), self.utxo.input.index
+
+    @property
+    def datum(self) -> Optional[pydantic_schemas.DatumOracle]:
+        datum = self.utxo.output.datum
+        if datum is None:
+            return None
+        try:
+            cbor = datum.cbor if isinstance(datum, RawCBOR) else datum.to_cbor()
+            return pydantic_schemas.DatumOracle.from_cbor(cbor)
+        except Exception as e:  # pylint: disable=broad-except
+            logging.warning(f"Oracle datum of {self.oracle_wallet_id} could not be decoded: {e}")
+            return None
+
 @dataclass()
 class RedisClient:
     """Class to handle data from and to Redis DB"""
@@ -0,0 +1,243 @@
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from suantrazabilidadapi.utils.generic import Constants
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """Connection pool size and timeouts for one GraphQL application"""
+
+    pool_connections: int
+    pool_maxsize: int
+    connect_timeout: float
+    read_timeout: float
+
+    @property
+    def timeout(self) -> tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+
+POOL_SETTINGS: dict[str, PoolSettings] = {
+    "main": PoolSettings(
+        pool_connections=Constants.PLATAFORMA_POOL_CONNECTIONS,
+        pool_maxsize=Constants.PLATAFORMA_POOL_MAXSIZE,
+        connect_timeout=Constants.PLATAFORMA_CONNECT_TIMEOUT,
+        read_timeout=Constants.PLATAFORMA_READ_TIMEOUT,
+    ),
+    "oracle": PoolSettings(
+        pool_connections=Constants.ORACLE_POOL_CONNECTIONS,
+        pool_maxsize=Constants.ORACLE_POOL_MAXSIZE,
+        connect_timeout=Constants.ORACLE_CONNECT_TIMEOUT,
+        read_timeout=Constants.ORACLE_READ_TIMEOUT,
+    ),
+}
+
+
+@dataclass()
+class SessionPool:
+    """Process-wide registry of keep-alive HTTP sessions, one per GraphQL application.
+
+    Sessions are recreated after a fork (celery prefork workers) so that sockets
+    are never shared between processes.
+    """
+
+    settings: dict[str, PoolSettings] = field(default_factory=lambda: dict(POOL_SETTINGS))
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._sessions: dict[str, requests.Session] = {}
+        self._requests: dict[str, int] = {}
+        self._pid = os.getpid()
+
+    def _settings(self, application: str) -> PoolSettings:
+        return self.settings.get(application, self.settings["main"])
+
+    def timeout(self, application: str) -> tuple[float, float]:
+        return self._settings(application).timeout
+
+    def session(self, application: str = "main") -> requests.Session:
+        """Return the pooled session for the application, creating it on first use"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked child: drop the parent's connections
+                self._sessions = {}
+                self._requests = {}
+                self._pid = os.getpid()
+
+            session = self._sessions.get(application)
+            if session is None:
+                pool_settings = self._settings(application)
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=pool_settings.pool_connections,
+                    pool_maxsize=pool_settings.pool_maxsize,
+                    max_retries=0,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[application] = session
+                logging.info(
+                    f"Created pooled session for {application} with maxsize {pool_settings.pool_maxsize}"
+                )
+            self._requests[application] = self._requests.get(application, 0) + 1
+
+        return session
+
+    def stats(self) -> dict[str, Any]:
+        """Pool usage per application: requests sent, connections opened and idle connections"""
+        stats = {}
+        with self._lock:
+            for application, session in self._sessions.items():
+                opened = 0
+                idle = 0
+                for adapter in set(session.adapters.values()):
+                    for key in adapter.poolmanager.pools.keys():
+                        pool = adapter.poolmanager.pools.get(key)
+                        if pool is None:
+                            continue
+                        opened += pool.num_connections
+                        idle += sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+                requests_sent = self._requests.get(application, 0)
+                pool_settings = self._settings(application)
+                stats[application] = {
+                    "requests": requests_sent,
+                    "connections_opened": opened,
+                    "connections_reused": max(requests_sent - opened, 0),
+                    "idle_connections": idle,
+                    "pool_maxsize": pool_settings.pool_maxsize,
+                    "timeout": pool_settings.timeout,
+                }
+        return stats
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+
+@dataclass()
+class AsyncClientPool:
+    """Keep-alive httpx clients per event loop and GraphQL application.
+
+    httpx connections are bound to the loop that opened them, so celery tasks running
+    their own ``asyncio.run`` get separate clients from the uvicorn loop.
+    """
+
+    settings: dict[str, PoolSettings] = field(default_factory=lambda: dict(POOL_SETTINGS))
+
+    def __post_init__(self):
+        self._clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._requests: dict[str, int] = {}
+
+    def _settings(self, application: str) -> PoolSettings:
+        return self.settings.get(application, self.settings["main"])
+
+    def client(self, application: str = "main") -> httpx.AsyncClient:
+        """Return the client of the running loop for the application, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        clients = self._clients.setdefault(loop, {})
+        client = clients.get(application)
+        if client is None or client.is_closed:
+            pool_settings = self._settings(application)
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=pool_settings.pool_maxsize,
+                    max_keepalive_connections=pool_settings.pool_maxsize,
+                ),
+                timeout=httpx.Timeout(
+                    pool_settings.read_timeout, connect=pool_settings.connect_timeout
+                ),
+            )
+            clients[application] = client
+            logging.info(
+                f"Created async client for {application} with maxsize {pool_settings.pool_maxsize}"
+            )
+        self._requests[application] = self._requests.get(application, 0) + 1
+        return client
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            application: {
+                "requests": requests_sent,
+                "pool_maxsize": self._settings(application).pool_maxsize,
+            }
+            for application, requests_sent in self._requests.items()
+        }
+
+    async def aclose(self):
+        """Close the clients opened in the running loop"""
+        clients = self._clients.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.aclose()
+
+
+@dataclass()
+class BoundedExecutor:
+    """Process-wide thread pool bounding the blocking calls in flight towards one backend.
+
+    Every request fanning out shares the same workers, so the backend never sees more than
+    ``max_workers`` concurrent calls from this process whatever the number of requests. The
+    pool is recreated after a fork (celery prefork workers), as the parent's threads are gone.
+    """
+
+    name: str
+    max_workers: int
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._pid = os.getpid()
+        self.submitted = 0
+
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(self.max_workers, 1), thread_name_prefix=self.name
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def imap(self, calls: Iterable[Callable[[], T]]) -> Iterator[T]:
+        """Results of the calls as soon as available, in call order whatever the completion order.
+
+        Every call is submitted before the first result is waited for.
+        """
+        executor = self.executor()
+        # Each call runs in a copy of the caller's context (e.g. its Blockfrost priority class)
+        futures = [executor.submit(contextvars.copy_context().run, call) for call in calls]
+        self.submitted += len(futures)
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            # A consumer gone early (closed stream, failed call) leaves nothing queued behind
+            for future in futures:
+                future.cancel()
+
+    def run(self, calls: Iterable[Callable[[], T]]) -> list[T]:
+        """Results of the calls, in call order; the first exception raised by a call is raised"""
+        return list(self.imap(calls))
+
+    def stats(self) -> dict[str, Any]:
+        return {"max_workers": self.max_workers, "submitted": self.submitted}
+
+
+plataforma_sessions = SessionPool()
+plataforma_async_clients = AsyncClientPool()
+blockfrost_executor = BoundedExecutor("blockfrost", Constants.BLOCKFROST_CONCURRENCY)
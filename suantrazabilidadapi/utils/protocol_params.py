@@ -0,0 +1,244 @@
+import dataclasses
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from fractions import Fraction
+from typing import Any, Optional, Protocol
+
+import cbor2
+import redis
+from pycardano import GenesisParameters, ProtocolParameters
+
+from suantrazabilidadapi.utils.generic import Constants
+
+
+class LedgerSource(Protocol):
+    """Chain context able to fetch the ledger parameters bypassing the cache"""
+
+    def fetch_ledger_parameters(self) -> tuple[ProtocolParameters, Any, int, Optional[float]]: ...
+
+    def fetch_epoch(self) -> tuple[int, Optional[float]]: ...
+
+
+def as_genesis_parameters(genesis: Any) -> GenesisParameters:
+    """Ogmios returns its own genesis object; keep the fields pycardano knows about"""
+    if isinstance(genesis, GenesisParameters):
+        return genesis
+    return GenesisParameters(
+        **{field.name: getattr(genesis, field.name, None) for field in dataclasses.fields(GenesisParameters)}
+    )
+
+
+def era_epoch_end(epoch: int, system_start: datetime, era: Any) -> float:
+    """Unix time an epoch of the current era ends, from the Ogmios era summary (slot length in
+    milliseconds, start time in seconds from the system start)"""
+    start = system_start.replace(tzinfo=timezone.utc).timestamp() + era.start_time
+    return start + (epoch - era.start_epoch + 1) * era.epoch_length * era.slot_length / 1000
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, Fraction):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+@dataclass()
+class LedgerParameters:
+    """Protocol and genesis parameters of one epoch"""
+
+    epoch: int
+    protocol_param: ProtocolParameters
+    genesis_param: GenesisParameters
+    fetched_at: float
+    checked_at: float
+    # Unix time the epoch ends, told by Blockfrost or computed from the Ogmios era summary
+    epoch_end: Optional[float] = None
+    source: str = ""
+
+    def next_check(self, check_interval: float) -> float:
+        if self.epoch_end is not None and self.epoch_end > self.checked_at:
+            return self.epoch_end
+        return self.checked_at + check_interval
+
+    def to_cbor(self) -> bytes:
+        return cbor2.dumps(
+            {
+                "epoch": self.epoch,
+                "protocol_param": dataclasses.asdict(self.protocol_param),
+                "genesis_param": dataclasses.asdict(self.genesis_param),
+                "fetched_at": self.fetched_at,
+                "checked_at": self.checked_at,
+                "epoch_end": self.epoch_end,
+                "source": self.source,
+            }
+        )
+
+    @classmethod
+    def from_cbor(cls, payload: bytes) -> "LedgerParameters":
+        data = cbor2.loads(payload)
+        data["protocol_param"] = ProtocolParameters(**data["protocol_param"])
+        data["genesis_param"] = GenesisParameters(**data["genesis_param"])
+        return cls(**data)
+
+    def view(self) -> dict:
+        now = time.time()
+        return {
+            "epoch": self.epoch,
+            "source": self.source,
+            "fetched_at": datetime.fromtimestamp(self.fetched_at, timezone.utc).isoformat(),
+            "age_seconds": round(now - self.fetched_at, 3),
+            "checked_seconds_ago": round(now - self.checked_at, 3),
+            "epoch_end": (
+                datetime.fromtimestamp(self.epoch_end, timezone.utc).isoformat() if self.epoch_end else None
+            ),
+            "protocol_param": _jsonable(dataclasses.asdict(self.protocol_param)),
+            "genesis_param": _jsonable(dataclasses.asdict(self.genesis_param)),
+        }
+
+
+@dataclass()
+class ProtocolParamsCache(Constants):
+    """Protocol and genesis parameters kept until the epoch changes, shared through Redis.
+
+    A worker that starts reads the parameters other workers stored in Redis instead of querying
+    Ogmios or Blockfrost. Once the epoch end (or the check interval, when the backend could not
+    tell when the epoch ends) is reached, only the epoch is queried, and the parameters are
+    fetched again when it changed. A single thread queries the chain at a time, outside the
+    lock: the others keep reading the cached entry meanwhile, and only wait when there is none.
+    """
+
+    KEY_PREFIX = "ProtocolParams"
+
+    def __post_init__(self):
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._entry: Optional[LedgerParameters] = None
+        self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self._redis_client: Optional[redis.Redis] = None
+        self.fetches = 0
+        self.epoch_checks = 0
+        self.redis_hits = 0
+        self.redis_errors = 0
+
+    @property
+    def redis_key(self) -> str:
+        return f"{self.KEY_PREFIX}:{self.NETWORK_NAME}"
+
+    def _redis(self) -> redis.Redis:
+        if self._redis_client is None:
+            self._redis_client = redis.Redis.from_url(
+                self.redis_url, socket_connect_timeout=1, socket_timeout=1
+            )
+        return self._redis_client
+
+    def _load(self) -> Optional[LedgerParameters]:
+        if not self.PROTOCOL_PARAMS_REDIS:
+            return None
+        try:
+            payload = self._redis().get(self.redis_key)
+            if payload is None:
+                return None
+            entry = LedgerParameters.from_cbor(payload)
+        except (redis.RedisError, ValueError, TypeError, cbor2.CBORDecodeError) as e:
+            self.redis_errors += 1
+            logging.warning(f"Protocol parameters not read from redis: {e}")
+            return None
+        self.redis_hits += 1
+        return entry
+
+    def _store(self, entry: LedgerParameters):
+        if not self.PROTOCOL_PARAMS_REDIS:
+            return
+        try:
+            # Parameters of an old epoch are worthless: let redis drop them eventually
+            self._redis().set(self.redis_key, entry.to_cbor(), ex=int(self.PROTOCOL_PARAMS_REDIS_TTL))
+        except (redis.RedisError, ValueError, TypeError, cbor2.CBOREncodeError) as e:
+            self.redis_errors += 1
+            logging.warning(f"Protocol parameters not stored in redis: {e}")
+
+    def _fetch(self, context: LedgerSource) -> LedgerParameters:
+        protocol_param, genesis_param, epoch, epoch_end = context.fetch_ledger_parameters()
+        self.fetches += 1
+        now = time.time()
+        entry = LedgerParameters(
+            epoch=epoch,
+            protocol_param=protocol_param,
+            genesis_param=as_genesis_parameters(genesis_param),
+            fetched_at=now,
+            checked_at=now,
+            epoch_end=epoch_end,
+            source=type(context).__name__,
+        )
+        logging.info(f"Protocol parameters of epoch {epoch} fetched by {entry.source}")
+        self._store(entry)
+        return entry
+
+    def _refresh(self, context: LedgerSource, entry: Optional[LedgerParameters]) -> LedgerParameters:
+        if entry is None:
+            return self._fetch(context)
+        self.epoch_checks += 1
+        epoch, epoch_end = context.fetch_epoch()
+        if epoch != entry.epoch:
+            return self._fetch(context)
+        # Same epoch: redis keeps the entry as it is, only this worker's next check moves
+        return dataclasses.replace(entry, checked_at=time.time(), epoch_end=epoch_end)
+
+    def get(self, context: LedgerSource) -> LedgerParameters:
+        """Parameters of the current epoch, fetched through the context only when needed"""
+        entry = self.peek()
+        if entry is not None and time.time() < entry.next_check(self.PROTOCOL_PARAMS_CHECK_INTERVAL):
+            return entry
+        if not self._refresh_lock.acquire(blocking=entry is None):
+            # Another thread is checking the epoch
+            return entry
+        try:
+            current = self._entry
+            if current is not None and current is not entry:
+                # Refreshed while this thread waited
+                return current
+            entry = self._refresh(context, current)
+            with self._lock:
+                self._entry = entry
+            return entry
+        finally:
+            self._refresh_lock.release()
+
+    def peek(self) -> Optional[LedgerParameters]:
+        """Cached parameters, without querying the chain"""
+        with self._lock:
+            if self._entry is None:
+                self._entry = self._load()
+            return self._entry
+
+    def invalidate(self):
+        with self._lock:
+            self._entry = None
+        if self.PROTOCOL_PARAMS_REDIS:
+            try:
+                self._redis().delete(self.redis_key)
+            except redis.RedisError as e:
+                self.redis_errors += 1
+                logging.warning(f"Protocol parameters not removed from redis: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        entry = self._entry
+        return {
+            "epoch": entry.epoch if entry else None,
+            "age_seconds": round(time.time() - entry.fetched_at, 3) if entry else None,
+            "fetches": self.fetches,
+            "epoch_checks": self.epoch_checks,
+            "redis_hits": self.redis_hits,
+            "redis_errors": self.redis_errors,
+        }
+
+
+protocol_params_cache = ProtocolParamsCache()
@@ -0,0 +1,322 @@
+import contextvars
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Optional
+
+import redis
+from blockfrost import BlockFrostApi
+from blockfrost.utils import ApiError, convert_json_to_object, convert_json_to_pandas
+
+from suantrazabilidadapi.utils.exception import BlockfrostRateLimited
+from suantrazabilidadapi.utils.generic import Constants
+
+# Share of the bucket a class leaves untouched for the classes above it: submissions and
+# evaluations can drain the bucket, chain browsing stops while 30% of it is left. The shares
+# apply to what refills within BLOCKFROST_LIMITER_MAX_WAIT when the burst is larger, so a
+# lower class waiting on an empty bucket gets its token before the deadline.
+PRIORITY_RESERVES = {"submit": 0.0, "build": 0.1, "browse": 0.3}
+
+# Blockfrost endpoints taking a priority class without the caller setting one
+ENDPOINT_PRIORITIES = {
+    "transaction_submit": "submit",
+    "transaction_evaluate": "submit",
+    "transaction_evaluate_cbor": "submit",
+    "transaction_evaluate_utxos": "submit",
+    "address_transactions": "browse",
+    "transaction_metadata": "browse",
+    "asset": "browse",
+    "assets_policy": "browse",
+    "asset_history": "browse",
+    "asset_transactions": "browse",
+    "asset_addresses": "browse",
+    "metadata_label_json": "browse",
+}
+
+# Takes a token when more than the reserve of the class is left; otherwise returns the
+# milliseconds until there is. Redis' clock is used so every host refills the bucket alike.
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local reserve = tonumber(ARGV[3])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens - 1 >= reserve then
+    tokens = tokens - 1
+else
+    wait = math.ceil((reserve + 1 - tokens) / rate * 1000)
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", tostring(now))
+redis.call("EXPIRE", KEYS[1], math.ceil(burst / rate) + 1)
+return wait
+"""
+
+# Empties the bucket after Blockfrost answered 429: the quota is spent whatever the bucket says
+DRAIN_SCRIPT = """
+local clock = redis.call("TIME")
+redis.call("HSET", KEYS[1], "tokens", "0", "ts", tostring(tonumber(clock[1]) + tonumber(clock[2]) / 1000000))
+return 0
+"""
+
+
+@dataclass()
+class LocalBucket:
+    """Token bucket of the current process, used when redis is disabled or unavailable"""
+
+    rate: float
+    burst: float
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self.tokens = self.burst
+        self.ts = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.ts) * self.rate)
+        self.ts = now
+
+    def take(self, reserve: float) -> float:
+        """Seconds to wait before a token is available above the reserve, 0 when one was taken"""
+        with self._lock:
+            self._refill()
+            if self.tokens - 1 >= reserve:
+                self.tokens -= 1
+                return 0
+            return (reserve + 1 - self.tokens) / self.rate
+
+    def drain(self):
+        with self._lock:
+            self.tokens = 0
+            self.ts = time.monotonic()
+
+
+@dataclass()
+class WaitStats:
+    calls: int = 0
+    waited: int = 0
+    wait_seconds: float = 0
+    max_wait_seconds: float = 0
+    rejected: int = 0
+
+    def record(self, wait: float):
+        self.calls += 1
+        if wait > 0:
+            self.waited += 1
+            self.wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+
+@dataclass()
+class BlockfrostRateLimiter(Constants):
+    """Token bucket in redis shared by every uvicorn and celery worker calling Blockfrost.
+
+    The bucket matches the Blockfrost project limits: BLOCKFROST_RATE_LIMIT requests per second
+    with bursts of BLOCKFROST_BURST_LIMIT. Each call takes a token for its priority class
+    ("submit", "build" or "browse"); lower classes leave a reserve of the bucket to the higher
+    ones, so browsing history never starves a submission. A caller sleeps up to
+    BLOCKFROST_LIMITER_MAX_WAIT for its token before BlockfrostRateLimited is raised, and a 429
+    answered anyway empties the bucket and the call is tried again within the same wait.
+    Waiting blocks the thread: async endpoints call Blockfrost from a worker thread.
+    """
+
+    KEY_PREFIX = "BlockfrostBucket"
+
+    def __post_init__(self):
+        self.local = LocalBucket(self.BLOCKFROST_RATE_LIMIT, self.BLOCKFROST_BURST_LIMIT)
+        self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self._redis: Optional[redis.Redis] = None
+        if self.BLOCKFROST_LIMITER_REDIS:
+            self._redis = redis.Redis.from_url(
+                self.redis_url, decode_responses=True, socket_connect_timeout=1, socket_timeout=1
+            )
+            self._take = self._redis.register_script(TAKE_SCRIPT)
+            self._drain = self._redis.register_script(DRAIN_SCRIPT)
+        self._priority: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+            "blockfrost_priority", default=None
+        )
+        self._stats = {priority: WaitStats() for priority in PRIORITY_RESERVES}
+        self._lock = threading.Lock()
+        self._redis_down_until = 0.0
+        self.throttled = 0
+        self.redis_errors = 0
+
+    @property
+    def key(self) -> str:
+        return f"{self.KEY_PREFIX}:{self.NETWORK_NAME}"
+
+    @contextmanager
+    def priority(self, priority: str) -> Iterator[None]:
+        """Blockfrost calls made in the block, in this thread or the tasks it spawns, use the class"""
+        token = self._priority.set(priority)
+        try:
+            yield
+        finally:
+            self._priority.reset(token)
+
+    def classify(self, endpoint: str) -> str:
+        if ENDPOINT_PRIORITIES.get(endpoint) == "submit":
+            return "submit"
+        return self._priority.get() or ENDPOINT_PRIORITIES.get(endpoint, "build")
+
+    def _shared(self) -> bool:
+        return self._redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, e: Exception):
+        # Keep limiting this process rather than failing the call, and retry redis a bit later
+        self.redis_errors += 1
+        self._redis_down_until = time.monotonic() + self.BLOCKFROST_LIMITER_REDIS_RETRY
+        logging.warning(f"Blockfrost rate limiter redis store unavailable: {e}")
+
+    def reserve(self, priority: str) -> float:
+        """Tokens the class leaves in the bucket for the classes above it"""
+        refill = self.BLOCKFROST_RATE_LIMIT * self.BLOCKFROST_LIMITER_MAX_WAIT
+        return PRIORITY_RESERVES[priority] * min(self.BLOCKFROST_BURST_LIMIT, refill)
+
+    def _wait_for(self, priority: str) -> float:
+        reserve = self.reserve(priority)
+        if self._shared():
+            try:
+                return self._take(
+                    keys=[self.key],
+                    args=[self.BLOCKFROST_RATE_LIMIT, self.BLOCKFROST_BURST_LIMIT, reserve],
+                ) / 1000
+            except redis.RedisError as e:
+                self._redis_failed(e)
+        return self.local.take(reserve)
+
+    def drain(self):
+        if self._shared():
+            try:
+                self._drain(keys=[self.key])
+                return
+            except redis.RedisError as e:
+                self._redis_failed(e)
+        self.local.drain()
+
+    def acquire(self, priority: str, deadline: float) -> float:
+        """Wait for a token of the class until the deadline (monotonic); returns the time waited"""
+        waited = 0.0
+        while True:
+            wait = self._wait_for(priority)
+            if wait <= 0:
+                return waited
+            left = deadline - time.monotonic()
+            if left <= 0:
+                with self._lock:
+                    self._stats[priority].rejected += 1
+                raise BlockfrostRateLimited(
+                    f"No Blockfrost request available for {priority} calls within "
+                    f"{self.BLOCKFROST_LIMITER_MAX_WAIT} seconds",
+                    retry_after=math.ceil(wait),
+                )
+            # Other callers may take the tokens first: sleep at most until the deadline and ask again
+            time.sleep(min(wait, left))
+            waited += min(wait, left)
+
+    def call(self, endpoint: str, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call a Blockfrost endpoint once the limiter allows it"""
+        if not self.BLOCKFROST_LIMITER_ENABLED:
+            return function(*args, **kwargs)
+        priority = self.classify(endpoint)
+        deadline = time.monotonic() + self.BLOCKFROST_LIMITER_MAX_WAIT
+        waited = 0.0
+        try:
+            while True:
+                waited += self.acquire(priority, deadline)
+                try:
+                    return function(*args, **kwargs)
+                except ApiError as e:
+                    if e.status_code != 429:
+                        raise
+                    self.throttled += 1
+                    logging.warning(f"Blockfrost throttled {endpoint} ({priority}), waiting for the bucket")
+                    self.drain()
+        finally:
+            with self._lock:
+                self._stats[priority].record(waited)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            wait_stats = {
+                priority: {
+                    "calls": stats.calls,
+                    "waited": stats.waited,
+                    "wait_seconds_total": round(stats.wait_seconds, 3),
+                    "wait_seconds_max": round(stats.max_wait_seconds, 3),
+                    "wait_seconds_mean": round(stats.wait_seconds / stats.calls, 3) if stats.calls else 0,
+                    "rejected": stats.rejected,
+                }
+                for priority, stats in self._stats.items()
+            }
+        return {
+            "enabled": self.BLOCKFROST_LIMITER_ENABLED,
+            "store": "redis" if self._shared() else "local",
+            "rate": self.BLOCKFROST_RATE_LIMIT,
+            "burst": self.BLOCKFROST_BURST_LIMIT,
+            "priorities": wait_stats,
+            "throttled": self.throttled,
+            "redis_errors": self.redis_errors,
+        }
+
+
+blockfrost_limiter = BlockfrostRateLimiter()
+
+# Endpoint methods of the Blockfrost client, each one a single request unless gather_pages is set
+BLOCKFROST_ENDPOINTS = frozenset(
+    name for name, value in vars(BlockFrostApi).items() if callable(value) and not name.startswith("_")
+)
+
+
+class RateLimitedBlockFrostApi(BlockFrostApi):
+    """Blockfrost client whose endpoint calls go through blockfrost_limiter.
+
+    gather_pages is requested page by page here, each page taking its own token, instead of
+    letting the client loop over the pages within a single call.
+    """
+
+    PAGE_SIZE = 100
+
+    def __getattribute__(self, name: str) -> Any:
+        attribute = super().__getattribute__(name)
+        if name not in BLOCKFROST_ENDPOINTS:
+            return attribute
+
+        def limited(*args, gather_pages: bool = False, **kwargs):
+            if gather_pages:
+                return gather(name, attribute, *args, **kwargs)
+            return blockfrost_limiter.call(name, attribute, *args, **kwargs)
+
+        return limited
+
+
+def gather(name: str, endpoint: Callable[..., Any], *args, return_type: Optional[str] = None, **kwargs) -> Any:
+    """Every page of a list endpoint, from the page given on"""
+    count = kwargs.pop("count", RateLimitedBlockFrostApi.PAGE_SIZE)
+    page = kwargs.pop("page", 1)
+    rows = []
+    while True:
+        batch = blockfrost_limiter.call(name, endpoint, *args, return_type="json", count=count, page=page, **kwargs)
+        rows.extend(batch)
+        if len(batch) < count:
+            break
+        page += 1
+    if return_type == "json":
+        return rows
+    if return_type == "pandas":
+        return convert_json_to_pandas(rows)
+    return convert_json_to_object(rows)
+
+
+blockfrost_api = RateLimitedBlockFrostApi(
+    project_id=Constants.BLOCK_FROST_PROJECT_ID, base_url=Constants.BASE_URL
+)
@@ -0,0 +1,277 @@
+import asyncio
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+import requests
+
+from suantrazabilidadapi.utils.exception import PlataformaException
+from suantrazabilidadapi.utils.generic import Constants
+
+
+class CircuitOpenError(PlataformaException):
+    """Calls to an operation are rejected while its circuit is open"""
+
+
+def written_before(data: Any) -> bool:
+    """A create rejected because the record exists: DynamoDB's conditional check on the key"""
+    errors = data.get("errors") if isinstance(data, dict) else None
+    return bool(errors) and all("ConditionalCheckFailed" in str(error.get("errorType", "")) for error in errors)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Transport failures, timeouts, throttling and server errors are worth another attempt"""
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(
+        error,
+        (requests.exceptions.ConnectionError, requests.exceptions.Timeout, httpx.TransportError),
+    )
+
+
+@dataclass()
+class CircuitBreaker:
+    """Opens after consecutive failures and lets a single trial call through after reset_timeout"""
+
+    failure_threshold: int = 5
+    reset_timeout: float = 30
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def abandon(self):
+        """The call was cancelled: it tells nothing about the service, let the next one be the trial"""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+@dataclass()
+class LatencyWindow:
+    """Latencies of the last successful calls of an operation"""
+
+    size: int = 200
+
+    def __post_init__(self):
+        self._samples: deque = deque(maxlen=self.size)
+
+    def add(self, latency: float):
+        self._samples.append(latency)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, quantile: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, math.ceil(quantile * len(ordered)) - 1)]
+
+
+@dataclass()
+class ResiliencePolicy(Constants):
+    """Retries, circuit breakers and hedged reads around the calls to Plataforma.
+
+    Mutations are only retried when they create a record under an id chosen by the caller
+    (record_id), such as the wallet id derived from the mnemonic. The resolvers refuse to
+    create an existing key, so a wallet or script is never written twice; when a retry is
+    refused that way, an earlier attempt wrote the record and the retry counts as a success.
+    Hedging is only done on the asyncio client.
+    """
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._latencies: dict[str, LatencyWindow] = {}
+        self.retries = 0
+        self.hedged = 0
+        self.rejected = 0
+        self.written_before = 0
+
+    def breaker(self, key: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = CircuitBreaker(self.PLATAFORMA_BREAKER_FAILURES, self.PLATAFORMA_BREAKER_RESET)
+                self._breakers[key] = breaker
+            return breaker
+
+    def latencies(self, key: str) -> LatencyWindow:
+        with self._lock:
+            return self._latencies.setdefault(key, LatencyWindow())
+
+    def attempts(self, is_mutation: bool, record_id: Optional[str] = None) -> int:
+        if is_mutation and not record_id:
+            return 1
+        return 1 + self.PLATAFORMA_RETRIES
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: a random delay up to the exponential backoff of the attempt"""
+        ceiling = min(self.PLATAFORMA_RETRY_MAX_DELAY, self.PLATAFORMA_RETRY_BASE_DELAY * 2**attempt)
+        return random.uniform(0, ceiling)
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        latencies = self.latencies(key)
+        if not self.PLATAFORMA_HEDGE_READS or len(latencies) < self.PLATAFORMA_HEDGE_MIN_SAMPLES:
+            return None
+        return latencies.percentile(0.95)
+
+    def _settle(self, key: str, result: Any, attempt: int, is_mutation: bool) -> Any:
+        if attempt and is_mutation and written_before(result):
+            logging.info(f"{key} already written by an earlier attempt")
+            self.written_before += 1
+            return {"data": result.get("data")}
+        return result
+
+    def _admit(self, key: str) -> CircuitBreaker:
+        breaker = self.breaker(key)
+        if not breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"Circuit open for {key}, Plataforma calls suspended")
+        return breaker
+
+    def call(
+        self, key: str, send: Callable[[], Any], is_mutation: bool = False, record_id: Optional[str] = None
+    ) -> Any:
+        attempts = self.attempts(is_mutation, record_id)
+        for attempt in range(attempts):
+            breaker = self._admit(key)
+            start = time.monotonic()
+            try:
+                result = send()
+            except Exception as e:
+                if is_retryable(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if attempt + 1 >= attempts or not is_retryable(e):
+                    raise
+                self.retries += 1
+                logging.warning(f"Retrying {key} after error: {e}")
+                time.sleep(self.backoff(attempt))
+                continue
+            except BaseException:
+                breaker.abandon()
+                raise
+            breaker.record_success()
+            self.latencies(key).add(time.monotonic() - start)
+            return self._settle(key, result, attempt, is_mutation)
+
+    async def _timed(self, key: str, send: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.monotonic()
+        result = await send()
+        self.latencies(key).add(time.monotonic() - start)
+        return result
+
+    async def _hedged(self, key: str, send: Callable[[], Awaitable[Any]], delay: float) -> Any:
+        """Send a second identical read if the first one is slower than the usual p95"""
+        primary = asyncio.ensure_future(self._timed(key, send))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        self.hedged += 1
+        tasks = {primary, asyncio.ensure_future(self._timed(key, send))}
+        error: Optional[BaseException] = None
+        try:
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def acall(
+        self,
+        key: str,
+        send: Callable[[], Awaitable[Any]],
+        is_mutation: bool = False,
+        record_id: Optional[str] = None,
+    ) -> Any:
+        attempts = self.attempts(is_mutation, record_id)
+        for attempt in range(attempts):
+            breaker = self._admit(key)
+            delay = None if is_mutation else self.hedge_delay(key)
+            try:
+                if delay is None:
+                    result = await self._timed(key, send)
+                else:
+                    result = await self._hedged(key, send, delay)
+            except Exception as e:
+                if is_retryable(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if attempt + 1 >= attempts or not is_retryable(e):
+                    raise
+                self.retries += 1
+                logging.warning(f"Retrying {key} after error: {e}")
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+            except BaseException:
+                # Cancelled, as when the client went away: a half open circuit gets its trial again
+                breaker.abandon()
+                raise
+            breaker.record_success()
+            return self._settle(key, result, attempt, is_mutation)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            breakers = {key: breaker.state for key, breaker in self._breakers.items()}
+            p95 = {key: window.percentile(0.95) for key, window in self._latencies.items()}
+        return {
+            "retries": self.retries,
+            "hedged": self.hedged,
+            "rejected": self.rejected,
+            "written_before": self.written_before,
+            "breakers": breakers,
+            "p95_seconds": p95,
+        }
+
+
+resilience = ResiliencePolicy()
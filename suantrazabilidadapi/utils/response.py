@@ -1,6 +1,14 @@
+import asyncio
+import json
 from dataclasses import dataclass
-from typing import Any
-from suantrazabilidadapi.utils.exception import ResponseDynamoDBException
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from fastapi import Request
+from fastapi.exception_handlers import http_exception_handler as default_http_exception_handler
+from fastapi.responses import JSONResponse
+from starlette.exceptions import HTTPException
+
+from suantrazabilidadapi.utils.exception import BlockfrostRateLimited, ResponseDynamoDBException
 
 
 @dataclass()
@@ -163,4 +171,58 @@ class Response():
                 response_success["success"] = False
                 response_success["data"] = createMerkleTreeResponse["data"]["errors"]
 
-        return response_success
\ No newline at end of file
+        return response_success
+
+
+async def ndjson_lines(items: AsyncIterator[dict]) -> AsyncIterator[str]:
+    """Serialize items as newline delimited JSON.
+
+    The status code is already sent when streaming, so a failure ends the stream with an error line.
+    """
+    try:
+        async for item in items:
+            yield json.dumps(item) + "\n"
+    except Exception as e:
+        yield json.dumps({"success": False, "error": str(e)}) + "\n"
+
+
+async def iterate_in_thread(items: Iterator[dict]) -> AsyncIterator[dict]:
+    """Iterate a blocking iterator off the event loop, one item at a time"""
+    done = object()
+    try:
+        while True:
+            item = await asyncio.to_thread(next, items, done)
+            if item is done:
+                break
+            yield item
+    finally:
+        close = getattr(items, "close", None)
+        if close is not None:
+            try:
+                close()
+            except ValueError:
+                # Still running in its thread after a disconnection: it ends with the pending item
+                pass
+
+
+def rate_limited_cause(exc: Optional[BaseException]) -> Optional[BlockfrostRateLimited]:
+    """BlockfrostRateLimited the exception was raised from, if any"""
+    while exc is not None:
+        if isinstance(exc, BlockfrostRateLimited):
+            return exc
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+async def blockfrost_rate_limited_handler(request: Request, exc: BlockfrostRateLimited) -> JSONResponse:
+    """503 telling the client when to try again, for a call the Blockfrost rate limiter rejected"""
+    return JSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": str(exc.retry_after)})
+
+
+async def http_exception_handler(request: Request, exc: HTTPException):
+    """FastAPI's answer to an HTTPException, unless it was raised from a rejection of the rate
+    limiter: endpoints turn unexpected errors into 500s, the rejection stays a 503"""
+    limited = rate_limited_cause(exc)
+    if limited is not None:
+        return await blockfrost_rate_limited_handler(request, limited)
+    return await default_http_exception_handler(request, exc)
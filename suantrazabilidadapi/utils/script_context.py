@@ -0,0 +1,289 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Union
+
+import opshin.prelude as oprelude
+import pycardano
+
+from suantrazabilidadapi.utils.exception import UnsupportedScriptError
+
+# Converts a slot to POSIX time (seconds)
+PosixFromSlot = Callable[[int], int]
+
+
+def to_staking_credential(
+    sk: Union[
+        pycardano.VerificationKeyHash,
+        pycardano.ScriptHash,
+        pycardano.PointerAddress,
+        None,
+    ]
+):
+    if sk is None:
+        return oprelude.NoStakingCredential()
+    return oprelude.SomeStakingCredential(to_staking_hash(sk))
+
+
+def to_staking_hash(
+    sk: Union[
+        pycardano.VerificationKeyHash, pycardano.ScriptHash, pycardano.PointerAddress
+    ]
+):
+    if isinstance(sk, pycardano.PointerAddress):
+        return oprelude.StakingPtr(sk.slot, sk.tx_index, sk.cert_index)
+    if isinstance(sk, pycardano.VerificationKeyHash):
+        return oprelude.StakingHash(oprelude.PubKeyCredential(sk.payload))
+    if isinstance(sk, pycardano.ScriptHash):
+        return oprelude.StakingHash(oprelude.ScriptCredential(sk.payload))
+    raise UnsupportedScriptError(f"Unknown stake key type {type(sk)}")
+
+
+def to_wdrl(wdrl: Optional[pycardano.Withdrawals]) -> Dict[oprelude.StakingCredential, int]:
+    if wdrl is None:
+        return {}
+
+    def m(k: bytes):
+        sk = pycardano.Address.from_primitive(k).staking_part
+        return to_staking_hash(sk)
+
+    return {m(key): val for key, val in wdrl.to_primitive().items()}
+
+
+def to_valid_range(validity_start: Optional[int], ttl: Optional[int], posix_from_slot: PosixFromSlot):
+    if validity_start is None:
+        lower_bound = oprelude.LowerBoundPOSIXTime(oprelude.NegInfPOSIXTime(), oprelude.FalseData())
+    else:
+        start = posix_from_slot(validity_start) * 1000
+        lower_bound = oprelude.LowerBoundPOSIXTime(oprelude.FinitePOSIXTime(start), oprelude.TrueData())
+    if ttl is None:
+        upper_bound = oprelude.UpperBoundPOSIXTime(oprelude.PosInfPOSIXTime(), oprelude.FalseData())
+    else:
+        end = posix_from_slot(ttl) * 1000
+        upper_bound = oprelude.UpperBoundPOSIXTime(oprelude.FinitePOSIXTime(end), oprelude.TrueData())
+    return oprelude.POSIXTimeRange(lower_bound, upper_bound)
+
+
+def to_pubkeyhash(vkh: pycardano.VerificationKeyHash):
+    return oprelude.PubKeyHash(vkh.payload)
+
+
+def to_tx_id(tx_id: pycardano.TransactionId):
+    return oprelude.TxId(tx_id.payload)
+
+
+def multiasset_to_value(ma: pycardano.MultiAsset) -> oprelude.Value:
+    if ma is None:
+        return {b"": {b"": 0}}
+    return {
+        oprelude.PolicyId(policy_id): {
+            oprelude.TokenName(asset_name): quantity for asset_name, quantity in asset.items()
+        }
+        for policy_id, asset in ma.to_shallow_primitive().items()
+    }
+
+
+def value_to_value(v: pycardano.Value):
+    ma = multiasset_to_value(v.multi_asset)
+    ma[b""] = {b"": v.coin}
+    return ma
+
+
+def to_payment_credential(
+    c: Union[pycardano.VerificationKeyHash, pycardano.ScriptHash]
+):
+    if isinstance(c, pycardano.VerificationKeyHash):
+        return oprelude.PubKeyCredential(oprelude.PubKeyHash(c.payload))
+    if isinstance(c, pycardano.ScriptHash):
+        return oprelude.ScriptCredential(oprelude.ValidatorHash(c.payload))
+    raise UnsupportedScriptError(f"Unknown payment key type {type(c)}")
+
+
+def to_address(a: pycardano.Address):
+    return oprelude.Address(
+        to_payment_credential(a.payment_part),
+        to_staking_credential(a.staking_part),
+    )
+
+
+def to_tx_out(o: pycardano.TransactionOutput):
+    if o.datum is not None:
+        output_datum = oprelude.SomeOutputDatum(o.datum)
+    elif o.datum_hash is not None:
+        output_datum = oprelude.SomeOutputDatumHash(o.datum_hash.payload)
+    else:
+        output_datum = oprelude.NoOutputDatum()
+    if o.script is None:
+        script = oprelude.NoScriptHash()
+    else:
+        script = oprelude.SomeScriptHash(pycardano.script_hash(o.script).payload)
+    return oprelude.TxOut(
+        to_address(o.address),
+        value_to_value(o.amount),
+        output_datum,
+        script,
+    )
+
+
+def to_tx_out_ref(i: pycardano.TransactionInput):
+    return oprelude.TxOutRef(
+        oprelude.TxId(i.transaction_id.payload),
+        i.index,
+    )
+
+
+def to_tx_in_info(i: pycardano.TransactionInput, o: pycardano.TransactionOutput):
+    return oprelude.TxInInfo(
+        to_tx_out_ref(i),
+        to_tx_out(o),
+    )
+
+
+def to_redeemer_purpose(r: pycardano.Redeemer, tx_body: pycardano.TransactionBody):
+    v = r.tag
+    if v == pycardano.RedeemerTag.SPEND:
+        spent_input = tx_body.inputs[r.index]
+        return oprelude.Spending(to_tx_out_ref(spent_input))
+    elif v == pycardano.RedeemerTag.MINT:
+        minted_id = sorted(tx_body.mint.data.keys())[r.index]
+        return oprelude.Minting(oprelude.PolicyId(minted_id.payload))
+    raise UnsupportedScriptError(f"Can not build the script context of {v.name.lower()} redeemers")
+
+
+def to_tx_info(
+    tx: pycardano.Transaction,
+    resolved_inputs: List[pycardano.TransactionOutput],
+    resolved_reference_inputs: List[pycardano.TransactionOutput],
+    posix_from_slot: PosixFromSlot,
+):
+    tx_body = tx.transaction_body
+    if tx_body.certificates:
+        raise UnsupportedScriptError("Can not build the script context of transactions with certificates")
+    datums = [
+        o.datum
+        for o in tx_body.outputs + resolved_inputs + resolved_reference_inputs
+        if o.datum is not None
+    ]
+    if tx.transaction_witness_set.plutus_data:
+        datums += tx.transaction_witness_set.plutus_data
+    redeemers = (
+        tx.transaction_witness_set.redeemer
+        if tx.transaction_witness_set.redeemer
+        else []
+    )
+    return oprelude.TxInfo(
+        [to_tx_in_info(i, o) for i, o in zip(tx_body.inputs, resolved_inputs)],
+        [
+            to_tx_in_info(i, o)
+            for i, o in zip(tx_body.reference_inputs, resolved_reference_inputs)
+        ]
+        if tx_body.reference_inputs is not None
+        else [],
+        [to_tx_out(o) for o in tx_body.outputs],
+        value_to_value(pycardano.Value(tx_body.fee)),
+        multiasset_to_value(tx_body.mint),
+        [],
+        to_wdrl(tx_body.withdraws),
+        to_valid_range(tx_body.validity_start, tx_body.ttl, posix_from_slot),
+        [to_pubkeyhash(s) for s in tx_body.required_signers]
+        if tx_body.required_signers
+        else [],
+        {to_redeemer_purpose(r, tx_body): r.data for r in redeemers},
+        {pycardano.datum_hash(d).payload: d for d in datums},
+        to_tx_id(tx_body.id),
+    )
+
+
+@dataclass
+class ScriptInvocation:
+    script: pycardano.ScriptType
+    datum: Optional[pycardano.Datum]
+    redeemer: pycardano.Redeemer
+    script_context: oprelude.ScriptContext
+
+
+def _plutus_v2_scripts(
+    tx: pycardano.Transaction, resolved: List[pycardano.UTxO]
+) -> Dict[pycardano.ScriptHash, pycardano.PlutusV2Script]:
+    """Plutus V2 scripts available to the transaction: attached to it or held by reference"""
+    scripts = list(tx.transaction_witness_set.plutus_v2_script or [])
+    scripts += [utxo.output.script for utxo in resolved if isinstance(utxo.output.script, pycardano.PlutusV2Script)]
+    return {pycardano.plutus_script_hash(pycardano.PlutusV2Script(s)): s for s in scripts}
+
+
+def _redeemer(redeemers: List[pycardano.Redeemer], tag: pycardano.RedeemerTag, index: int, what: str):
+    try:
+        return next(r for r in redeemers if r.index == index and r.tag == tag)
+    except StopIteration:
+        raise ValueError(
+            f"Missing redeemer for {what} {index} (index or tag set incorrectly or missing redeemer)"
+        )
+
+
+def _spending_datum(tx: pycardano.Transaction, spending_input: pycardano.UTxO) -> pycardano.Datum:
+    if spending_input.output.datum is not None:
+        return spending_input.output.datum
+    datum_h = spending_input.output.datum_hash
+    if datum_h is None:
+        raise ValueError("Spending input is missing an attached datum and can not be spent")
+    try:
+        return next(
+            d
+            for d in tx.transaction_witness_set.plutus_data or []
+            if pycardano.datum_hash(d) == datum_h
+        )
+    except StopIteration:
+        raise ValueError(f"No datum with hash '{datum_h.payload.hex()}' provided for transaction")
+
+
+def generate_script_contexts_resolved(
+    tx: pycardano.Transaction,
+    resolved_inputs: List[pycardano.UTxO],
+    resolved_reference_inputs: List[pycardano.UTxO],
+    posix_from_slot: PosixFromSlot,
+) -> List[ScriptInvocation]:
+    """Script invocations of the transaction, with the datum, redeemer and context each one is called with.
+
+    Only Plutus V2 scripts are handled: any other script raises UnsupportedScriptError.
+    """
+    tx_info = to_tx_info(
+        tx,
+        [i.output for i in resolved_inputs],
+        [i.output for i in resolved_reference_inputs],
+        posix_from_slot,
+    )
+    scripts = _plutus_v2_scripts(tx, resolved_reference_inputs + resolved_inputs)
+    redeemers = tx.transaction_witness_set.redeemer or []
+    script_contexts = []
+    for i, spending_input in enumerate(resolved_inputs):
+        if not isinstance(spending_input.output.address.payment_part, pycardano.ScriptHash):
+            continue
+        spending_redeemer = _redeemer(redeemers, pycardano.RedeemerTag.SPEND, i, "script input")
+        spending_script = scripts.get(spending_input.output.address.payment_part)
+        if spending_script is None:
+            raise UnsupportedScriptError(
+                "Can not validate spending of non plutus v2 script (or plutus v2 script is not in context)"
+            )
+        script_contexts.append(
+            ScriptInvocation(
+                spending_script,
+                _spending_datum(tx, spending_input),
+                spending_redeemer,
+                oprelude.ScriptContext(tx_info, oprelude.Spending(to_tx_out_ref(spending_input.input))),
+            )
+        )
+    for i, minting_script_hash in enumerate(sorted(tx.transaction_body.mint or [])):
+        minting_redeemer = _redeemer(redeemers, pycardano.RedeemerTag.MINT, i, "mint")
+        minting_script = scripts.get(minting_script_hash)
+        if minting_script is None:
+            raise UnsupportedScriptError(
+                "Can not validate minting of non plutus v2 script (or plutus v2 script is not in context)"
+            )
+
+        script_contexts.append(
+            ScriptInvocation(
+                minting_script,
+                None,
+                minting_redeemer,
+                oprelude.ScriptContext(tx_info, oprelude.Minting(minting_script_hash.payload)),
+            )
+        )
+    return script_contexts
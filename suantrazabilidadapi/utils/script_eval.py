@@ -0,0 +1,197 @@
+import functools
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+import cbor2
+from pycardano import (
+    ExecutionUnits,
+    GenesisParameters,
+    ProtocolParameters,
+    RawCBOR,
+    Transaction,
+    TransactionInput,
+    UTxO,
+)
+from pycardano.serialization import default_encoder
+from uplc.ast import PlutusData, Program, data_from_cbor
+from uplc.cost_model import (
+    Budget,
+    default_builtin_cost_model_base,
+    default_builtin_cost_model_plutus_v2,
+    default_cek_machine_cost_model_base,
+    default_cek_machine_cost_model_plutus_v2,
+    updated_builtin_cost_model_from_network_config,
+    updated_cek_machine_cost_model_from_network_config,
+)
+from uplc.machine import Machine
+from uplc.tools import apply, unflatten
+
+from suantrazabilidadapi.utils.exception import ScriptEvaluationError, UnsupportedScriptError
+from suantrazabilidadapi.utils.generic import Constants
+from suantrazabilidadapi.utils.script_context import ScriptInvocation, generate_script_contexts_resolved
+
+# First Shelley slot and its POSIX time (seconds), for the networks that started in the Byron era
+SHELLEY_START = {
+    "mainnet": (4492800, 1596059091),
+    "preprod": (86400, 1655769600),
+}
+
+
+class UnresolvedInput(Exception):
+    """An input or reference input of the transaction could not be resolved locally"""
+
+
+@functools.lru_cache(maxsize=32)
+def _program(script: bytes) -> Program:
+    return unflatten(script)
+
+
+def _data(value: Any) -> PlutusData:
+    """uplc data of a datum or redeemer, which pycardano also allows to be a plain int, bytes, list..."""
+    cbor = value.cbor if isinstance(value, RawCBOR) else cbor2.dumps(value, default=default_encoder)
+    return data_from_cbor(cbor)
+
+
+@dataclass()
+class ScriptEvaluator(Constants):
+    """Execution units of the redeemers of a transaction, computed in-process with uplc.
+
+    The script contexts are built from the transaction and its resolved inputs, and every script
+    runs on the CEK machine with the Plutus V2 cost model of the current protocol parameters. The
+    backend evaluator is only called when a script or an input cannot be handled locally, or to
+    cross-check the local result when SCRIPT_EVAL_CROSS_CHECK is set.
+    """
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._cost_model_key: Optional[tuple] = None
+        self._cost_models = (default_cek_machine_cost_model_plutus_v2(), default_builtin_cost_model_plutus_v2())
+        self.local = 0
+        self.remote = 0
+        self.fallbacks = 0
+        self.failures = 0
+        self.mismatches = 0
+
+    def cost_models(self, protocol_param: ProtocolParameters):
+        """CEK machine and builtin cost models of the network, or uplc's when they do not fit"""
+        network_config = (protocol_param.cost_models or {}).get("PlutusV2")
+        if not isinstance(network_config, dict):
+            return self._cost_models
+        key = tuple(sorted(network_config.items()))
+        with self._lock:
+            if key != self._cost_model_key:
+                try:
+                    self._cost_models = (
+                        updated_cek_machine_cost_model_from_network_config(
+                            default_cek_machine_cost_model_base(), network_config
+                        ),
+                        updated_builtin_cost_model_from_network_config(
+                            default_builtin_cost_model_base(), network_config
+                        ),
+                    )
+                except (KeyError, TypeError, ValueError) as e:
+                    logging.warning(f"PlutusV2 cost model of the network not usable, using uplc's: {e}")
+                    self._cost_models = (
+                        default_cek_machine_cost_model_plutus_v2(),
+                        default_builtin_cost_model_plutus_v2(),
+                    )
+                self._cost_model_key = key
+            return self._cost_models
+
+    def posix_from_slot(self, genesis_param: GenesisParameters) -> Callable[[int], int]:
+        shelley_slot, shelley_time = SHELLEY_START.get(self.NETWORK_NAME, (0, genesis_param.system_start))
+        return lambda slot: shelley_time + (slot - shelley_slot) * genesis_param.slot_length
+
+    def run(self, invocation: ScriptInvocation, protocol_param: ProtocolParameters) -> ExecutionUnits:
+        cek_machine_cost_model, builtin_cost_model = self.cost_models(protocol_param)
+        args = [invocation.redeemer.data, invocation.script_context]
+        if invocation.datum is not None:
+            args.insert(0, invocation.datum)
+        program = apply(_program(bytes(invocation.script)), *(_data(a) for a in args))
+        budget = Budget(cpu=protocol_param.max_tx_ex_steps, memory=protocol_param.max_tx_ex_mem)
+        result = Machine(budget, cek_machine_cost_model, builtin_cost_model).eval(program)
+        if isinstance(result.result, Exception):
+            raise ScriptEvaluationError(
+                f"Script of {invocation.redeemer.tag.name.lower()}:{invocation.redeemer.index} failed: "
+                f"{result.result!r}; logs: {result.logs}"
+            )
+        return ExecutionUnits(result.cost.memory, result.cost.cpu)
+
+    def evaluate(
+        self,
+        tx: Transaction,
+        resolve: Callable[[TransactionInput], Optional[UTxO]],
+        protocol_param: ProtocolParameters,
+        genesis_param: GenesisParameters,
+    ) -> dict[str, ExecutionUnits]:
+        """Execution units per redeemer ("spend:0", "mint:0"...), as returned by the backends"""
+        tx_body = tx.transaction_body
+        resolved = []
+        for inputs in (tx_body.inputs, tx_body.reference_inputs or []):
+            utxos = []
+            for tx_input in inputs:
+                utxo = resolve(tx_input)
+                if utxo is None:
+                    raise UnresolvedInput(f"{tx_input.transaction_id.payload.hex()}#{tx_input.index}")
+                utxos.append(utxo)
+            resolved.append(utxos)
+
+        invocations = generate_script_contexts_resolved(
+            tx, resolved[0], resolved[1], self.posix_from_slot(genesis_param)
+        )
+        return {
+            f"{invocation.redeemer.tag.name.lower()}:{invocation.redeemer.index}": self.run(
+                invocation, protocol_param
+            )
+            for invocation in invocations
+        }
+
+    def evaluate_tx(
+        self,
+        tx: Transaction,
+        resolve: Callable[[TransactionInput], Optional[UTxO]],
+        remote: Callable[[Transaction], dict[str, ExecutionUnits]],
+        protocol_param: ProtocolParameters,
+        genesis_param: GenesisParameters,
+    ) -> dict[str, ExecutionUnits]:
+        """Evaluate locally, using the remote evaluator for what uplc cannot handle"""
+        if not self.SCRIPT_EVAL_LOCAL:
+            self.remote += 1
+            return remote(tx)
+        try:
+            units = self.evaluate(tx, resolve, protocol_param, genesis_param)
+        except ScriptEvaluationError:
+            self.failures += 1
+            raise
+        except (UnresolvedInput, UnsupportedScriptError) as e:
+            # Inputs the node knows but not this process, non plutus v2 scripts, certificates...
+            self.fallbacks += 1
+            logging.info(f"Script evaluation sent to the backend: {e!r}")
+            self.remote += 1
+            return remote(tx)
+        self.local += 1
+
+        if self.SCRIPT_EVAL_CROSS_CHECK:
+            self.remote += 1
+            checked = remote(tx)
+            if checked != units:
+                self.mismatches += 1
+                logging.warning(f"Local script evaluation {units} differs from the backend's {checked}")
+            return checked
+        return units
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "local_enabled": self.SCRIPT_EVAL_LOCAL,
+            "cross_check": self.SCRIPT_EVAL_CROSS_CHECK,
+            "local": self.local,
+            "remote": self.remote,
+            "fallbacks": self.fallbacks,
+            "failures": self.failures,
+            "mismatches": self.mismatches,
+        }
+
+
+script_evaluator = ScriptEvaluator()
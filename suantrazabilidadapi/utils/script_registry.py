@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+import pathlib
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+from pycardano import PlutusV2Script, ScriptHash, plutus_script_hash
+
+from suantrazabilidadapi.utils.exception import ResponseDynamoDBException
+from suantrazabilidadapi.utils.generic import Constants, is_valid_hex_string
+from suantrazabilidadapi.utils.plataforma import async_plataforma_client
+from suantrazabilidadapi.utils.response import Response
+
+
+@dataclass(frozen=True)
+class ScriptRecord:
+    """Script as registered in Plataforma, with its deserialized PlutusV2Script"""
+
+    policy_id: str
+    plutus_script: PlutusV2Script
+    script_hash: ScriptHash
+    testnet_address: Optional[str]
+    mainnet_address: Optional[str]
+    info: Mapping[str, Any]
+
+    @classmethod
+    def from_info(cls, script_info: dict, strict: bool = True) -> "ScriptRecord":
+        """Build the record, checking that the cbor hashes to the policy id it is stored under"""
+        policy_id = script_info.get("id", "")
+        cbor_hex = script_info.get("cbor") or ""
+        if not is_valid_hex_string(cbor_hex):
+            raise ValueError(f"Script {policy_id} has no valid cbor")
+        plutus_script = PlutusV2Script(bytes.fromhex(cbor_hex))
+        script_hash = plutus_script_hash(plutus_script)
+        if strict and script_hash.payload.hex() != policy_id:
+            raise ValueError(f"Script cbor hashes to {script_hash.payload.hex()}, not to {policy_id}")
+
+        return cls(
+            policy_id=policy_id,
+            plutus_script=plutus_script,
+            script_hash=script_hash,
+            testnet_address=script_info.get("testnetAddr"),
+            mainnet_address=script_info.get("MainnetAddr"),
+            info=MappingProxyType(dict(script_info)),
+        )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.info.get(key, default)
+
+
+@dataclass()
+class ScriptRegistry(Constants):
+    """Content-addressed registry of the scripts stored in Plataforma, keyed by policy id.
+
+    The policy id is the hash of the script cbor, so a record never changes once verified.
+    Records are persisted in SCRIPTS_DIR to start warm after a restart.
+    """
+
+    scripts_dir: Optional[pathlib.Path] = None
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._records: dict[str, ScriptRecord] = {}
+        self.path = pathlib.Path(self.scripts_dir or self.PROJECT_ROOT.joinpath(self.SCRIPTS_DIR))
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.backend_fetches = 0
+
+    def _file(self, policy_id: str) -> Optional[pathlib.Path]:
+        # The policy id is used as file name, so it must be a plain script hash
+        if len(policy_id) != 56 or not is_valid_hex_string(policy_id):
+            return None
+        return self.path.joinpath(f"{policy_id}.json")
+
+    def _load(self, policy_id: str) -> Optional[ScriptRecord]:
+        file_path = self._file(policy_id)
+        if file_path is None or not file_path.exists():
+            return None
+        try:
+            with open(file_path, "r", encoding="utf-8") as file:
+                return ScriptRecord.from_info(json.load(file))
+        except (OSError, ValueError) as e:
+            logging.warning(f"Discarding stored script {policy_id}: {e}")
+            return None
+
+    def _save(self, record: ScriptRecord):
+        file_path = self._file(record.policy_id)
+        if file_path is None:
+            return
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            tmp_path = file_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(dict(record.info), file)
+            os.replace(tmp_path, file_path)
+        except OSError as e:
+            logging.warning(f"Could not persist script {record.policy_id}: {e}")
+
+    def add(self, script_info: dict) -> ScriptRecord:
+        record = ScriptRecord.from_info(script_info)
+        with self._lock:
+            self._records[record.policy_id] = record
+        self._save(record)
+        return record
+
+    async def get(self, policy_id: str, loader: Optional[Any] = None) -> ScriptRecord:
+        """Return the script record, fetching it from Plataforma only the first time.
+
+        With a request loader, the scripts missing in the same tick are fetched in one query.
+        """
+        record = self._records.get(policy_id)
+        if record is not None:
+            self.memory_hits += 1
+            return record
+
+        record = self._load(policy_id)
+        if record is not None:
+            self.disk_hits += 1
+            with self._lock:
+                self._records[policy_id] = record
+            return record
+
+        self.backend_fetches += 1
+        plataforma = loader if loader is not None else async_plataforma_client
+        r = await plataforma.getScript("getScriptById", {"id": policy_id})
+        final_response = Response().handle_getScript_response(r)
+
+        if not final_response["connection"] or not final_response.get("success", None):
+            raise ResponseDynamoDBException(final_response.get("data", f"Script {policy_id} not found"))
+
+        try:
+            return self.add(final_response["data"])
+        except ValueError as e:
+            # Not content-addressed, so it cannot be kept without risking a stale record
+            logging.warning(f"Script {policy_id} not cached: {e}")
+            return ScriptRecord.from_info(final_response["data"], strict=False)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self._records),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "backend_fetches": self.backend_fetches,
+        }
+
+
+script_registry = ScriptRegistry()
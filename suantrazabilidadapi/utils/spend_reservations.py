@@ -0,0 +1,376 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional, Union
+
+import redis
+from pycardano import (
+    Address,
+    ChainContext,
+    ExtendedSigningKey,
+    SigningKey,
+    Transaction,
+    TransactionBuilder,
+    TransactionInput,
+    TransactionOutput,
+    UTxO,
+)
+
+from suantrazabilidadapi.utils.blockchain import IndexedChainContext
+from suantrazabilidadapi.utils.exception import SpendConflictError
+from suantrazabilidadapi.utils.generic import Constants
+from suantrazabilidadapi.utils.utxo_index import BlockChanges, local_utxo_index
+
+
+def utxo_ref(utxo: UTxO) -> str:
+    return f"{utxo.input.transaction_id.payload.hex()}#{utxo.input.index}"
+
+
+def expiry(ttl: float) -> int:
+    # Redis expiries are whole seconds and must be positive
+    return max(1, math.ceil(ttl))
+
+
+@dataclass()
+class MemorySpendStore:
+    """Reservations of the current process, used when redis is disabled or unavailable"""
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._values: dict[str, tuple[float, str]] = {}
+        self._sets: dict[str, tuple[float, set[str]]] = {}
+
+    def _value(self, key: str) -> Optional[str]:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._values[key]
+            return None
+        return entry[1]
+
+    def claim(self, key: str, value: str, ttl: float) -> bool:
+        with self._lock:
+            if self._value(key) is not None:
+                return False
+            self._values[key] = (time.monotonic() + ttl, value)
+            return True
+
+    def put(self, key: str, value: str, ttl: float):
+        with self._lock:
+            self._values[key] = (time.monotonic() + ttl, value)
+
+    def get_many(self, keys: list[str]) -> list[Optional[str]]:
+        with self._lock:
+            return [self._value(key) for key in keys]
+
+    def delete(self, keys: list[str]):
+        with self._lock:
+            for key in keys:
+                self._values.pop(key, None)
+
+    def add_member(self, key: str, member: str, ttl: float):
+        with self._lock:
+            _, members = self._sets.get(key, (0, set()))
+            members.add(member)
+            self._sets[key] = (time.monotonic() + ttl, members)
+
+    def members(self, key: str) -> set[str]:
+        with self._lock:
+            entry = self._sets.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._sets.pop(key, None)
+                return set()
+            return set(entry[1])
+
+    def remove_member(self, key: str, member: str):
+        with self._lock:
+            entry = self._sets.get(key)
+            if entry is not None:
+                entry[1].discard(member)
+
+    def snapshot(self) -> tuple[list[tuple[str, str, float]], list[tuple[str, str, float]]]:
+        """Live values and set members, each with the seconds it has left"""
+        now = time.monotonic()
+        with self._lock:
+            values = [(key, value, expires - now) for key, (expires, value) in self._values.items() if expires > now]
+            members = [
+                (key, member, expires - now)
+                for key, (expires, key_members) in self._sets.items()
+                if expires > now
+                for member in key_members
+            ]
+        return values, members
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._sets.clear()
+
+
+@dataclass()
+class RedisSpendStore:
+    """Reservations shared by the uvicorn and celery workers"""
+
+    client: redis.Redis
+
+    def claim(self, key: str, value: str, ttl: float) -> bool:
+        return bool(self.client.set(key, value, nx=True, ex=expiry(ttl)))
+
+    def put(self, key: str, value: str, ttl: float):
+        self.client.set(key, value, ex=expiry(ttl))
+
+    def get_many(self, keys: list[str]) -> list[Optional[str]]:
+        return self.client.mget(keys) if keys else []
+
+    def delete(self, keys: list[str]):
+        if keys:
+            self.client.delete(*keys)
+
+    def add_member(self, key: str, member: str, ttl: float):
+        pipe = self.client.pipeline()
+        pipe.sadd(key, member)
+        pipe.expire(key, expiry(ttl))
+        pipe.execute()
+
+    def members(self, key: str) -> set[str]:
+        return self.client.smembers(key)
+
+    def remove_member(self, key: str, member: str):
+        self.client.srem(key, member)
+
+
+@dataclass()
+class PendingSpends(Constants):
+    """Inputs of the in-flight transactions of a wallet, so concurrent builders do not pick them.
+
+    Submitting through submit() reserves the inputs of the transaction and records its outputs.
+    Chain contexts returned by context() hide the reserved UTxOs from coin selection and offer
+    the outputs of the in-flight transactions instead, so the next transaction can chain on
+    them. build_and_submit() builds the transaction again when another builder reserved one of
+    the UTxOs it selected meanwhile.
+
+    Reservations are released when the submission fails, when the local UTxO index sees the
+    transaction in a block, or when its outputs come back from the chain as UTxOs of the
+    address. Celery workers do not run the index: with redis, the API workers release their
+    transactions too; without it, or when no context asks for the outputs, the reservations
+    expire after PENDING_SPENDS_TTL.
+
+    When redis fails, the process keeps its reservations in memory and leaves redis alone for
+    PENDING_SPENDS_REDIS_RETRY seconds. Other workers do not see those reservations meanwhile,
+    so a concurrent builder may pick the same UTxO and get its submission rejected by the node.
+    Once redis answers again, the reservations made in memory are copied to it before anything
+    else, so the workers share them from then on.
+    """
+
+    KEY_PREFIX = "PendingSpend"
+
+    def __post_init__(self):
+        self.local = MemorySpendStore()
+        self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.store: Any = self.local
+        if self.PENDING_SPENDS_REDIS:
+            self.store = RedisSpendStore(
+                redis.Redis.from_url(
+                    self.redis_url, decode_responses=True, socket_connect_timeout=1, socket_timeout=1
+                )
+            )
+        self.reserved = 0
+        self.released = 0
+        self.confirmed = 0
+        self.conflicts = 0
+        self.chained = 0
+        self.rebuilt = 0
+        self.redis_errors = 0
+        self._lock = threading.Lock()
+        self._redis_down_until = 0.0
+        self._fell_back = False
+        local_utxo_index.subscribe(self.confirm)
+
+    def _key(self, kind: str, name: str) -> str:
+        return f"{self.KEY_PREFIX}:{self.NETWORK_NAME}:{kind}:{name}"
+
+    def _shared(self) -> bool:
+        return self.store is not self.local and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, e: Exception):
+        # Keep serving the workers of this process rather than failing the transaction, and
+        # retry redis a bit later instead of waiting for its timeout on every call
+        self.redis_errors += 1
+        self._redis_down_until = time.monotonic() + self.PENDING_SPENDS_REDIS_RETRY
+        self._fell_back = True
+        logging.warning(f"Pending spends redis store unavailable: {e}")
+
+    def _hand_over(self):
+        """Copy to redis the reservations made in memory while it was unavailable"""
+        if not self._fell_back:
+            return
+        with self._lock:
+            if not self._fell_back:
+                return
+            values, members = self.local.snapshot()
+            for key, value, ttl in values:
+                if not self.store.claim(key, value, ttl) and self.store.get_many([key])[0] != value:
+                    logging.warning(f"Pending spend {key} was reserved by another worker while redis was down")
+            for key, member, ttl in members:
+                self.store.add_member(key, member, ttl)
+            self.local.clear()
+            self._fell_back = False
+
+    def _call(self, operation: str, *args) -> Any:
+        if self._shared():
+            try:
+                self._hand_over()
+                return getattr(self.store, operation)(*args)
+            except redis.RedisError as e:
+                self._redis_failed(e)
+        return getattr(self.local, operation)(*args)
+
+    def reserve(self, tx: Transaction) -> str:
+        """Reserve the inputs of the transaction, or raise SpendConflictError if any is taken"""
+        tx_id = tx.transaction_body.hash().hex()
+        ttl = self.PENDING_SPENDS_TTL
+        inputs = [f"{i.transaction_id.payload.hex()}#{i.index}" for i in tx.transaction_body.inputs]
+        claimed = []
+        for ref in inputs:
+            key = self._key("input", ref)
+            if not self._call("claim", key, tx_id, ttl):
+                owner = self._call("get_many", [key])[0]
+                if owner == tx_id:
+                    # The same transaction submitted again
+                    continue
+                self._call("delete", claimed)
+                self.conflicts += 1
+                raise SpendConflictError(f"Input {ref} is being spent by transaction {owner}")
+            claimed.append(key)
+
+        outputs = [
+            [index, str(output.address), output.to_cbor_hex()]
+            for index, output in enumerate(tx.transaction_body.outputs)
+        ]
+        self._call("put", self._key("tx", tx_id), json.dumps({"inputs": inputs, "outputs": outputs}), ttl)
+        for address in {output[1] for output in outputs}:
+            self._call("add_member", self._key("address", address), tx_id, ttl)
+        self.reserved += 1
+        return tx_id
+
+    def release(self, tx_id: str) -> bool:
+        record = self._call("get_many", [self._key("tx", tx_id)])[0]
+        if record is None:
+            return False
+        record = json.loads(record)
+        self._call("delete", [self._key("input", ref) for ref in record["inputs"]] + [self._key("tx", tx_id)])
+        for address in {output[1] for output in record["outputs"]}:
+            self._call("remove_member", self._key("address", address), tx_id)
+        return True
+
+    def confirm(self, changes: BlockChanges, tx_ids: list[str]):
+        """Release the transactions of a block, as applied by the local UTxO index"""
+        records = self._call("get_many", [self._key("tx", tx_id) for tx_id in tx_ids])
+        for tx_id, record in zip(tx_ids, records):
+            if record is not None and self.release(tx_id):
+                self.confirmed += 1
+                logging.info(f"Pending spend {tx_id} confirmed in slot {changes.slot}")
+
+    def spendable(self, address: str, utxos: Iterable[UTxO]) -> list[UTxO]:
+        """UTxOs of the address not reserved by an in-flight transaction, plus its pending outputs"""
+        address = str(address)
+        candidates = {utxo_ref(utxo): utxo for utxo in utxos}
+        seen = set(candidates)
+
+        tx_ids = sorted(self._call("members", self._key("address", address)))
+        records = self._call("get_many", [self._key("tx", tx_id) for tx_id in tx_ids])
+        for tx_id, record in zip(tx_ids, records):
+            if record is None:
+                self._call("remove_member", self._key("address", address), tx_id)
+                continue
+            outputs = json.loads(record)["outputs"]
+            if any(f"{tx_id}#{output[0]}" in seen for output in outputs) and self.release(tx_id):
+                # Its outputs are on chain: confirmed, whether or not the index saw the block
+                self.confirmed += 1
+                continue
+            for index, output_address, output_cbor in outputs:
+                ref = f"{tx_id}#{index}"
+                if output_address == address and ref not in seen:
+                    candidates[ref] = UTxO(
+                        TransactionInput.from_primitive([tx_id, index]),
+                        TransactionOutput.from_cbor(output_cbor),
+                    )
+
+        refs = list(candidates)
+        owners = self._call("get_many", [self._key("input", ref) for ref in refs])
+        spendable = [candidates[ref] for ref, owner in zip(refs, owners) if owner is None]
+        self.chained += sum(1 for ref, owner in zip(refs, owners) if owner is None and ref not in seen)
+        return spendable
+
+    def context(self, chain_context: ChainContext) -> "PendingSpendsContext":
+        if isinstance(chain_context, IndexedChainContext):
+            chain_context = chain_context.context
+        return PendingSpendsContext(chain_context, self)
+
+    def submit(self, chain_context: ChainContext, tx: Transaction) -> str:
+        """Reserve the inputs, submit the transaction and release them if the submission fails"""
+        tx_id = self.reserve(tx)
+        try:
+            chain_context.submit_tx(tx)
+        except Exception:
+            self.release(tx_id)
+            self.released += 1
+            raise
+        return tx_id
+
+    def build_and_submit(
+        self,
+        chain_context: ChainContext,
+        builder: TransactionBuilder,
+        signing_keys: list[Union[SigningKey, ExtendedSigningKey]],
+        change_address: Address,
+    ) -> str:
+        """Build, sign and submit the transaction of the builder, returning its id.
+
+        When another builder reserved a UTxO picked by coin selection in the meantime, the
+        transaction is built again on the UTxOs left, up to PENDING_SPENDS_REBUILDS times.
+        A conflict on an input added explicitly to the builder is raised as is.
+        """
+        explicit = list(builder.inputs)
+        explicit_keys = [self._key("input", utxo_ref(utxo)) for utxo in explicit]
+        for attempt in range(self.PENDING_SPENDS_REBUILDS + 1):
+            signed_tx = builder.build_and_sign(signing_keys, change_address=change_address)
+            try:
+                return self.submit(chain_context, signed_tx)
+            except SpendConflictError:
+                if attempt == self.PENDING_SPENDS_REBUILDS or any(self._call("get_many", explicit_keys)):
+                    raise
+                self.rebuilt += 1
+                builder.inputs[:] = explicit
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "redis_enabled": self.PENDING_SPENDS_REDIS,
+            "store": "redis" if self._shared() else "local",
+            "reserved": self.reserved,
+            "released_on_failure": self.released,
+            "confirmed": self.confirmed,
+            "conflicts": self.conflicts,
+            "chained_outputs_offered": self.chained,
+            "rebuilt_on_conflict": self.rebuilt,
+            "redis_errors": self.redis_errors,
+        }
+
+
+class PendingSpendsContext(IndexedChainContext):
+    """Chain context whose utxos() leave out the inputs of in-flight transactions"""
+
+    def __init__(self, context: ChainContext, spends: PendingSpends):
+        super().__init__(context)
+        self.spends = spends
+
+    def _utxos(self, address: str) -> list[UTxO]:
+        return self.spends.spendable(address, super()._utxos(address))
+
+
+pending_spends = PendingSpends()
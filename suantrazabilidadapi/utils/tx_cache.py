@@ -0,0 +1,198 @@
+import logging
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Optional
+
+import cbor2
+
+from suantrazabilidadapi.utils.cache import TTLCache
+from suantrazabilidadapi.utils.generic import Constants
+from suantrazabilidadapi.utils.utxo_index import local_utxo_index
+
+# Blockfrost payloads cached per transaction
+TX_KINDS = ("utxos", "transaction", "metadata")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tx_payloads (
+    tx_hash TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (tx_hash, kind)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tx_payloads_accessed ON tx_payloads (accessed);
+"""
+
+
+def encode(payload: Any) -> bytes:
+    return zlib.compress(cbor2.dumps(payload))
+
+
+def decode(blob: bytes) -> Any:
+    return cbor2.loads(zlib.decompress(blob))
+
+
+@dataclass()
+class TxCache(Constants):
+    """Disk cache of the Blockfrost payloads of confirmed transactions, keyed by tx hash.
+
+    The utxos, details and metadata of a transaction never change once it is TX_CACHE_CONFIRMATIONS
+    blocks deep, so they are kept in a SQLite file shared by the processes of the host, stored as
+    compressed cbor. The file is capped at TX_CACHE_MAX_BYTES of payloads, evicting the least
+    recently read transactions first.
+    """
+
+    path: Optional[pathlib.Path] = None
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = os.getpid()
+        self._bytes = 0
+        self._tip = TTLCache(maxsize=1, ttl=self.TX_CACHE_TIP_TTL)
+        self.path = pathlib.Path(self.path or self.PROJECT_ROOT.joinpath(self.TX_CACHE_PATH))
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.skipped = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            # Forked child: sqlite connections must not cross processes
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM tx_payloads").fetchone()[0]
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def tip_height(self, latest: Callable[[], Optional[int]]) -> Optional[int]:
+        """Height of the chain tip, from the local index when it follows the chain, else ``latest()``"""
+        tip = local_utxo_index.tip
+        if tip is not None and tip[2] is not None:
+            return tip[2]
+        height = self._tip.get("height")
+        if height is None:
+            height = latest()
+            if height is not None:
+                self._tip.set("height", height)
+        return height
+
+    def immutable(self, block_height: Optional[int], tip_height: Optional[int]) -> bool:
+        if block_height is None or tip_height is None:
+            return False
+        return tip_height - block_height >= self.TX_CACHE_CONFIRMATIONS
+
+    def get(self, tx_hash: str, kinds: Iterable[str] = TX_KINDS) -> dict[str, Any]:
+        """Cached payloads of the transaction, by kind; missing kinds are left out"""
+        kinds = list(kinds)
+        if not self.TX_CACHE_ENABLED or not kinds:
+            return {}
+        try:
+            with self._lock:
+                conn = self._connect()
+                placeholders = ",".join("?" * len(kinds))
+                rows = conn.execute(
+                    f"SELECT kind, payload FROM tx_payloads WHERE tx_hash = ? AND kind IN ({placeholders})",
+                    (tx_hash, *kinds),
+                ).fetchall()
+                if rows:
+                    conn.execute(
+                        "UPDATE tx_payloads SET accessed = ? WHERE tx_hash = ?", (time.time(), tx_hash)
+                    )
+            payloads = {kind: decode(blob) for kind, blob in rows}
+        except (sqlite3.Error, OSError, ValueError, zlib.error) as e:
+            self.errors += 1
+            logging.warning(f"Transaction cache read of {tx_hash} failed: {e}")
+            return {}
+        self.hits += len(payloads)
+        self.misses += len(kinds) - len(payloads)
+        return payloads
+
+    def put(
+        self,
+        tx_hash: str,
+        payloads: dict[str, Any],
+        block_height: Optional[int],
+        tip_height: Optional[int],
+    ) -> bool:
+        """Store the payloads if the transaction is deep enough to never change"""
+        if not self.TX_CACHE_ENABLED or not payloads:
+            return False
+        if not self.immutable(block_height, tip_height):
+            self.skipped += 1
+            return False
+        now = time.time()
+        rows = []
+        for kind, payload in payloads.items():
+            blob = encode(payload)
+            rows.append((tx_hash, kind, blob, len(blob), now))
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    for row in rows:
+                        previous = conn.execute(
+                            "SELECT size FROM tx_payloads WHERE tx_hash = ? AND kind = ?", row[:2]
+                        ).fetchone()
+                        conn.execute("INSERT OR REPLACE INTO tx_payloads VALUES (?, ?, ?, ?, ?)", row)
+                        self._bytes += row[3] - (previous[0] if previous else 0)
+                if self._bytes > self.TX_CACHE_MAX_BYTES:
+                    self._evict(conn)
+        except sqlite3.Error as e:
+            self.errors += 1
+            logging.warning(f"Transaction cache write of {tx_hash} failed: {e}")
+            return False
+        self.stored += 1
+        return True
+
+    def _evict(self, conn: sqlite3.Connection):
+        # Other processes write to the same file, so the size is recounted before evicting
+        self._bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM tx_payloads").fetchone()[0]
+        target = int(self.TX_CACHE_MAX_BYTES * 0.9)
+        if self._bytes <= self.TX_CACHE_MAX_BYTES:
+            return
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for tx_hash, size in conn.execute(
+                "SELECT tx_hash, SUM(size) FROM tx_payloads GROUP BY tx_hash ORDER BY MAX(accessed)"
+            ).fetchall():
+                if self._bytes <= target:
+                    break
+                conn.execute("DELETE FROM tx_payloads WHERE tx_hash = ?", (tx_hash,))
+                self._bytes -= size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM tx_payloads")
+            self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.TX_CACHE_ENABLED,
+            "bytes": self._bytes,
+            "max_bytes": self.TX_CACHE_MAX_BYTES,
+            "confirmations": self.TX_CACHE_CONFIRMATIONS,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stored": self.stored,
+            "skipped": self.skipped,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+
+confirmed_txs = TxCache()
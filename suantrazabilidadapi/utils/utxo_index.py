@@ -0,0 +1,375 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+
+from ogmios.client import Client as OgmiosClient
+from ogmios.datatypes import Address as OgmiosAddress
+from ogmios.datatypes import Direction, Point
+from pycardano import (
+    Address,
+    Asset,
+    AssetName,
+    DatumHash,
+    MultiAsset,
+    NativeScript,
+    PlutusV1Script,
+    PlutusV2Script,
+    PlutusV3Script,
+    RawCBOR,
+    ScriptHash,
+    TransactionInput,
+    TransactionOutput,
+    UTxO,
+    Value,
+)
+
+from suantrazabilidadapi.utils.generic import Constants
+from suantrazabilidadapi.utils.response import Response
+
+# Output reference: (transaction id, output index)
+OutputRef = tuple[str, int]
+
+PLUTUS_SCRIPTS = {"plutus:v1": PlutusV1Script, "plutus:v2": PlutusV2Script, "plutus:v3": PlutusV3Script}
+
+
+def utxo_from_output(tx_id: str, index: int, output: dict) -> UTxO:
+    """Build the pycardano UTxO of an output as Ogmios v6 serializes it in blocks and ledger queries"""
+    script = output.get("script")
+    if script:
+        if script["language"] in PLUTUS_SCRIPTS:
+            script = PLUTUS_SCRIPTS[script["language"]](bytes.fromhex(script["cbor"]))
+        else:
+            script = NativeScript.from_cbor(script["cbor"])
+
+    datum_hash = DatumHash.from_primitive(output["datumHash"]) if output.get("datumHash") else None
+    datum = RawCBOR(bytes.fromhex(output["datum"])) if output.get("datum") else None
+
+    value = output["value"]
+    lovelace = value.get("ada", {}).get("lovelace", 0)
+    multi_asset = MultiAsset()
+    for policy_id, tokens in value.items():
+        if policy_id == "ada":
+            continue
+        asset = multi_asset.setdefault(ScriptHash.from_primitive(policy_id), Asset())
+        for token_name, quantity in tokens.items():
+            asset[AssetName.from_primitive(token_name)] = quantity
+
+    tx_out = TransactionOutput(
+        Address.from_primitive(output["address"]),
+        amount=Value(lovelace, multi_asset) if multi_asset else lovelace,
+        datum_hash=datum_hash,
+        datum=datum,
+        script=script,
+    )
+    return UTxO(TransactionInput.from_primitive([tx_id, index]), tx_out)
+
+
+def transaction_effects(tx: dict) -> tuple[list[OutputRef], list[tuple[int, dict]]]:
+    """Inputs consumed and outputs created by a transaction of a block.
+
+    A transaction whose scripts failed only consumes its collaterals and creates its collateral
+    return, placed right after the regular outputs.
+    """
+    if tx.get("spends", "inputs") == "collaterals":
+        spent = tx.get("collaterals") or []
+        produced = []
+        if tx.get("collateralReturn"):
+            produced.append((len(tx.get("outputs") or []), tx["collateralReturn"]))
+    else:
+        spent = tx.get("inputs") or []
+        produced = list(enumerate(tx.get("outputs") or []))
+    return [(i["transaction"]["id"], i["index"]) for i in spent], produced
+
+
+def minted_policies(tx: dict) -> list[str]:
+    """Policy ids minted or burned by a transaction of a block; a failed transaction mints nothing"""
+    if tx.get("spends", "inputs") == "collaterals":
+        return []
+    return list(tx.get("mint") or {})
+
+
+@dataclass()
+class BlockChanges:
+    """UTxOs of the tracked addresses created and consumed by a block, to undo it on rollback,
+    and the policies minted or burned in it"""
+
+    slot: int
+    id: str
+    height: Optional[int] = None
+    produced: list[tuple[str, OutputRef]] = field(default_factory=list)
+    spent: list[tuple[str, UTxO]] = field(default_factory=list)
+    minted: set[str] = field(default_factory=set)
+
+
+@dataclass()
+class UtxoIndex(Constants):
+    """UTxO sets of the core wallet, oracle wallets and contracts, kept in memory by following
+    the chain with Ogmios chain-sync.
+
+    The follower intersects the chain at the current tip, seeds the addresses with a ledger
+    query and then applies every block after it. Applying a block is idempotent, so outputs
+    already present in the seed are not duplicated. The changes of the last
+    UTXO_INDEX_ROLLBACK_DEPTH blocks are kept to undo them on rollback; a deeper rollback (or a
+    lost connection) seeds the addresses again. Until an address is seeded, utxos() returns
+    None and callers query the chain backend as before.
+    """
+
+    def __post_init__(self):
+        self._lock = threading.RLock()
+        self._addresses: dict[str, dict[OutputRef, UTxO]] = {}
+        self._owners: dict[OutputRef, str] = {}
+        self._pending: set[str] = set()
+        self._undo: deque[BlockChanges] = deque(maxlen=self.UTXO_INDEX_ROLLBACK_DEPTH)
+        self._base: Optional[tuple[int, str]] = None
+        self.tip: Optional[tuple[int, str, Optional[int]]] = None
+        self.ready = False
+        self.last_block_at: Optional[float] = None
+        self.hits = 0
+        self.misses = 0
+        self.blocks = 0
+        self.rollbacks = 0
+        self.syncs = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[OgmiosClient] = None
+        self._discovery: Optional[asyncio.Task] = None
+        self._subscribers: list[Callable[[BlockChanges, list[str]], None]] = []
+
+    # Index
+
+    def subscribe(self, callback: Callable[[BlockChanges, list[str]], None]):
+        """Call back with the changes and the transaction ids of every block applied by the follower"""
+        self._subscribers.append(callback)
+
+    def register(self, addresses: Iterable[str]):
+        """Follow the addresses; they are seeded by the follower before the next block"""
+        with self._lock:
+            for address in addresses:
+                if address and address not in self._addresses:
+                    self._pending.add(str(address))
+
+    def tracked(self, address: str) -> bool:
+        return str(address) in self._addresses
+
+    def seed(self, address: str, utxos: Iterable[UTxO]):
+        """Replace the UTxO set of the address with the ledger's"""
+        address = str(address)
+        with self._lock:
+            for ref in self._addresses.get(address, {}):
+                self._owners.pop(ref, None)
+            entries = {(utxo.input.transaction_id.payload.hex(), utxo.input.index): utxo for utxo in utxos}
+            self._addresses[address] = entries
+            for ref in entries:
+                self._owners[ref] = address
+            self._pending.discard(address)
+
+    def utxos(self, address: str) -> Optional[list[UTxO]]:
+        """UTxOs of a tracked address, or None when the index cannot answer for it"""
+        with self._lock:
+            entries = self._addresses.get(str(address)) if self.ready else None
+            if entries is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return list(entries.values())
+
+    def utxo(self, tx_id: str, index: int) -> Optional[UTxO]:
+        """UTxO of a tracked address by output reference, without counting a hit or miss"""
+        with self._lock:
+            address = self._owners.get((tx_id, index))
+            if address is None or not self.ready:
+                return None
+            return self._addresses[address].get((tx_id, index))
+
+    def reset(self, base: Optional[tuple[int, str]] = None):
+        """Forget every UTxO set; the addresses are seeded again from the given intersection"""
+        with self._lock:
+            self._pending.update(self._addresses)
+            self._addresses = {}
+            self._owners = {}
+            self._undo.clear()
+            self._base = base
+            self.tip = (base[0], base[1], None) if base else None
+
+    def apply_block(self, slot: int, block_id: str, transactions: Iterable[dict], height: Optional[int] = None):
+        changes = BlockChanges(slot, block_id, height)
+        tx_ids = []
+        with self._lock:
+            for tx in transactions:
+                tx_ids.append(tx["id"])
+                changes.minted.update(minted_policies(tx))
+                spent, produced = transaction_effects(tx)
+                for ref in spent:
+                    address = self._owners.pop(ref, None)
+                    if address is not None:
+                        changes.spent.append((address, self._addresses[address].pop(ref)))
+                for index, output in produced:
+                    entries = self._addresses.get(output["address"])
+                    ref = (tx["id"], index)
+                    if entries is not None and ref not in entries:
+                        entries[ref] = utxo_from_output(tx["id"], index, output)
+                        self._owners[ref] = output["address"]
+                        changes.produced.append((output["address"], ref))
+            self._undo.append(changes)
+            self.tip = (slot, block_id, height)
+            self.blocks += 1
+            self.last_block_at = time.time()
+        for callback in self._subscribers:
+            try:
+                callback(changes, tx_ids)
+            except Exception as e:  # pylint: disable=broad-except
+                logging.error(f"UTxO index subscriber failed on block {slot}: {e}")
+
+    def rollback(self, slot: int, block_id: str) -> bool:
+        """Undo the blocks after the point; False when the point is older than the kept changes"""
+        with self._lock:
+            known = self._base == (slot, block_id) or any(
+                changes.slot == slot and changes.id == block_id for changes in self._undo
+            )
+            if not known:
+                return False
+            undone = 0
+            while self._undo and self._undo[-1].slot > slot:
+                changes = self._undo.pop()
+                undone += 1
+                for address, ref in changes.produced:
+                    self._owners.pop(ref, None)
+                    self._addresses.get(address, {}).pop(ref, None)
+                for address, utxo in changes.spent:
+                    ref = (utxo.input.transaction_id.payload.hex(), utxo.input.index)
+                    if address in self._addresses:
+                        self._addresses[address][ref] = utxo
+                        self._owners[ref] = address
+            self.tip = (slot, block_id, None)
+            if undone:
+                self.rollbacks += 1
+            return True
+
+    # Chain-sync follower
+
+    def _seed_pending(self, client: OgmiosClient):
+        with self._lock:
+            pending = list(self._pending)
+        for address in pending:
+            results, _ = client.query_utxo.execute([OgmiosAddress(address)])
+            self.seed(
+                address,
+                [
+                    utxo_from_output(
+                        r.tx_id,
+                        r.index,
+                        {
+                            "address": r.address,
+                            "value": r.value,
+                            "datumHash": r.datum_hash,
+                            "datum": r.datum,
+                            "script": r.script,
+                        },
+                    )
+                    for r in results
+                ],
+            )
+            logging.info(f"UTxO index seeded {address} with {len(results)} utxos")
+
+    def _sync(self, client: OgmiosClient):
+        tip, _ = client.query_network_tip.execute()
+        client.find_intersection.execute([Point(tip.slot, tip.id)])
+        self.reset((tip.slot, tip.id))
+        self.syncs += 1
+        self._seed_pending(client)
+        self.ready = True
+        logging.info(f"UTxO index following the chain from slot {tip.slot}")
+
+        while not self._stop.is_set():
+            direction, _, block, _ = client.next_block.execute()
+            if direction == Direction.forward:
+                if getattr(block, "slot", None) is not None:
+                    self.apply_block(block.slot, block.id, block.transactions or [], block.height)
+            elif not isinstance(block, Point) or not self.rollback(block.slot, block.id):
+                logging.warning("UTxO index rollback deeper than the kept blocks, seeding again")
+                return
+            if self._pending:
+                self._seed_pending(client)
+
+    def _follow(self):
+        delay = self.UTXO_INDEX_RECONNECT
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                with OgmiosClient(self.OGMIOS_URL, self.OGMIOS_PORT, secure=False) as client:
+                    self._client = client
+                    self._sync(client)
+            except Exception as e:  # pylint: disable=broad-except
+                if not self._stop.is_set():
+                    logging.error(f"UTxO index lost the chain-sync connection: {e}")
+            finally:
+                self._client = None
+                self.ready = False
+            # Back off while Ogmios keeps failing, start over quickly after a healthy session
+            delay = self.UTXO_INDEX_RECONNECT if time.monotonic() - started > 60 else min(delay * 2, 300)
+            self._stop.wait(delay)
+
+    async def discover(self, plataforma: Any):
+        """Register the core wallet and the contract addresses stored in Plataforma"""
+        addresses = list(self.UTXO_INDEX_ADDRESSES)
+        try:
+            r = await plataforma.getWallet("getWalletAdmin", {"isAdmin": True})
+            final_response = Response().handle_listWallets_response(listWallets_response=r)
+            if final_response.get("success"):
+                addresses.extend(wallet["address"] for wallet in final_response["data"]["items"])
+
+            async for script in plataforma.iterItems("listScripts", "listScripts"):
+                if script.get("testnetAddr") and script["testnetAddr"] != "na":
+                    addresses.append(script["testnetAddr"])
+        except Exception as e:  # pylint: disable=broad-except
+            logging.error(f"UTxO index could not list the addresses to follow: {e}")
+        self.register(addresses)
+
+    def start(self, plataforma: Any = None):
+        if not self.UTXO_INDEX_ENABLED or self._thread is not None:
+            return
+        if plataforma is not None:
+            self._discovery = asyncio.get_running_loop().create_task(self.discover(plataforma))
+        else:
+            self.register(self.UTXO_INDEX_ADDRESSES)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._follow, name="utxo-index", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        if self._discovery is not None:
+            self._discovery.cancel()
+            self._discovery = None
+        client = self._client
+        if client is not None:
+            # Unblocks the follower waiting for the next block
+            client.connection.close()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "tip_slot": self.tip[0] if self.tip else None,
+                "tip_height": self.tip[2] if self.tip else None,
+                "seconds_since_block": round(time.time() - self.last_block_at, 3) if self.last_block_at else None,
+                "addresses": len(self._addresses),
+                "pending_addresses": len(self._pending),
+                "utxos": len(self._owners),
+                "hits": self.hits,
+                "misses": self.misses,
+                "blocks": self.blocks,
+                "rollbacks": self.rollbacks,
+                "syncs": self.syncs,
+            }
+
+
+local_utxo_index = UtxoIndex()
@@ -0,0 +1,98 @@
+import pytest
+
+from suantrazabilidadapi.utils.history import HistoryCursor, history_lines
+from suantrazabilidadapi.utils.plataforma import CardanoApi
+
+
+class FakeBlockfrost:
+    def __init__(self):
+        # Three transactions per block, blocks 10 to 59
+        self.transactions = [
+            {"tx_hash": f"{height:060x}{index:04x}", "tx_index": index, "block_height": height, "block_time": height}
+            for height in range(10, 60)
+            for index in range(3)
+        ]
+        self.utxos = [{"tx_hash": tx["tx_hash"], "output_index": 0} for tx in self.transactions]
+        self.pages = 0
+
+    @staticmethod
+    def _position(block, default):
+        if block is None:
+            return default
+        height, _, index = block.partition(":")
+        return (int(height), int(index or 0))
+
+    def address_transactions(self, address, from_block=None, to_block=None, count=100, page=1, order="asc", **kwargs):
+        self.pages += 1
+        start = self._position(from_block, (0, 0))
+        end = self._position(to_block, (10**9, 0))
+        if to_block is not None and ":" not in to_block:
+            end = (end[0], 10**9)
+        rows = [tx for tx in self.transactions if start <= (tx["block_height"], tx["tx_index"]) <= end]
+        return rows[(page - 1) * count:page * count]
+
+    def address_utxos(self, address, count=100, page=1, order="asc", **kwargs):
+        self.pages += 1
+        return self.utxos[(page - 1) * count:page * count]
+
+
+@pytest.fixture()
+def blockfrost(monkeypatch):
+    blockfrost = FakeBlockfrost()
+    monkeypatch.setattr(CardanoApi, "BLOCKFROST_API", blockfrost)
+    return blockfrost
+
+
+def test_cursor_round_trip_and_validation():
+    cursor = HistoryCursor("transactions", height=42, index=1)
+
+    assert HistoryCursor.decode(cursor.encode()) == cursor
+    with pytest.raises(ValueError):
+        HistoryCursor.decode("not a cursor")
+    with pytest.raises(ValueError):
+        HistoryCursor.decode(HistoryCursor("utxos", page=0, ref="aa#0").encode())
+
+
+def test_transaction_export_resumes_after_the_cursor(blockfrost):
+    lines = list(history_lines(CardanoApi().iterAddressTransactions("addr_test1", count=40)))
+
+    assert [line["item"] for line in lines[:-1]] == blockfrost.transactions
+    assert lines[-1] == {"done": True, "cursor": lines[-2]["cursor"]}
+    assert blockfrost.pages == 4
+
+    # Interrupted after 50 lines: the resumed export goes on from the next transaction
+    cursor = HistoryCursor.decode(lines[49]["cursor"])
+    resumed = list(history_lines(CardanoApi().iterAddressTransactions("addr_test1", cursor=cursor, count=40), cursor))
+    assert [line["item"] for line in resumed[:-1]] == blockfrost.transactions[50:]
+
+    bounded = CardanoApi().iterAddressTransactions("addr_test1", from_block="20", to_block="21:1", count=40)
+    assert [(tx["block_height"], tx["tx_index"]) for tx, _ in bounded] == [(20, 0), (20, 1), (20, 2), (21, 0), (21, 1)]
+
+
+def test_utxo_export_resumes_within_its_page(blockfrost):
+    rows = list(CardanoApi().iterAddressUtxos("addr_test1", count=40))
+    assert [utxo for utxo, _ in rows] == blockfrost.utxos
+
+    cursor = rows[45][1]
+    assert [utxo for utxo, _ in CardanoApi().iterAddressUtxos("addr_test1", cursor, count=40)] == blockfrost.utxos[46:]
+
+    # UTxOs before the cursor were spent: the cursor moved to the previous page
+    early = rows[41][1]
+    del blockfrost.utxos[:5]
+    resumed = [utxo for utxo, _ in CardanoApi().iterAddressUtxos("addr_test1", early, count=40)]
+    assert resumed == blockfrost.utxos[37:]
+
+    # The UTxO of the cursor was spent: its page and the previous one are sent again
+    del blockfrost.utxos[40]
+    resumed = [utxo for utxo, _ in CardanoApi().iterAddressUtxos("addr_test1", cursor, count=40)]
+    assert resumed == blockfrost.utxos
+
+
+def test_details_come_from_the_transactions_pipeline(blockfrost, monkeypatch):
+    monkeypatch.setattr(
+        CardanoApi, "transactionsDetails", lambda self, transactions: [{"hash": tx["tx_hash"]} for tx in transactions]
+    )
+
+    rows = list(CardanoApi().iterAddressTransactions("addr_test1", to_block="10", details=True))
+
+    assert [item for item, _ in rows] == [{"hash": tx["tx_hash"]} for tx in blockfrost.transactions[:3]]
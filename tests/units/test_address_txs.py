@@ -0,0 +1,93 @@
+import random
+import threading
+import time
+
+from suantrazabilidadapi.utils import plataforma
+from suantrazabilidadapi.utils.plataforma import CardanoApi
+from suantrazabilidadapi.utils.pools import BoundedExecutor
+from suantrazabilidadapi.utils.tx_cache import TxCache
+
+
+class FakeBlockfrost:
+    def __init__(self, tx_hashes):
+        self.tx_hashes = tx_hashes
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def block_latest(self, return_type=None):
+        return {"height": 100}
+
+    def address_transactions(self, **kwargs):
+        return [{"tx_hash": h, "block_height": i, "block_time": 1000 + i} for i, h in enumerate(self.tx_hashes)]
+
+    def _call(self, result):
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(random.uniform(0, 0.01))
+        with self._lock:
+            self.in_flight -= 1
+        return result
+
+    def transaction_utxos(self, tx_hash, return_type=None):
+        return self._call({"hash": tx_hash, "inputs": [], "outputs": []})
+
+    def transaction(self, tx_hash, return_type=None):
+        return self._call({"fees": "170000", "size": len(tx_hash)})
+
+    def transaction_metadata(self, tx_hash, return_type=None):
+        return self._call([{"label": "674", "json_metadata": tx_hash}])
+
+
+def _setup(monkeypatch, tmp_path, tx_hashes):
+    blockfrost = FakeBlockfrost(tx_hashes)
+    monkeypatch.setattr(CardanoApi, "BLOCKFROST_API", blockfrost)
+    monkeypatch.setattr(plataforma, "blockfrost_executor", BoundedExecutor("test-blockfrost", 4))
+    monkeypatch.setattr(plataforma, "confirmed_txs", TxCache(path=tmp_path / "transactions.sqlite3"))
+    return blockfrost
+
+
+def test_transactions_are_fetched_concurrently_within_the_limit_and_in_order(monkeypatch, tmp_path):
+    tx_hashes = [f"{i:064x}" for i in range(12)]
+    blockfrost = _setup(monkeypatch, tmp_path, tx_hashes)
+
+    txs = CardanoApi().getAddressTxs("addr_test1", None, None, 1, len(tx_hashes))
+
+    assert [tx["hash"] for tx in txs] == tx_hashes
+    assert [tx["metadata"][0]["json_metadata"] for tx in txs] == tx_hashes
+    assert [tx["block_height"] for tx in txs] == list(range(len(tx_hashes)))
+    assert 1 < blockfrost.peak <= 4
+    assert plataforma.blockfrost_executor.stats() == {"max_workers": 4, "submitted": 36}
+
+
+def test_confirmed_transactions_are_served_from_disk(monkeypatch, tmp_path):
+    # Heights 0..85 are 15 blocks below the tip at 100, the last 14 may still roll back
+    tx_hashes = [f"{i:064x}" for i in range(100)]
+    _setup(monkeypatch, tmp_path, tx_hashes)
+
+    first = CardanoApi().getAddressTxs("addr_test1", None, None, 1, len(tx_hashes))
+    second = CardanoApi().getAddressTxs("addr_test1", None, None, 1, len(tx_hashes))
+
+    assert second == first
+    assert plataforma.blockfrost_executor.stats()["submitted"] == 300 + 14 * 3
+    assert plataforma.confirmed_txs.stats()["skipped"] == 14 * 2
+    assert CardanoApi().getUtxoInfo(tx_hashes[0]) == {"hash": tx_hashes[0], "inputs": [], "outputs": []}
+    assert plataforma.blockfrost_executor.stats()["submitted"] == 342
+
+
+def test_the_cache_evicts_the_least_recently_read_transactions(tmp_path):
+    cache = TxCache(path=tmp_path / "transactions.sqlite3")
+    cache.TX_CACHE_MAX_BYTES = 3000
+    payload = {
+        "outputs": [{"address": f"addr{i}", "amount": [{"unit": "lovelace", "quantity": str(i)}]} for i in range(40)]
+    }
+    for i in range(20):
+        assert cache.put(f"{i:064x}", {"utxos": payload}, 0, 100)
+        cache.get(f"{0:064x}")
+
+    assert cache.stats()["evictions"] > 0
+    assert cache.stats()["bytes"] <= 3000
+    assert cache.get(f"{0:064x}") == {"utxos": payload}
+    assert cache.get(f"{1:064x}") == {}
+    assert not cache.put(f"{99:064x}", {"utxos": payload}, 95, 100)
@@ -0,0 +1,76 @@
+from pycardano import (
+    Address,
+    MultiAsset,
+    Network,
+    PaymentSigningKey,
+    PaymentVerificationKey,
+    TransactionInput,
+    TransactionOutput,
+    UTxO,
+    Value,
+)
+
+from suantrazabilidadapi.utils.asset_index import AssetIndex
+from suantrazabilidadapi.utils.plataforma import Helpers
+
+POLICY = "b11a367d61a2b8f6a77049a809d7b93c6d44c140678d69276ab77c12"
+OTHER_POLICY = "c11a367d61a2b8f6a77049a809d7b93c6d44c140678d69276ab77c12"
+ADDRESS = Address(
+    PaymentVerificationKey.from_signing_key(PaymentSigningKey.generate()).hash(), network=Network.TESTNET
+)
+
+
+def _utxo(index: int, tokens: dict) -> UTxO:
+    multi_asset = MultiAsset.from_primitive(
+        {bytes.fromhex(policy): {name.encode(): q for name, q in assets.items()} for policy, assets in tokens.items()}
+    )
+    return UTxO(
+        TransactionInput.from_primitive(["aa" * 32, index]),
+        TransactionOutput(ADDRESS, Value(2_000_000, multi_asset)),
+    )
+
+
+UTXOS = [
+    _utxo(0, {POLICY: {"SUAN": 50}}),
+    _utxo(1, {POLICY: {"SUAN": 10, "CO2": 3}}),
+    _utxo(2, {POLICY: {"SUAN": 30}, OTHER_POLICY: {"SUAN": 500}}),
+    UTxO(TransactionInput.from_primitive(["bb" * 32, 0]), TransactionOutput(ADDRESS, 5_000_000)),
+]
+
+
+class Context:
+    def __init__(self):
+        self.calls = 0
+
+    def utxos(self, address):
+        self.calls += 1
+        return UTXOS
+
+
+def test_smallest_utxo_holding_the_quantity():
+    assets = AssetIndex(UTXOS)
+
+    assert assets.first(POLICY, "SUAN", 20).input.index == 2
+    assert assets.first(POLICY, "SUAN", 51) is None
+    assert assets.total(POLICY, "SUAN") == 90
+    assert [u.input.index for u in assets.holding(POLICY, "CO2")] == [1]
+
+
+def test_cover_uses_the_fewest_utxos():
+    assets = AssetIndex(UTXOS)
+
+    assert [u.input.index for u in assets.cover(POLICY, "SUAN", 25)] == [2]
+    assert [u.input.index for u in assets.cover(POLICY, "SUAN", 75)] == [0, 2]
+    assert assets.cover(POLICY, "SUAN", 91) == []
+    multi_asset = Helpers().build_multiAsset(POLICY, {"SUAN": 60, "CO2": 2})
+    assert {u.input.index for u in assets.cover_all(multi_asset)} == {0, 1, 2}
+
+
+def test_find_utxos_with_tokens_fetches_the_address_once():
+    context = Context()
+    multi_asset = Helpers().build_multiAsset(POLICY, {"SUAN": 40, "CO2": 1})
+
+    utxo = Helpers().find_utxos_with_tokens(context, ADDRESS, multi_asset)
+
+    assert utxo.input.index == 1
+    assert context.calls == 1
@@ -0,0 +1,86 @@
+import asyncio
+
+from suantrazabilidadapi.utils import plataforma
+from suantrazabilidadapi.utils.asset_cache import PolicyAssetCache
+from suantrazabilidadapi.utils.plataforma import CardanoApi
+from suantrazabilidadapi.utils.pools import BoundedExecutor
+from suantrazabilidadapi.utils.response import iterate_in_thread
+from suantrazabilidadapi.utils.utxo_index import BlockChanges, minted_policies
+
+POLICY = "b11a367d61a2b8f6a77049a809d7b93c6d44c140678d69276ab77c12"
+
+
+class FakeBlockfrost:
+    def __init__(self, size):
+        self.units = [POLICY + f"{i:04x}" for i in range(size)]
+        self.calls = []
+
+    def assets_policy(self, policy_id, return_type=None, count=100, page=1):
+        self.calls.append(("assets_policy", page))
+        return [{"asset": unit, "quantity": "1"} for unit in self.units[(page - 1) * count:page * count]]
+
+    def asset(self, unit, return_type=None):
+        self.calls.append(("asset", unit))
+        return {"asset": unit, "policy_id": unit[:56], "quantity": "1"}
+
+
+def _setup(monkeypatch, size):
+    blockfrost = FakeBlockfrost(size)
+    monkeypatch.setattr(CardanoApi, "BLOCKFROST_API", blockfrost)
+    monkeypatch.setattr(plataforma, "blockfrost_executor", BoundedExecutor("test-blockfrost", 4))
+    monkeypatch.setattr(plataforma, "policy_assets", PolicyAssetCache())
+    return blockfrost
+
+
+def test_every_page_is_listed_and_details_are_cached_until_a_mint(monkeypatch):
+    blockfrost = _setup(monkeypatch, 250)
+
+    assets = CardanoApi().assetInfo(POLICY)
+
+    assert [asset["asset"] for asset in assets] == blockfrost.units
+    assert [call for call in blockfrost.calls if call[0] == "assets_policy"] == [
+        ("assets_policy", 1),
+        ("assets_policy", 2),
+        ("assets_policy", 3),
+    ]
+    calls = len(blockfrost.calls)
+    assert CardanoApi().assetInfo(POLICY) == assets
+    assert len(blockfrost.calls) == calls
+
+    plataforma.policy_assets.on_block(BlockChanges(1, "block", minted={POLICY}), ["tx"])
+    assert CardanoApi().assetInfo(POLICY) == assets
+    assert len(blockfrost.calls) == 2 * calls
+    assert plataforma.policy_assets.invalidations == 1
+
+
+def test_assets_stream_in_listing_order(monkeypatch):
+    blockfrost = _setup(monkeypatch, 120)
+
+    async def collect():
+        return [asset async for asset in iterate_in_thread(CardanoApi().iterAssetInfo(POLICY))]
+
+    assert [asset["asset"] for asset in asyncio.run(collect())] == blockfrost.units
+
+
+def test_failed_transactions_mint_nothing():
+    tx = {"id": "aa" * 32, "mint": {POLICY: {"5355414e": 10}}}
+
+    assert minted_policies(tx) == [POLICY]
+    assert minted_policies({**tx, "spends": "collaterals"}) == []
+
+
+def test_cache_is_flushed_when_the_index_stops_following(monkeypatch):
+    blockfrost = _setup(monkeypatch, 10)
+    cache = plataforma.policy_assets
+    monkeypatch.setattr("suantrazabilidadapi.utils.asset_cache.local_utxo_index.ready", True)
+    monkeypatch.setattr("suantrazabilidadapi.utils.asset_cache.local_utxo_index.syncs", 1)
+
+    assets = CardanoApi().assetInfo(POLICY)
+    calls = len(blockfrost.calls)
+    assert CardanoApi().assetInfo(POLICY) == assets and len(blockfrost.calls) == calls
+
+    # Synced again: mints in between went unnoticed
+    monkeypatch.setattr("suantrazabilidadapi.utils.asset_cache.local_utxo_index.syncs", 2)
+    assert CardanoApi().assetInfo(POLICY) == assets
+    assert len(blockfrost.calls) == 2 * calls
+    assert cache.flushes == 1
@@ -0,0 +1,90 @@
+import time
+
+from suantrazabilidadapi.utils.cache import TTLCache, WalletCache
+
+
+def _wallet_response(wallet_id: str) -> dict:
+    return {"success": True, "data": {"data": {"getWallet": {"id": wallet_id, "address": "addr_test1"}}}}
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_cache_expires_per_key():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("short", 1, ttl=0.01)
+    cache.set("long", 2)
+    time.sleep(0.02)
+
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+    assert cache.stats()["expirations"] == 1
+
+
+def test_wallet_cache_only_keeps_found_wallets():
+    cache = WalletCache()
+    key = cache.key("getWalletById", {"walletId": "w1"})
+
+    cache.set(key, {"success": True, "data": {"data": {"getWallet": None}}})
+    assert cache.get(key) is None
+    cache.set(key, {"success": False, "error": "timeout"})
+    assert cache.get(key) is None
+
+    cache.set(key, _wallet_response("w1"))
+    cached = cache.get(key)
+    assert cached == _wallet_response("w1")
+    cached["data"]["data"]["getWallet"]["id"] = "changed"
+    assert cache.get(key) == _wallet_response("w1")
+
+    assert cache.key("listWallets", {}) is None
+
+
+def test_wallet_cache_invalidated_on_create():
+    cache = WalletCache()
+    by_id = cache.key("getWalletById", {"walletId": "w1"})
+    admin = cache.key("getWalletAdmin", {"isAdmin": True})
+    other = cache.key("getWalletById", {"walletId": "w2"})
+    admin_response = {"success": True, "data": {"data": {"listWallets": {"items": [{"id": "w0"}]}}}}
+    cache.set(by_id, _wallet_response("w1"))
+    cache.set(admin, admin_response)
+    cache.set(other, _wallet_response("w2"))
+
+    cache.invalidate({"id": "w1", "address": "addr_test1"})
+
+    assert cache.get(by_id) is None
+    assert cache.get(admin) is None
+    assert cache.get(other) == _wallet_response("w2")
+
+
+def test_seeds_are_not_written_to_redis():
+    class Redis:
+        def __init__(self):
+            self.values = {}
+
+        def set(self, key, value, ex=None):
+            self.values[key] = value
+
+    store = Redis()
+    cache = WalletCache()
+    cache.WALLET_CACHE_REDIS = True
+    cache._redis = lambda: store
+    with_seed = _wallet_response("w1")
+    with_seed["data"]["data"]["getWallet"]["seed"] = "encrypted seed"
+
+    cache.set(cache.key("getWalletById", {"walletId": "w1"}), with_seed)
+    cache.set(cache.key("getWalletById", {"walletId": "w2"}), _wallet_response("w2"))
+
+    assert list(store.values) == [cache.key("getWalletById", {"walletId": "w2"})]
+    assert cache.get(cache.key("getWalletById", {"walletId": "w1"})) == with_seed
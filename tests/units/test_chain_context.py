@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from suantrazabilidadapi.utils.blockchain import CardanoNetwork, ChainContextManager, chain_contexts
+from suantrazabilidadapi.utils.health import backend_monitor
+
+
+@pytest.fixture()
+def manager(monkeypatch):
+    manager = ChainContextManager()
+    created = []
+
+    def create(backend):
+        created.append(backend)
+        return object()
+
+    monkeypatch.setattr(manager, "_create", create)
+    return manager, created
+
+
+def test_context_created_once_per_backend(manager):
+    manager, created = manager
+
+    ogmios = manager.get("ogmios")
+    assert manager.get("ogmios") is ogmios
+    assert manager.get("blockfrost") is not ogmios
+    assert created == ["ogmios", "blockfrost"]
+    assert manager.stats()["ogmios"] == {"active": True, "created": 1, "reused": 1}
+
+
+def test_concurrent_requests_share_one_context(manager):
+    manager, created = manager
+    contexts = []
+    threads = [threading.Thread(target=lambda: contexts.append(manager.get("ogmios"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert created == ["ogmios"]
+    assert all(context is contexts[0] for context in contexts)
+
+
+def test_reset_and_fork_create_a_new_context(manager):
+    manager, created = manager
+    first = manager.get("ogmios")
+    manager.reset("ogmios")
+    second = manager.get("ogmios")
+    manager._pid = -1  # pylint: disable=protected-access
+    third = manager.get("ogmios")
+
+    assert len({id(first), id(second), id(third)}) == 3
+    assert created == ["ogmios"] * 3
+
+
+def test_get_chain_context_uses_the_shared_manager(monkeypatch):
+    shared = object()
+    monkeypatch.setattr(backend_monitor, "current", "ogmios")
+    monkeypatch.setattr(chain_contexts, "get", lambda backend: shared if backend == "ogmios" else None)
+
+    assert CardanoNetwork().get_chain_context() is shared
@@ -0,0 +1,65 @@
+import asyncio
+
+from suantrazabilidadapi.utils.dataloader import PlataformaLoader
+from suantrazabilidadapi.utils.graphql_documents import MAIN_DOCUMENTS, compose_batch
+from suantrazabilidadapi.utils.plataforma import AsyncPlataforma
+
+
+def test_compose_batch_aliases_fields_and_variables():
+    document, variables, aliases = compose_batch(
+        [
+            (MAIN_DOCUMENTS.get("getWalletById"), {"walletId": "w1"}),
+            (MAIN_DOCUMENTS.get("getScriptById"), {"id": "s1"}),
+        ]
+    )
+
+    assert document.startswith("query batch($b0_walletId:ID! $b1_id:ID!){b0_getWallet:getWallet(id:$b0_walletId){")
+    assert "b1_getScript:getScript(id:$b1_id){" in document
+    assert variables == {"b0_walletId": "w1", "b1_id": "s1"}
+    assert aliases == [{"b0_getWallet": "getWallet"}, {"b1_getScript": "getScript"}]
+
+
+def test_loader_batches_and_dedupes_same_tick(monkeypatch):
+    sent = []
+
+    async def post_document(self, document, operation_name, graphql_variables=None, application=""):
+        sent.append((document, graphql_variables))
+        data = {
+            f"b{index}_getScript": {"id": value} for index, value in enumerate(graphql_variables.values())
+        }
+        return {"success": True, "data": {"data": data}}
+
+    monkeypatch.setattr(AsyncPlataforma, "postDocument", post_document)
+
+    async def run():
+        loader = PlataformaLoader()
+        return await asyncio.gather(
+            loader.getScript("getScriptById", {"id": "s1"}),
+            loader.getScript("getScriptById", {"id": "s2"}),
+            loader.getScript("getScriptById", {"id": "s1"}),
+        )
+
+    first, second, repeated = asyncio.run(run())
+
+    assert len(sent) == 1
+    assert sent[0][1] == {"b0_id": "s1", "b1_id": "s2"}
+    assert first == {"success": True, "data": {"data": {"getScript": {"id": "s1"}}}}
+    assert second["data"]["data"]["getScript"] == {"id": "s2"}
+    assert repeated == first
+    assert repeated is not first
+
+
+def test_split_keeps_errors_of_each_query():
+    data = {
+        "data": {"b0_getWallet": None, "b1_getWallet": {"id": "w2"}},
+        "errors": [{"message": "Not authorized", "path": ["b0_getWallet"]}],
+    }
+
+    failed = PlataformaLoader._split(data, {"b0_getWallet": "getWallet"})
+    found = PlataformaLoader._split(data, {"b1_getWallet": "getWallet"})
+
+    assert failed["data"] == {
+        "data": {"getWallet": None},
+        "errors": [{"message": "Not authorized", "path": ["getWallet"]}],
+    }
+    assert found["data"] == {"data": {"getWallet": {"id": "w2"}}}
@@ -0,0 +1,77 @@
+import pytest
+
+from suantrazabilidadapi.utils.graphql_documents import (
+    MAIN_DOCUMENTS,
+    ORACLE_DOCUMENTS,
+    GraphqlDocuments,
+    parse_operations,
+)
+
+SOURCE = """
+# Comment with { braces }
+query getThing($id: ID!, $filter: ThingFilterInput) {
+  getThing(id: $id, filter: $filter) {
+    ...thingFields
+  }
+}
+
+fragment thingFields on Thing {
+  id
+  name
+  ...ownerFields
+}
+
+fragment ownerFields on Owner {
+  owner
+}
+
+mutation createThing($input: CreateThingInput!) {
+  createThing(input: $input) { id note(text: "a , # {b}") }
+}
+"""
+
+
+def test_parse_operations_splits_minimal_documents():
+    operations = parse_operations(SOURCE)
+
+    assert set(operations) == {"getThing", "createThing"}
+    query = operations["getThing"]
+    assert query.kind == "query"
+    assert not query.is_mutation
+    assert query.document.startswith("query getThing($id:ID!$filter:ThingFilterInput){")
+    assert "fragment ownerFields on Owner{owner}" in query.document
+    assert "fragment thingFields on Thing{" in query.document
+    assert "Comment" not in query.document
+
+    mutation = operations["createThing"]
+    assert mutation.is_mutation
+    assert "fragment" not in mutation.document
+    assert 'note(text:"a , # {b}")' in mutation.document
+
+
+def test_payload_with_persisted_queries():
+    documents = GraphqlDocuments(path=MAIN_DOCUMENTS.path, operations=parse_operations(SOURCE))
+    operation = documents.get("getThing")
+
+    payload = documents.payload("getThing", {"id": "1"})
+    assert payload == {"operationName": "getThing", "variables": {"id": "1"}, "query": operation.document}
+
+    payload = documents.payload("getThing", {"id": "1"}, persisted=True)
+    assert payload["query"] == operation.document
+    assert payload["extensions"]["persistedQuery"]["sha256Hash"] == operation.sha256
+
+    documents.mark_persisted("getThing")
+    assert "query" not in documents.payload("getThing", {"id": "1"}, persisted=True)
+    assert "query" in documents.payload("getThing", {"id": "1"}, persisted=True, force_document=True)
+
+    assert documents.persisted_query_not_found({"errors": [{"message": "PersistedQueryNotFound"}]})
+    assert not documents.persisted_query_not_found({"data": {"getThing": None}})
+
+    with pytest.raises(KeyError):
+        documents.get("missing")
+
+
+def test_project_documents_are_loaded():
+    assert "getWalletById" in MAIN_DOCUMENTS
+    assert MAIN_DOCUMENTS.get("WalletMutation").is_mutation
+    assert len(ORACLE_DOCUMENTS.operations) > 0
@@ -0,0 +1,86 @@
+import asyncio
+import os
+
+import httpx
+
+from suantrazabilidadapi.utils.health import BackendMonitor
+
+
+def _monitor(preferred="ogmios", **overrides) -> BackendMonitor:
+    monitor = BackendMonitor(preferred=preferred)
+    monitor.HEALTH_FAILURES_TO_SWITCH = 2
+    monitor.HEALTH_SUCCESSES_TO_SWITCH = 2
+    monitor.HEALTH_MIN_DWELL = 0
+    for name, value in overrides.items():
+        setattr(monitor, name, value)
+    return monitor
+
+
+def _round(monitor, ogmios, blockfrost, ogmios_latency=0.01, blockfrost_latency=0.01) -> str:
+    monitor.record("ogmios", ogmios, ogmios_latency)
+    monitor.record("blockfrost", blockfrost, blockfrost_latency)
+    return monitor.route()
+
+
+def test_fails_over_only_after_consecutive_failures():
+    monitor = _monitor()
+    _round(monitor, True, True)
+
+    assert _round(monitor, False, True) == "ogmios"
+    assert _round(monitor, False, True) == "blockfrost"
+    assert monitor.switches == 1
+
+
+def test_returns_to_preferred_after_dwell_and_recovery():
+    monitor = _monitor(HEALTH_MIN_DWELL=3600)
+    for _ in range(2):
+        _round(monitor, False, True)
+    assert monitor.backend() == "blockfrost"
+
+    for _ in range(3):
+        assert _round(monitor, True, True) == "blockfrost"
+    monitor.HEALTH_MIN_DWELL = 0
+    assert _round(monitor, True, True) == "ogmios"
+
+
+def test_switches_to_a_consistently_faster_backend():
+    monitor = _monitor(preferred="blockfrost", HEALTH_LATENCY_RATIO=2)
+
+    assert _round(monitor, True, True, ogmios_latency=0.05, blockfrost_latency=0.08) == "blockfrost"
+    for _ in range(2):
+        _round(monitor, True, True, ogmios_latency=0.05, blockfrost_latency=0.5)
+    assert monitor.backend() == "ogmios"
+
+
+def test_stays_on_the_faster_backend_while_the_preferred_one_is_slow():
+    monitor = _monitor(preferred="blockfrost", HEALTH_LATENCY_RATIO=2)
+
+    routes = [_round(monitor, True, True, ogmios_latency=0.05, blockfrost_latency=0.5) for _ in range(8)]
+
+    assert routes == ["blockfrost"] + ["ogmios"] * 7
+    assert monitor.switches == 1
+
+    for _ in range(monitor.HEALTH_WINDOW):
+        _round(monitor, True, True, ogmios_latency=0.05, blockfrost_latency=0.08)
+    assert monitor.backend() == "blockfrost"
+
+
+def test_probes_do_not_touch_the_environment():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/health":
+            return httpx.Response(200, json={"connectionStatus": "connected", "networkSynchronization": 0.9})
+        return httpx.Response(200, json={"is_healthy": True})
+
+    monitor = _monitor(HEALTH_FAILURES_TO_SWITCH=1)
+    environ = dict(os.environ)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            for _ in range(2):
+                await monitor.probe(client)
+
+    asyncio.run(run())
+
+    assert monitor.backend() == "blockfrost"
+    assert monitor.status()["backends"]["ogmios"]["last_error"] == "Ogmios not synchronized"
+    assert dict(os.environ) == environ
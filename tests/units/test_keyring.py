@@ -0,0 +1,65 @@
+import asyncio
+import binascii
+import threading
+
+import pytest
+from pycardano import ExtendedSigningKey, HDWallet, PaymentVerificationKey, ScriptAll, ScriptPubkey
+
+from suantrazabilidadapi.utils import keyring as keyring_module
+from suantrazabilidadapi.utils.keyring import Keyring, KeyringError, WalletKeys
+
+
+def _seed() -> str:
+    hdwallet = HDWallet.from_mnemonic(HDWallet.generate_mnemonic())
+    return binascii.hexlify(hdwallet._seed).decode("utf-8")  # pylint: disable=protected-access
+
+
+def test_keys_match_direct_derivation():
+    seed = _seed()
+    child_hdwallet = HDWallet.from_seed(seed).derive_from_path("m/1852'/1815'/0'/0/0")
+    payment_vk = PaymentVerificationKey.from_primitive(child_hdwallet.public_key)
+
+    keys = Keyring(maxsize=2).get("wallet", seed)
+
+    assert keys.signing_key.payload == ExtendedSigningKey.from_hdwallet(child_hdwallet).payload
+    assert keys.verification_key == payment_vk
+    assert keys.policy_id == ScriptAll([ScriptPubkey(payment_vk.hash())]).hash()
+
+
+def test_lru_eviction_wipes_the_secret():
+    keyring = Keyring(maxsize=1)
+    first = keyring.get("first", _seed())
+    second = keyring.get("second", _seed())
+
+    assert not any(first._secret)  # pylint: disable=protected-access
+    with pytest.raises(KeyringError):
+        first.signing_key
+    assert keyring.evict("second")
+    assert not any(second._secret)  # pylint: disable=protected-access
+    assert keyring.stats()["size"] == 0
+
+
+def test_cached_per_wallet_and_seed():
+    keyring = Keyring(maxsize=4)
+    seed = _seed()
+
+    keys = keyring.get("wallet", seed)
+    assert keyring.get("wallet", seed) is keys
+    assert keyring.get("wallet", _seed()) is not keys
+    assert keyring.stats()["hits"] == 1
+
+
+def test_async_derivation_runs_off_the_event_loop(monkeypatch):
+    threads = []
+    derive = WalletKeys.derive
+
+    def recording_derive(wallet_id, seed):
+        threads.append(threading.current_thread())
+        return derive(wallet_id, seed)
+
+    monkeypatch.setattr(keyring_module.WalletKeys, "derive", staticmethod(recording_derive))
+
+    keys = asyncio.run(Keyring(maxsize=2).aget("wallet", _seed()))
+
+    assert threads and threads[0] is not threading.main_thread()
+    assert keys.signing_key.sign(b"data")
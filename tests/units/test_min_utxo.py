@@ -0,0 +1,59 @@
+import pytest
+from pycardano import (
+    Address,
+    MultiAsset,
+    Network,
+    PaymentSigningKey,
+    PaymentVerificationKey,
+    StakeSigningKey,
+    StakeVerificationKey,
+    TransactionOutput,
+    Value,
+    min_lovelace,
+)
+
+from suantrazabilidadapi.routers.api_v1.endpoints import pydantic_schemas
+from suantrazabilidadapi.utils import min_utxo
+from suantrazabilidadapi.utils.min_utxo import MinUtxoCalculator, uint_class
+
+POLICY = "b11a367d61a2b8f6a77049a809d7b93c6d44c140678d69276ab77c12"
+
+
+class Context:
+    class protocol_param:
+        coins_per_utxo_byte = 4310
+
+
+def _address(staked: bool = False) -> Address:
+    payment = PaymentVerificationKey.from_signing_key(PaymentSigningKey.generate()).hash()
+    stake = StakeVerificationKey.from_signing_key(StakeSigningKey.generate()).hash() if staked else None
+    return Address(payment, stake, network=Network.TESTNET)
+
+
+def _outputs():
+    tokens = MultiAsset.from_primitive({bytes.fromhex(POLICY): {b"SUAN": 50, b"CO2": 70_000}})
+    datum = pydantic_schemas.DatumProjectParams(beneficiary=bytes(28))
+    return [
+        TransactionOutput(_address(), 0),
+        TransactionOutput(_address(staked=True), 2_000_000),
+        TransactionOutput(_address(), Value(0, tokens)),
+        TransactionOutput(_address(staked=True), Value(3_000_000, tokens), datum=datum),
+    ]
+
+
+@pytest.fixture()
+def calculator(monkeypatch):
+    monkeypatch.setattr(min_utxo.protocol_params_cache, "peek", lambda: None)
+    return MinUtxoCalculator()
+
+
+def test_uint_class_follows_cbor_integer_sizes():
+    assert [uint_class(v) for v in (0, 23, 24, 255, 256, 65_536, 2**32)] == [0, 0, 1, 1, 2, 3, 4]
+
+
+def test_matches_pycardano_and_reuses_output_shapes(calculator):
+    expected = [min_lovelace(Context, output) for output in _outputs()]
+
+    assert [calculator.min_lovelace(Context, output) for output in _outputs()] == expected
+    assert calculator.min_lovelaces(_outputs(), Context) == expected
+    assert calculator.stats() == {"shapes": 4, "hits": 4, "misses": 4}
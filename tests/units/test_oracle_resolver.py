@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from pycardano import (
+    Address,
+    Network,
+    PaymentSigningKey,
+    PaymentVerificationKey,
+    TransactionInput,
+    TransactionOutput,
+    UTxO,
+)
+
+from suantrazabilidadapi.routers.api_v1.endpoints import pydantic_schemas
+from suantrazabilidadapi.utils import oracle_resolver
+from suantrazabilidadapi.utils.plataforma import OracleReference
+from suantrazabilidadapi.utils.utxo_index import BlockChanges
+
+ORACLE = Address(
+    PaymentVerificationKey.from_signing_key(PaymentSigningKey.generate()).hash(), network=Network.TESTNET
+)
+POLICY = "b11a367d61a2b8f6a77049a809d7b93c6d44c140678d69276ab77c12"
+
+
+def _oracle(oracle_wallet_id: str, tx_id: str) -> OracleReference:
+    datum = pydantic_schemas.DatumOracle(
+        value_dict={b"SUAN": pydantic_schemas.TokenFeed(b"SUAN", 1_000)},
+        identifier=b"oracle",
+        validity=1_700_000_000_000,
+    )
+    utxo = UTxO(
+        TransactionInput.from_primitive([tx_id, 0]),
+        TransactionOutput(ORACLE, 2_000_000, datum=datum),
+    )
+    return OracleReference(oracle_wallet_id, str(ORACLE), POLICY, "SuanOracle", utxo)
+
+
+@pytest.fixture()
+def resolver(monkeypatch):
+    lookups = []
+
+    async def oracle_reference(self, chain_context, oracle_wallet_id):
+        lookups.append(oracle_wallet_id)
+        await asyncio.sleep(0)
+        return _oracle(oracle_wallet_id, f"{len(lookups):064x}")
+
+    monkeypatch.setattr(oracle_resolver.Helpers, "oracle_reference", oracle_reference)
+    resolver = oracle_resolver.OracleResolver()
+    resolver.lookups = lookups
+    return resolver
+
+
+def test_oracle_is_looked_up_once_and_reused(resolver):
+    async def resolve_many():
+        return await asyncio.gather(*(resolver.resolve(None, "oracle-1") for _ in range(5)))
+
+    first = asyncio.run(resolve_many())
+    again = asyncio.run(resolver.resolve(None, "oracle-1"))
+
+    assert resolver.lookups == ["oracle-1"]
+    assert all(oracle is first[0] for oracle in first) and again is first[0]
+    assert again.datum.identifier == b"oracle"
+    assert resolver.stats()["hits"] == 1
+
+
+def test_waiters_look_the_oracle_up_again_when_the_first_request_is_cancelled(resolver, monkeypatch):
+    lookup = oracle_resolver.Helpers.oracle_reference
+
+    async def slow_reference(self, chain_context, oracle_wallet_id):
+        await asyncio.sleep(0.01)
+        return await lookup(self, chain_context, oracle_wallet_id)
+
+    monkeypatch.setattr(oracle_resolver.Helpers, "oracle_reference", slow_reference)
+
+    async def cancel_first():
+        first = asyncio.create_task(resolver.resolve(None, "oracle-1"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(resolver.resolve(None, "oracle-1"))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await asyncio.wait_for(second, timeout=1), first
+
+    oracle, first = asyncio.run(cancel_first())
+
+    assert first.cancelled()
+    assert oracle.oracle_wallet_id == "oracle-1"
+    # The cancelled lookup never completed, the waiter made its own
+    assert resolver.lookups == ["oracle-1"] and resolver.misses == 2
+
+
+def test_spent_oracle_utxo_is_resolved_again(resolver):
+    oracle = asyncio.run(resolver.resolve(None, "oracle-1"))
+
+    resolver.on_block(BlockChanges(10, "cc" * 32, spent=[(str(ORACLE), oracle.utxo)]), [])
+    assert resolver.cached("oracle-1") is None
+
+    renewed = asyncio.run(resolver.resolve(None, "oracle-1"))
+    assert renewed.ref != oracle.ref
+    resolver.invalidate("oracle-1")
+    assert resolver.cached("oracle-1") is None
+    assert resolver.invalidations == 2
+
+
+def test_followed_oracle_stays_cached_while_the_index_holds_its_utxo(resolver, monkeypatch):
+    class Index:
+        ready = True
+        utxos = {}
+
+        def utxo(self, tx_id, index):
+            return self.utxos.get((tx_id, index))
+
+        def tracked(self, address):
+            return address == str(ORACLE)
+
+    index = Index()
+    monkeypatch.setattr(oracle_resolver, "local_utxo_index", index)
+    monkeypatch.setattr(resolver, "ORACLE_RESOLVER_TTL", 0)
+    oracle = asyncio.run(resolver.resolve(None, "oracle-1"))
+
+    index.utxos[oracle.ref] = oracle.utxo
+    assert resolver.cached("oracle-1") is oracle
+
+    # Spent without the block reaching the resolver: the index no longer has the UTxO
+    del index.utxos[oracle.ref]
+    assert resolver.cached("oracle-1") is None
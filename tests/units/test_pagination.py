@@ -0,0 +1,56 @@
+import asyncio
+import json
+
+from suantrazabilidadapi.utils.plataforma import AsyncPlataforma
+from suantrazabilidadapi.utils.response import ndjson_lines
+
+PAGES = {
+    None: {"items": [{"id": "w1"}, {"id": "w2"}], "nextToken": "t1"},
+    "t1": {"items": [{"id": "w3"}], "nextToken": None},
+}
+
+
+def _fake_post(calls):
+    async def _post(self, operation_name, graphql_variables=None, application=""):
+        calls.append(dict(graphql_variables))
+        page = PAGES[graphql_variables.get("nextToken")]
+        return {"success": True, "data": {"data": {"listWallets": json.loads(json.dumps(page))}}}
+
+    return _post
+
+
+def test_list_follows_next_token(monkeypatch):
+    calls = []
+    monkeypatch.setattr(AsyncPlataforma, "_post", _fake_post(calls))
+
+    response = asyncio.run(AsyncPlataforma().listWallets(page_size=2))
+
+    assert [item["id"] for item in response["data"]["data"]["listWallets"]["items"]] == ["w1", "w2", "w3"]
+    assert response["data"]["data"]["listWallets"]["nextToken"] is None
+    assert calls == [{"limit": 2}, {"limit": 2, "nextToken": "t1"}]
+
+
+def test_items_streamed_as_ndjson(monkeypatch):
+    monkeypatch.setattr(AsyncPlataforma, "_post", _fake_post([]))
+
+    async def collect():
+        items = AsyncPlataforma().iterItems("listWallets", "listWallets", page_size=2)
+        return [line async for line in ndjson_lines(items)]
+
+    lines = asyncio.run(collect())
+
+    assert [json.loads(line) for line in lines] == [{"id": "w1"}, {"id": "w2"}, {"id": "w3"}]
+    assert all(line.endswith("\n") for line in lines)
+
+
+def test_stream_ends_with_error_line(monkeypatch):
+    async def failing_post(self, operation_name, graphql_variables=None, application=""):
+        return {"success": False, "error": "timeout"}
+
+    monkeypatch.setattr(AsyncPlataforma, "_post", failing_post)
+
+    async def collect():
+        items = AsyncPlataforma().iterItems("listWallets", "listWallets")
+        return [json.loads(line) async for line in ndjson_lines(items)]
+
+    assert asyncio.run(collect()) == [{"success": False, "error": "timeout"}]
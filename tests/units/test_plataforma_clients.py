@@ -0,0 +1,64 @@
+import asyncio
+from types import MappingProxyType
+
+import httpx
+import pytest
+
+from suantrazabilidadapi.utils.pools import plataforma_async_clients
+from suantrazabilidadapi.utils.generic import Constants
+from suantrazabilidadapi.utils.graphql_documents import MAIN_DOCUMENTS, ORACLE_DOCUMENTS
+from suantrazabilidadapi.utils.plataforma import GraphqlApplication, async_plataforma_client
+
+
+class _RecordingClient:
+    def __init__(self, sent):
+        self.sent = sent
+
+    async def post(self, url, json=None, headers=None):
+        self.sent.append((url, dict(headers)))
+        await asyncio.sleep(0)
+        return httpx.Response(200, json={"data": {}}, request=httpx.Request("POST", url))
+
+
+@pytest.fixture()
+def applications(monkeypatch):
+    applications = MappingProxyType(
+        {
+            "main": GraphqlApplication.create("main", "https://main/graphql", "main-key", MAIN_DOCUMENTS),
+            "oracle": GraphqlApplication.create("oracle", "https://oracle/graphql", "oracle-key", ORACLE_DOCUMENTS),
+        }
+    )
+    monkeypatch.setattr(async_plataforma_client, "applications", applications)
+    sent = []
+    monkeypatch.setattr(plataforma_async_clients, "client", lambda name: _RecordingClient(sent))
+    return sent
+
+
+def test_shared_client_keeps_applications_apart(applications):
+    headers_before = dict(Constants.HEADERS)
+
+    async def run():
+        return await asyncio.gather(
+            async_plataforma_client._post("getWalletById", {"walletId": "w1"}),
+            async_plataforma_client._post("getConsultaApi", {"id": "c1"}, application="oracle"),
+            async_plataforma_client._post("getWalletById", {"walletId": "w2"}),
+        )
+
+    responses = asyncio.run(run())
+
+    assert all(response["success"] for response in responses)
+    assert sorted((url, headers["x-api-key"]) for url, headers in applications) == [
+        ("https://main/graphql", "main-key"),
+        ("https://main/graphql", "main-key"),
+        ("https://oracle/graphql", "oracle-key"),
+    ]
+    assert Constants.HEADERS == headers_before
+
+
+def test_application_config_is_immutable():
+    application = GraphqlApplication.create("main", "https://main/graphql", "key", MAIN_DOCUMENTS)
+
+    with pytest.raises(TypeError):
+        application.headers["x-api-key"] = "other"
+    with pytest.raises(AttributeError):
+        application.endpoint = "https://other/graphql"
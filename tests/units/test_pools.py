@@ -0,0 +1,82 @@
+import asyncio
+import contextvars
+import threading
+import time
+
+from suantrazabilidadapi.utils.pools import AsyncClientPool, BoundedExecutor, SessionPool
+
+priority: contextvars.ContextVar[str] = contextvars.ContextVar("priority", default="build")
+
+
+def test_sessions_are_reused_and_rebuilt_after_a_fork(monkeypatch):
+    pool = SessionPool()
+    session = pool.session()
+
+    assert pool.session() is session
+    assert pool.session("oracle") is not session
+    assert pool.stats()["main"]["requests"] == 2
+
+    # Forked child: the parent's sockets are not shared
+    monkeypatch.setattr("suantrazabilidadapi.utils.pools.os.getpid", lambda: -1)
+    child = pool.session()
+    assert child is not session
+    assert pool.stats()["main"]["requests"] == 1
+
+
+def test_each_loop_gets_its_own_client_closed_at_shutdown():
+    pool = AsyncClientPool()
+
+    async def use():
+        client = pool.client()
+        assert pool.client() is client
+        await pool.aclose()
+        return client
+
+    first = asyncio.run(use())
+    second = asyncio.run(use())
+
+    assert first is not second
+    assert first.is_closed and second.is_closed
+    assert pool.stats()["main"]["requests"] == 4
+
+
+def test_imap_keeps_the_call_order_and_the_caller_context():
+    executor = BoundedExecutor("test", 4)
+
+    def call(i):
+        # The first calls finish last
+        time.sleep((4 - i) * 0.01)
+        return i, priority.get()
+
+    token = priority.set("browse")
+    try:
+        results = executor.run([lambda i=i: call(i) for i in range(4)])
+    finally:
+        priority.reset(token)
+
+    assert results == [(i, "browse") for i in range(4)]
+    assert executor.stats()["submitted"] == 4
+
+
+def test_imap_cancels_the_pending_calls_when_the_consumer_stops():
+    executor = BoundedExecutor("test", 1)
+    started = threading.Event()
+    release = threading.Event()
+    ran = []
+
+    def call(i):
+        ran.append(i)
+        if i == 1:
+            started.set()
+            release.wait(1)
+        return i
+
+    results = executor.imap([lambda i=i: call(i) for i in range(4)])
+    assert next(results) == 0
+    started.wait(1)
+    results.close()
+    release.set()
+    executor.executor().shutdown(wait=True)
+
+    # The running call completes, the queued ones never start
+    assert ran == [0, 1]
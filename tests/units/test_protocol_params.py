@@ -0,0 +1,155 @@
+import dataclasses
+import threading
+from datetime import datetime, timezone
+from fractions import Fraction
+from types import SimpleNamespace
+
+import pytest
+from pycardano import GenesisParameters, ProtocolParameters
+
+from suantrazabilidadapi.utils.protocol_params import LedgerParameters, ProtocolParamsCache, era_epoch_end
+
+PROTOCOL = ProtocolParameters(
+    **{field.name: 1 for field in dataclasses.fields(ProtocolParameters) if field.default is dataclasses.MISSING}
+    | {"cost_models": {"PlutusV2": {0: 205665, 1: 812}}, "price_mem": 0.0577}
+)
+GENESIS = SimpleNamespace(
+    **{field.name: 1 for field in dataclasses.fields(GenesisParameters)} | {"active_slots_coefficient": Fraction(1, 20)}
+)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+class FakeContext:
+    def __init__(self, epoch=100, epoch_end=None):
+        self.epoch = epoch
+        self.epoch_end = epoch_end
+        self.fetches = 0
+        self.epoch_queries = 0
+
+    def fetch_ledger_parameters(self):
+        self.fetches += 1
+        return PROTOCOL, GENESIS, self.epoch, self.epoch_end
+
+    def fetch_epoch(self):
+        self.epoch_queries += 1
+        return self.epoch, self.epoch_end
+
+
+@pytest.fixture()
+def shared_redis():
+    return FakeRedis()
+
+
+def _cache(shared_redis, check_interval=300) -> ProtocolParamsCache:
+    cache = ProtocolParamsCache()
+    cache.PROTOCOL_PARAMS_REDIS = True
+    cache.PROTOCOL_PARAMS_CHECK_INTERVAL = check_interval
+    cache._redis_client = shared_redis  # pylint: disable=protected-access
+    return cache
+
+
+def test_parameters_survive_a_cbor_round_trip():
+    entry = LedgerParameters(100, PROTOCOL, GenesisParameters(**vars(GENESIS)), 1.0, 1.0)
+
+    restored = LedgerParameters.from_cbor(entry.to_cbor())
+
+    assert restored == entry
+    assert restored.protocol_param.cost_models["PlutusV2"][0] == 205665
+    assert entry.view()["genesis_param"]["active_slots_coefficient"] == "1/20"
+
+
+def test_new_worker_starts_from_redis(shared_redis):
+    context = FakeContext()
+    _cache(shared_redis).get(context)
+
+    entry = _cache(shared_redis).get(context)
+
+    assert context.fetches == 1
+    assert entry.protocol_param == PROTOCOL
+    assert entry.genesis_param.active_slots_coefficient == Fraction(1, 20)
+
+
+def test_refetched_only_when_the_epoch_changes(shared_redis):
+    context = FakeContext()
+    cache = _cache(shared_redis, check_interval=0)
+
+    cache.get(context)
+    cache.get(context)
+    assert (context.fetches, context.epoch_queries) == (1, 1)
+
+    context.epoch = 101
+    assert cache.get(context).epoch == 101
+    assert context.fetches == 2
+
+
+def test_known_epoch_end_skips_epoch_checks(shared_redis, monkeypatch):
+    context = FakeContext(epoch_end=2_000)
+    cache = _cache(shared_redis, check_interval=0)
+    monkeypatch.setattr("time.time", lambda: 1_000)
+
+    cache.get(context)
+    cache.get(context)
+    assert context.epoch_queries == 0
+
+    monkeypatch.setattr("time.time", lambda: 2_000)
+    cache.get(context)
+    assert context.epoch_queries == 1
+
+
+def test_unknown_epoch_end_is_checked_after_the_interval(shared_redis, monkeypatch):
+    context = FakeContext()
+    cache = _cache(shared_redis, check_interval=ProtocolParamsCache.PROTOCOL_PARAMS_CHECK_INTERVAL)
+    monkeypatch.setattr("time.time", lambda: 1_000)
+
+    stored = cache.get(context).to_cbor()
+    cache.get(context)
+    assert context.epoch_queries == 0
+
+    monkeypatch.setattr("time.time", lambda: 1_000 + cache.PROTOCOL_PARAMS_CHECK_INTERVAL)
+    cache.get(context)
+    cache.get(context)
+    assert (context.fetches, context.epoch_queries) == (1, 1)
+    # The epoch did not change: redis keeps the entry it had
+    assert shared_redis.data[cache.redis_key] == stored
+
+
+def test_other_threads_read_the_cache_while_the_epoch_is_checked(shared_redis):
+    context = FakeContext()
+    cache = _cache(shared_redis, check_interval=0)
+    entry = cache.get(context)
+    checked = []
+
+    def fetch_epoch():
+        # A get from another thread while this one queries the chain
+        checked.append(threading.Thread(target=lambda: checked.append(cache.get(context))))
+        checked[0].start()
+        checked[0].join(timeout=1)
+        return context.epoch, None
+
+    context.fetch_epoch = fetch_epoch
+    cache.get(context)
+
+    assert checked[1] is entry
+
+
+def test_ogmios_epoch_end_comes_from_the_era_summary():
+    # Preprod: 4 Byron epochs of 21600 slots of 20 seconds, then 432000 slots of 1 second per epoch
+    era = SimpleNamespace(start_time=1_728_000, start_epoch=4, epoch_length=432_000, slot_length=1_000)
+    system_start = datetime(2022, 6, 1)
+
+    assert era_epoch_end(4, system_start, era) == system_start.replace(tzinfo=timezone.utc).timestamp() + 2_160_000
+    assert era_epoch_end(5, system_start, era) - era_epoch_end(4, system_start, era) == 432_000
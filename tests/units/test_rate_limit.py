@@ -0,0 +1,116 @@
+from types import SimpleNamespace
+
+import pytest
+from blockfrost.utils import ApiError
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from suantrazabilidadapi.utils.exception import BlockfrostRateLimited
+from suantrazabilidadapi.utils import rate_limit
+from suantrazabilidadapi.utils.rate_limit import BlockfrostRateLimiter, gather
+from suantrazabilidadapi.utils.response import blockfrost_rate_limited_handler, http_exception_handler
+
+
+@pytest.fixture()
+def limiter(monkeypatch):
+    monkeypatch.setattr(BlockfrostRateLimiter, "BLOCKFROST_LIMITER_ENABLED", True)
+    monkeypatch.setattr(BlockfrostRateLimiter, "BLOCKFROST_LIMITER_REDIS", False)
+    monkeypatch.setattr(BlockfrostRateLimiter, "BLOCKFROST_RATE_LIMIT", 10)
+    monkeypatch.setattr(BlockfrostRateLimiter, "BLOCKFROST_BURST_LIMIT", 10)
+    monkeypatch.setattr(BlockfrostRateLimiter, "BLOCKFROST_LIMITER_MAX_WAIT", 1)
+    return BlockfrostRateLimiter()
+
+
+def test_browsing_leaves_a_reserve_to_submissions(limiter):
+    with limiter.priority("browse"):
+        # transaction_utxos is a "build" call unless the caller browses history
+        assert [limiter.call("transaction_utxos", lambda: i) for i in range(7)] == list(range(7))
+        assert limiter.call("transaction_submit", lambda: "tx_id") == "tx_id"
+
+    stats = limiter.stats()["priorities"]
+    assert stats["browse"]["calls"] == 7 and stats["browse"]["waited"] == 0
+    assert stats["submit"]["calls"] == 1 and stats["submit"]["waited"] == 0
+    assert stats["build"]["calls"] == 0
+
+    # The next browsing call queues until the bucket refills above the reserve
+    assert limiter.call("address_transactions", lambda: "history") == "history"
+    assert limiter.stats()["priorities"]["browse"]["waited"] == 1
+
+    # Waiting on an empty bucket ends in a rejection once the deadline passed
+    limiter.BLOCKFROST_LIMITER_MAX_WAIT = 0.05
+    limiter.local.drain()
+    with pytest.raises(BlockfrostRateLimited) as rejected:
+        limiter.call("asset", lambda: "details")
+    assert rejected.value.retry_after == 1
+    assert limiter.stats()["priorities"]["browse"]["rejected"] == 1
+
+
+def test_reserves_refill_within_the_wait(limiter):
+    limiter.BLOCKFROST_BURST_LIMIT = 500
+
+    # 10 requests per second refill 10 tokens in the 1 second wait, not the 150 of 30% of the burst
+    assert limiter.reserve("browse") == pytest.approx(3)
+    assert limiter.reserve("build") == pytest.approx(1)
+    assert limiter.reserve("submit") == 0
+
+
+def test_throttled_calls_wait_for_the_bucket_and_are_tried_again(limiter):
+    answers = [ApiError(SimpleNamespace(status_code=429, json=lambda: None)), "utxos"]
+
+    def endpoint():
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    assert limiter.call("address_utxos", endpoint) == "utxos"
+    assert limiter.throttled == 1
+    assert limiter.stats()["priorities"]["build"]["waited"] == 1
+
+    not_found = ApiError(SimpleNamespace(status_code=404, json=lambda: None))
+    with pytest.raises(ApiError):
+        limiter.call("address_utxos", lambda: (_ for _ in ()).throw(not_found))
+
+
+def test_gathered_pages_take_a_token_each(limiter, monkeypatch):
+    monkeypatch.setattr(rate_limit, "blockfrost_limiter", limiter)
+    utxos = [{"tx_hash": f"{i:064x}", "output_index": 0} for i in range(250)]
+    pages = []
+
+    def address_utxos(address, return_type=None, count=100, page=1):
+        pages.append(page)
+        return utxos[(page - 1) * count:page * count]
+
+    gathered = gather("address_utxos", address_utxos, "addr_test1")
+
+    assert [utxo.tx_hash for utxo in gathered] == [utxo["tx_hash"] for utxo in utxos]
+    assert pages == [1, 2, 3]
+    assert limiter.stats()["priorities"]["build"]["calls"] == 3
+    assert gather("address_utxos", address_utxos, "addr_test1", return_type="json", count=50, page=5) == utxos[200:]
+
+
+def test_rejections_answer_503_even_when_wrapped_by_the_endpoint():
+    app = FastAPI()
+    app.add_exception_handler(BlockfrostRateLimited, blockfrost_rate_limited_handler)
+    app.add_exception_handler(StarletteHTTPException, http_exception_handler)
+
+    @app.get("/limited")
+    async def limited():
+        raise BlockfrostRateLimited("No Blockfrost request available", retry_after=3)
+
+    @app.get("/wrapped")
+    async def wrapped():
+        try:
+            raise BlockfrostRateLimited("No Blockfrost request available", retry_after=2)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail="Error with the endpoint") from e
+
+    @app.get("/missing")
+    async def missing():
+        raise HTTPException(status_code=404, detail="Not found")
+
+    client = TestClient(app)
+    assert (client.get("/limited").status_code, client.get("/limited").headers["Retry-After"]) == (503, "3")
+    assert (client.get("/wrapped").status_code, client.get("/wrapped").headers["Retry-After"]) == (503, "2")
+    assert client.get("/missing").json() == {"detail": "Not found"}
@@ -0,0 +1,139 @@
+import asyncio
+
+import httpx
+import pytest
+import requests
+
+from suantrazabilidadapi.utils.resilience import CircuitBreaker, CircuitOpenError, ResiliencePolicy
+
+
+def _policy(**overrides) -> ResiliencePolicy:
+    policy = ResiliencePolicy()
+    policy.PLATAFORMA_RETRIES = 2
+    policy.PLATAFORMA_RETRY_BASE_DELAY = 0
+    policy.PLATAFORMA_BREAKER_FAILURES = 3
+    policy.PLATAFORMA_BREAKER_RESET = 60
+    for name, value in overrides.items():
+        setattr(policy, name, value)
+    return policy
+
+
+def _flaky(failures: int, error: Exception):
+    calls = []
+
+    def send():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error
+        return {"data": {}}
+
+    return send, calls
+
+
+def test_queries_are_retried():
+    policy = _policy()
+    send, calls = _flaky(2, requests.exceptions.ConnectionError("reset"))
+
+    assert policy.call("main:getWalletById", send) == {"data": {}}
+    assert len(calls) == 3
+    assert policy.retries == 2
+
+
+def test_mutations_need_a_record_id():
+    policy = _policy()
+    send, calls = _flaky(1, requests.exceptions.Timeout("slow"))
+    with pytest.raises(requests.exceptions.Timeout):
+        policy.call("main:WalletMutation", send, is_mutation=True)
+    assert len(calls) == 1
+
+    send, calls = _flaky(1, requests.exceptions.Timeout("slow"))
+    policy.call("main:WalletMutation", send, is_mutation=True, record_id="wallet-id")
+    assert len(calls) == 2
+
+
+def test_retried_create_refused_as_existing_counts_as_written():
+    policy = _policy()
+    refused = {
+        "data": {"createWallet": None},
+        "errors": [{"errorType": "DynamoDB:ConditionalCheckFailedException", "message": "Conditional check failed"}],
+    }
+    answers = [requests.exceptions.Timeout("slow"), refused]
+
+    def send():
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    assert policy.call("main:WalletMutation", send, is_mutation=True, record_id="wallet-id") == {
+        "data": {"createWallet": None}
+    }
+    assert policy.stats()["written_before"] == 1
+
+    # Refused at the first attempt, the record existed before this request
+    assert policy.call("main:WalletMutation", lambda: refused, is_mutation=True, record_id="wallet-id") == refused
+
+
+def test_cancelled_trial_does_not_keep_the_circuit_open():
+    policy = _policy(PLATAFORMA_BREAKER_RESET=0)
+    breaker = policy.breaker("main:getWalletById")
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_failure()
+
+    async def cancelled():
+        raise asyncio.CancelledError()
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(policy.acall("main:getWalletById", cancelled))
+    assert breaker.allow()
+
+
+def test_client_errors_are_not_retried():
+    policy = _policy()
+    response = httpx.Response(400, request=httpx.Request("POST", "http://plataforma"))
+    send, calls = _flaky(1, httpx.HTTPStatusError("bad request", request=response.request, response=response))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(policy.acall("main:getScriptById", lambda: asyncio.sleep(0, send())))
+    assert len(calls) == 1
+
+
+def test_breaker_opens_per_operation():
+    policy = _policy(PLATAFORMA_RETRIES=0)
+    send, _ = _flaky(10, requests.exceptions.ConnectionError("down"))
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            policy.call("main:getWalletById", send)
+
+    with pytest.raises(CircuitOpenError):
+        policy.call("main:getWalletById", send)
+    assert policy.call("main:getScriptById", lambda: "ok") == "ok"
+    assert policy.stats()["breakers"]["main:getWalletById"] == "open"
+
+
+def test_breaker_half_open_after_reset():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_slow_reads_are_hedged():
+    policy = _policy(PLATAFORMA_HEDGE_READS=True, PLATAFORMA_HEDGE_MIN_SAMPLES=5)
+    for _ in range(5):
+        policy.latencies("main:getWalletById").add(0.01)
+    delays = [1.0, 0.0]
+
+    async def send():
+        await asyncio.sleep(delays.pop(0))
+        return "answer"
+
+    result = asyncio.run(asyncio.wait_for(policy.acall("main:getWalletById", send), timeout=0.5))
+
+    assert result == "answer"
+    assert policy.hedged == 1
@@ -0,0 +1,84 @@
+import pytest
+import uplc
+from pycardano import (
+    Address,
+    ExecutionUnits,
+    Network,
+    PlutusV2Script,
+    Redeemer,
+    RedeemerTag,
+    Transaction,
+    TransactionBody,
+    TransactionInput,
+    TransactionOutput,
+    TransactionWitnessSet,
+    UTxO,
+    plutus_script_hash,
+)
+
+from suantrazabilidadapi.routers.api_v1.endpoints import pydantic_schemas
+from suantrazabilidadapi.utils.exception import ScriptEvaluationError
+from suantrazabilidadapi.utils.script_eval import ScriptEvaluator
+from tests.utils.protocol_params import DEFAULT_GENESIS_PARAMETERS, DEFAULT_PROTOCOL_PARAMETERS
+
+ALWAYS_SUCCEEDS = "(program 1.0.0 (lam d (lam r (lam ctx [(builtin unIData) r]))))"
+ALWAYS_FAILS = "(program 1.0.0 (lam d (lam r (lam ctx (error)))))"
+
+
+def _spend(code: str, redeemer: int = 42):
+    script = PlutusV2Script(uplc.flatten(uplc.parse(code)))
+    address = Address(plutus_script_hash(script), network=Network.TESTNET)
+    datum = pydantic_schemas.DatumProjectParams(beneficiary=bytes(28))
+    utxo = UTxO(TransactionInput.from_primitive(["aa" * 32, 0]), TransactionOutput(address, 5_000_000, datum=datum))
+    body = TransactionBody(inputs=[utxo.input], outputs=[TransactionOutput(address, 4_800_000)], fee=200_000)
+    spend = Redeemer(redeemer, ExecutionUnits(0, 0))
+    spend.tag = RedeemerTag.SPEND
+    spend.index = 0
+    witness = TransactionWitnessSet(plutus_v2_script=[script], redeemer=[spend])
+    return Transaction(body, witness), {utxo.input: utxo}
+
+
+def _evaluate(evaluator, tx, resolved, remote):
+    return evaluator.evaluate_tx(
+        tx, resolved.get, remote, DEFAULT_PROTOCOL_PARAMETERS, DEFAULT_GENESIS_PARAMETERS
+    )
+
+
+def _remote_not_expected(tx):
+    raise AssertionError("the backend evaluator should not be called")
+
+
+def test_redeemers_are_evaluated_in_process():
+    evaluator = ScriptEvaluator()
+    tx, resolved = _spend(ALWAYS_SUCCEEDS)
+
+    units = _evaluate(evaluator, tx, resolved, _remote_not_expected)
+
+    assert list(units) == ["spend:0"]
+    assert units["spend:0"].mem > 0 and units["spend:0"].steps > 0
+    assert _evaluate(evaluator, tx, resolved, _remote_not_expected) == units
+    assert evaluator.local == 2 and evaluator.remote == 0
+
+
+def test_failing_script_raises_and_unresolved_inputs_go_to_the_backend():
+    evaluator = ScriptEvaluator()
+    tx, resolved = _spend(ALWAYS_FAILS)
+    with pytest.raises(ScriptEvaluationError):
+        _evaluate(evaluator, tx, resolved, _remote_not_expected)
+
+    remote_units = {"spend:0": ExecutionUnits(1, 1)}
+    assert _evaluate(evaluator, tx, {}, lambda tx: remote_units) == remote_units
+    assert evaluator.failures == 1 and evaluator.fallbacks == 1
+
+
+def test_unsupported_redeemers_go_to_the_backend():
+    evaluator = ScriptEvaluator()
+    tx, resolved = _spend(ALWAYS_SUCCEEDS)
+    withdrawal = Redeemer(0, ExecutionUnits(0, 0))
+    withdrawal.tag = RedeemerTag.WITHDRAWAL
+    withdrawal.index = 0
+    tx.transaction_witness_set.redeemer.append(withdrawal)
+
+    remote_units = {"spend:0": ExecutionUnits(1, 1), "withdrawal:0": ExecutionUnits(1, 1)}
+    assert _evaluate(evaluator, tx, resolved, lambda tx: remote_units) == remote_units
+    assert evaluator.fallbacks == 1 and evaluator.local == 0
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+from pycardano import PlutusV2Script, plutus_script_hash
+
+from suantrazabilidadapi.utils.script_registry import ScriptRecord, ScriptRegistry
+
+CBOR_HEX = "4e4d01000033222220051200120011"
+
+
+def _script_info() -> dict:
+    policy_id = plutus_script_hash(PlutusV2Script(bytes.fromhex(CBOR_HEX))).payload.hex()
+    return {
+        "id": policy_id,
+        "cbor": CBOR_HEX,
+        "testnetAddr": "addr_test1wq",
+        "MainnetAddr": "addr1wq",
+        "token_name": "SUANX",
+        "scriptParentID": policy_id,
+    }
+
+
+def test_record_is_verified_against_policy_id():
+    info = _script_info()
+    record = ScriptRecord.from_info(info)
+
+    assert record.script_hash.payload.hex() == info["id"]
+    assert record.testnet_address == "addr_test1wq"
+    assert record.get("token_name") == "SUANX"
+    with pytest.raises(TypeError):
+        record.info["cbor"] = "00"
+
+    with pytest.raises(ValueError):
+        ScriptRecord.from_info(dict(info, id="00" * 28))
+    with pytest.raises(ValueError):
+        ScriptRecord.from_info(dict(info, cbor="na"))
+
+
+def test_registry_persists_records(tmp_path):
+    info = _script_info()
+    registry = ScriptRegistry(scripts_dir=tmp_path)
+    registry.add(info)
+
+    assert asyncio.run(registry.get(info["id"])).plutus_script == PlutusV2Script(bytes.fromhex(CBOR_HEX))
+    assert registry.stats()["memory_hits"] == 1
+
+    # A new process starts warm from disk, without asking Plataforma
+    restarted = ScriptRegistry(scripts_dir=tmp_path)
+    record = asyncio.run(restarted.get(info["id"]))
+    assert record.policy_id == info["id"]
+    assert restarted.stats() == {"size": 1, "memory_hits": 0, "disk_hits": 1, "backend_fetches": 0}
@@ -0,0 +1,184 @@
+import pytest
+import redis
+from pycardano import (
+    Address,
+    Network,
+    PaymentSigningKey,
+    PaymentVerificationKey,
+    Transaction,
+    TransactionBody,
+    TransactionInput,
+    TransactionOutput,
+    TransactionWitnessSet,
+    UTxO,
+)
+
+from suantrazabilidadapi.utils.exception import SpendConflictError
+from suantrazabilidadapi.utils.spend_reservations import MemorySpendStore, PendingSpends
+from suantrazabilidadapi.utils.utxo_index import BlockChanges
+
+CORE = Address(
+    PaymentVerificationKey.from_signing_key(PaymentSigningKey.generate()).hash(), network=Network.TESTNET
+)
+USER = Address(
+    PaymentVerificationKey.from_signing_key(PaymentSigningKey.generate()).hash(), network=Network.TESTNET
+)
+
+
+def _utxo(tx_id: str, index: int, lovelace: int = 10_000_000) -> UTxO:
+    return UTxO(TransactionInput.from_primitive([tx_id, index]), TransactionOutput(CORE, lovelace))
+
+
+def _tx(inputs, outputs) -> Transaction:
+    body = TransactionBody(inputs=[utxo.input for utxo in inputs], outputs=outputs, fee=200_000)
+    return Transaction(body, TransactionWitnessSet())
+
+
+class Backend:
+    def __init__(self, utxos, fail=False):
+        self.live = list(utxos)
+        self.fail = fail
+        self.submitted = []
+
+    def utxos(self, address):
+        return [utxo for utxo in self.live if str(utxo.output.address) == str(address)]
+
+    def submit_tx_cbor(self, cbor):
+        if self.fail:
+            raise RuntimeError("submit failed")
+        self.submitted.append(cbor)
+
+
+@pytest.fixture()
+def spends():
+    spends = PendingSpends()
+    spends.store = MemorySpendStore()
+    return spends
+
+
+def test_inputs_of_in_flight_transactions_are_hidden_and_outputs_chained(spends):
+    first, second = _utxo("aa" * 32, 0), _utxo("bb" * 32, 0)
+    backend = Backend([first, second])
+    context = spends.context(backend)
+
+    tx = _tx([first], [TransactionOutput(USER, 2_000_000), TransactionOutput(CORE, 7_800_000)])
+    tx_id = spends.submit(context, tx)
+
+    refs = {(u.input.transaction_id.payload.hex(), u.input.index) for u in context.utxos(CORE)}
+    assert refs == {("bb" * 32, 0), (tx_id, 1)}
+    assert [u.output.amount.coin for u in context.utxos(USER)] == [2_000_000]
+
+
+def test_concurrent_spend_of_the_same_input_is_rejected(spends):
+    utxo = _utxo("aa" * 32, 0)
+    context = spends.context(Backend([utxo]))
+    spends.submit(context, _tx([utxo], [TransactionOutput(USER, 2_000_000)]))
+
+    with pytest.raises(SpendConflictError):
+        spends.submit(context, _tx([utxo], [TransactionOutput(USER, 3_000_000)]))
+    assert spends.conflicts == 1
+
+
+def test_failed_submission_and_confirmation_release_the_inputs(spends):
+    utxo = _utxo("aa" * 32, 0)
+    failing = spends.context(Backend([utxo], fail=True))
+    with pytest.raises(RuntimeError):
+        spends.submit(failing, _tx([utxo], [TransactionOutput(USER, 2_000_000)]))
+    assert len(failing.utxos(CORE)) == 1
+
+    backend = Backend([utxo])
+    context = spends.context(backend)
+    tx_id = spends.submit(context, _tx([utxo], [TransactionOutput(USER, 2_000_000)]))
+    assert context.utxos(CORE) == []
+
+    backend.live = []
+    spends.confirm(BlockChanges(10, "cc" * 32), [tx_id])
+    assert spends.confirmed == 1
+    assert context.utxos(USER) == []
+
+
+class Builder:
+    """Selects the first UTxO of the core address not already an input, like coin selection"""
+
+    def __init__(self, context, inputs=(), stale=()):
+        self.context = context
+        self.inputs = list(inputs)
+        # UTxOs the context returned before a concurrent builder reserved them
+        self.stale = list(stale)
+        self.builds = 0
+
+    def build_and_sign(self, signing_keys, change_address=None):
+        self.builds += 1
+        if not self.inputs:
+            self.inputs.append(self.stale.pop() if self.stale else self.context.utxos(CORE)[0])
+        return _tx(self.inputs, [TransactionOutput(USER, 2_000_000 + self.builds)])
+
+
+def test_transaction_is_built_again_when_its_selected_input_was_taken(spends):
+    first, second = _utxo("aa" * 32, 0), _utxo("bb" * 32, 0)
+    context = spends.context(Backend([first, second]))
+    # Both builders selected the first UTxO before either one reserved it
+    racing = Builder(context, stale=[first])
+    spends.submit(context, _tx([first], [TransactionOutput(USER, 1_000_000)]))
+
+    spends.build_and_submit(context, racing, [], CORE)
+
+    assert racing.builds == 2 and racing.inputs == [second]
+    assert spends.stats()["rebuilt_on_conflict"] == 1
+
+    # An input set explicitly is not replaced
+    explicit = Builder(context, [first])
+    with pytest.raises(SpendConflictError):
+        spends.build_and_submit(context, explicit, [], CORE)
+    assert explicit.builds == 1
+
+
+def test_outputs_seen_on_chain_release_the_transaction_without_the_index(spends):
+    utxo = _utxo("aa" * 32, 0)
+    backend = Backend([utxo])
+    context = spends.context(backend)
+    tx_id = spends.submit(context, _tx([utxo], [TransactionOutput(CORE, 8_000_000)]))
+
+    backend.live = [UTxO(TransactionInput.from_primitive([tx_id, 0]), TransactionOutput(CORE, 8_000_000))]
+    assert [u.input.transaction_id.payload.hex() for u in context.utxos(CORE)] == [tx_id]
+    assert spends.confirmed == 1
+    assert spends.release(tx_id) is False
+
+
+class FlakyStore(MemorySpendStore):
+    """Shared store that can go down like redis"""
+
+    def __post_init__(self):
+        super().__post_init__()
+        self.down = False
+        self.calls = 0
+
+    def __getattribute__(self, name):
+        attribute = super().__getattribute__(name)
+        if name in ("claim", "put", "get_many", "delete", "add_member", "members", "remove_member"):
+            self.calls += 1
+            if self.down:
+                raise redis.ConnectionError("Timeout connecting to server")
+        return attribute
+
+
+def test_redis_outage_falls_back_once_and_hands_the_reservations_over(spends):
+    shared = FlakyStore()
+    other = PendingSpends()
+    spends.store = other.store = shared
+    utxos = [_utxo("aa" * 32, 0), _utxo("bb" * 32, 0)]
+    shared.down = True
+
+    spends.reserve(_tx([utxos[0]], [TransactionOutput(USER, 2_000_000)]))
+    spendable = spends.spendable(str(CORE), utxos)
+
+    # Only the first call waited for redis, the next ones went to memory
+    assert shared.calls == 1 and spends.redis_errors == 1
+    assert spendable == [utxos[1]] and spends.stats()["store"] == "local"
+
+    shared.down = False
+    spends._redis_down_until = 0  # pylint: disable=protected-access
+    assert spends.spendable(str(CORE), utxos) == [utxos[1]]
+    # Handed over: the other workers see the reservation too
+    assert other.spendable(str(CORE), utxos) == [utxos[1]]
+    assert spends.local.snapshot() == ([], [])
@@ -0,0 +1,116 @@
+from pycardano import Address, Network, PaymentSigningKey, PaymentVerificationKey
+
+from suantrazabilidadapi.utils.blockchain import IndexedChainContext
+from suantrazabilidadapi.utils.utxo_index import UtxoIndex, utxo_from_output
+
+POLICY = "b11a367d61a2b8f6a77049a809d7b93c6d44c140678d69276ab77c12"
+
+
+def _address() -> str:
+    vkey = PaymentVerificationKey.from_signing_key(PaymentSigningKey.generate())
+    return Address(vkey.hash(), network=Network.TESTNET).encode()
+
+
+CORE = _address()
+CONTRACT = _address()
+OTHER = _address()
+
+
+def _output(address, lovelace=2_000_000, tokens=None) -> dict:
+    value = {"ada": {"lovelace": lovelace}}
+    if tokens:
+        value[POLICY] = tokens
+    return {"address": address, "value": value}
+
+
+def _tx(tx_id, inputs=(), outputs=(), **extra) -> dict:
+    return {
+        "id": tx_id,
+        "inputs": [{"transaction": {"id": i}, "index": n} for i, n in inputs],
+        "outputs": list(outputs),
+        **extra,
+    }
+
+
+def _id(n: int) -> str:
+    return f"{n:064x}"
+
+
+def _refs(utxos) -> set:
+    return {(u.input.transaction_id.payload.hex(), u.input.index) for u in utxos}
+
+
+def _index() -> UtxoIndex:
+    index = UtxoIndex()
+    index.reset((100, "a" * 64))
+    index.seed(CORE, [utxo_from_output(_id(1), 0, _output(CORE))])
+    index.seed(CONTRACT, [])
+    index.ready = True
+    return index
+
+
+def test_blocks_move_utxos_between_tracked_addresses():
+    index = _index()
+
+    index.apply_block(
+        101,
+        "b" * 64,
+        [_tx(_id(2), inputs=[(_id(1), 0)], outputs=[_output(CONTRACT, tokens={"6f7261636c65": 1}), _output(OTHER)])],
+    )
+
+    assert index.utxos(CORE) == []
+    [locked] = index.utxos(CONTRACT)
+    assert locked.output.amount.multi_asset.count(lambda pi, an, a: a == 1) == 1
+    assert index.utxos(OTHER) is None
+
+
+def test_rollback_restores_spent_and_drops_created_utxos():
+    index = _index()
+    index.apply_block(101, "b" * 64, [_tx(_id(2), inputs=[(_id(1), 0)], outputs=[_output(CONTRACT)])])
+    index.apply_block(102, "c" * 64, [_tx(_id(3), outputs=[_output(CORE)])])
+
+    assert index.rollback(101, "b" * 64)
+    assert _refs(index.utxos(CORE)) == set()
+    assert index.rollback(100, "a" * 64)
+    assert _refs(index.utxos(CORE)) == {(_id(1), 0)}
+    assert index.utxos(CONTRACT) == []
+    assert not index.rollback(50, "d" * 64)
+
+
+def test_failed_script_only_consumes_collaterals():
+    index = _index()
+    index.seed(CORE, [utxo_from_output(_id(1), 0, _output(CORE)), utxo_from_output(_id(1), 1, _output(CORE))])
+
+    tx = _tx(
+        _id(4),
+        inputs=[(_id(1), 0)],
+        outputs=[_output(CONTRACT)],
+        spends="collaterals",
+        collaterals=[{"transaction": {"id": _id(1)}, "index": 1}],
+        collateralReturn=_output(CORE, 1_500_000),
+    )
+    index.apply_block(101, "b" * 64, [tx])
+
+    assert _refs(index.utxos(CORE)) == {(_id(1), 0), (_id(4), 1)}
+    assert index.utxos(CONTRACT) == []
+
+
+def test_adapter_falls_back_for_addresses_not_followed():
+    index = _index()
+
+    class Backend:
+        def __init__(self):
+            self.queried = []
+
+        def utxos(self, address):
+            self.queried.append(address)
+            return []
+
+    backend = Backend()
+    context = IndexedChainContext(backend, index)
+
+    assert _refs(context.utxos(CORE)) == {(_id(1), 0)}
+    context.utxos(OTHER)
+    index.ready = False
+    context.utxos(CORE)
+    assert backend.queried == [OTHER, CORE]
@@ -0,0 +1,57 @@
+from pycardano import (
+    Address,
+    MultiAsset,
+    Network,
+    PaymentSigningKey,
+    PaymentVerificationKey,
+    TransactionInput,
+    TransactionOutput,
+    UTxO,
+    Value,
+)
+
+from suantrazabilidadapi.routers.api_v1.endpoints import pydantic_schemas
+from suantrazabilidadapi.utils import plataforma
+from suantrazabilidadapi.utils.plataforma import Helpers
+
+POLICY = "b11a367d61a2b8f6a77049a809d7b93c6d44c140678d69276ab77c12"
+ADDRESS = Address(
+    PaymentVerificationKey.from_signing_key(PaymentSigningKey.generate()).hash(), network=Network.TESTNET
+)
+
+
+def test_utxo_info_has_the_blockfrost_format():
+    tokens = MultiAsset.from_primitive({bytes.fromhex(POLICY): {b"SUAN": 7}})
+    datum = pydantic_schemas.DatumProjectParams(beneficiary=bytes(28))
+    utxo = UTxO(
+        TransactionInput.from_primitive(["aa" * 32, 1]),
+        TransactionOutput(ADDRESS, Value(2_000_000, tokens), datum=datum),
+    )
+
+    info = Helpers().utxo_info(utxo)
+
+    assert info["address"] == ADDRESS.encode()
+    assert info["amount"] == [
+        {"unit": "lovelace", "quantity": "2000000"},
+        {"unit": POLICY + b"SUAN".hex(), "quantity": "7"},
+    ]
+    assert info["output_index"] == 1
+    assert info["inline_datum"] == datum.to_cbor_hex()
+    assert info["utxo_hash"] == f"{'aa' * 32}#1"
+
+
+def test_inputs_not_held_by_the_builder_are_fetched_once_per_transaction(monkeypatch):
+    held = UTxO(TransactionInput.from_primitive(["aa" * 32, 0]), TransactionOutput(ADDRESS, 5_000_000))
+    inputs = [held.input] + [TransactionInput.from_primitive(["bb" * 32, i]) for i in (0, 1)]
+    calls = []
+
+    def getUtxoInfo(self, txhash):
+        calls.append(txhash)
+        return {"outputs": [{"output_index": i, "address": ADDRESS.encode()} for i in range(3)]}
+
+    monkeypatch.setattr(plataforma.CardanoApi, "getUtxoInfo", getUtxoInfo)
+
+    info = Helpers().utxos_info(inputs, [held])
+
+    assert [i["utxo_hash"] for i in info] == [f"{'aa' * 32}#0", f"{'bb' * 32}#0", f"{'bb' * 32}#1"]
+    assert calls == ["bb" * 32]